@@ -0,0 +1,111 @@
+import asyncio
+import hmac
+import os
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import PlainTextResponse
+
+from app.api.routes.exchange import exchange_service
+from app.core.executor import compute_executor
+from app.core.profiling import collapse, loop_monitor, sample_stacks
+
+router = APIRouter(prefix="/debug", tags=["debug"])
+
+
+def require_admin(x_admin_token: Optional[str] = Header(None)):
+    """
+    Allow the request only with the configured X-Admin-Token
+
+    Debug endpoints are disabled entirely while ADMIN_TOKEN is unset.
+    """
+    expected = os.getenv("ADMIN_TOKEN")
+    if not expected:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token, expected):
+        raise HTTPException(status_code=403, detail="Admin token required")
+
+
+@router.get("/profile", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def profile(
+    seconds: float = Query(5.0, gt=0, le=60),
+    rate: float = Query(100.0, ge=1, le=1000)
+):
+    """
+    Sample all thread stacks for a while
+
+    Args:
+        seconds: Sampling duration (default: 5, max: 60)
+        rate: Samples per second (default: 100)
+
+    Returns collapsed stacks ("thread;outer;...;inner count"), ready for
+    flamegraph.pl or speedscope
+    """
+    # Sampling runs in a worker thread so the event loop stays responsive
+    # and shows up in the samples
+    counts = await asyncio.to_thread(sample_stacks, seconds, rate)
+    return collapse(counts)
+
+
+@router.get("/loop-lag", dependencies=[Depends(require_admin)])
+async def loop_lag():
+    """
+    Event-loop lag statistics and recent blocking events
+
+    Each event carries the loop thread's stack captured while it was blocked
+    """
+    return loop_monitor.snapshot()
+
+
+@router.get("/executor", dependencies=[Depends(require_admin)])
+async def executor_metrics():
+    """
+    Compute pool configuration and saturation
+
+    Counts inline vs offloaded calls, timeouts and cancellations, and
+    reports how many workers are busy and how many callers are queued
+    """
+    return compute_executor.metrics()
+
+
+@router.get("/refresh", dependencies=[Depends(require_admin)])
+async def refresh_stats():
+    """
+    Upstream rate refresh statistics
+
+    Separates useful fetches (new table) from wasted ones (304 Not Modified
+    or an identical payload) and shows when the next refresh is due
+    """
+    return exchange_service.get_refresh_stats()
+
+
+@router.get("/alerts", dependencies=[Depends(require_admin)])
+async def alert_stats():
+    """
+    Alert engine and notification delivery statistics
+
+    Active alert count, snapshot evaluations, and delivered, retried,
+    failed and dropped notifications
+    """
+    alerts = exchange_service.alerts
+    return {
+        "active": alerts.active_count(),
+        "evaluations": alerts.evaluations,
+        "sink": type(alerts.dispatcher.sink).__name__,
+        **alerts.dispatcher.stats,
+        "dead_letter_batches": len(alerts.dispatcher.dead_letters)
+    }
+
+
+@router.get("/sync", dependencies=[Depends(require_admin)])
+async def snapshot_sync(request: Request):
+    """
+    Cross-node snapshot distribution status
+
+    Shows whether this node leads, follows or fetches independently, the
+    snapshot version it published or applied, and message counters
+    """
+    sync = getattr(request.app.state, "snapshot_sync", None)
+    if sync is None:
+        return {"enabled": False}
+    return {"enabled": True, **sync.status()}
@@ -1,17 +1,47 @@
-from fastapi import APIRouter, HTTPException
-from fastapi.responses import JSONResponse
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, StreamingResponse
 from datetime import datetime
+from typing import Optional
+import secrets
+import zlib
+import numpy as np
 
 from app.models.schemas import (
+    AlertRequest,
+    AlertResponse,
+    AsOfBatchRequest,
+    AsOfBatchResponse,
     ExchangeRateRequest,
     DirectLookupResponse,
     NaturalLanguageRequest,
     NaturalLanguageResponse,
+    PortfolioRequest,
+    PortfolioResponse,
+    QuoteBatchRequest,
+    QuoteBatchResponse,
+    QuoteRequest,
+    QuoteResponse,
+    SimulationRequest,
+    SimulationResponse,
     ErrorResponse
 )
 from app.services.exchange_rate_service import ExchangeRateService
 from app.services.llm_service import LLMService
-from app.services.currency_data import get_all_currencies
+from app.services.currency_data import CURRENCY_INFO, get_all_currencies
+from app.services.currency_registry import get_currency, search_currencies
+from app.services.snapshot_log import datetime_to_ms, ms_to_iso
+from app.services.export_service import (
+    DEFAULT_CHUNK_DAYS,
+    EXPORT_EXTENSIONS,
+    EXPORT_MEDIA_TYPES,
+    MAX_CHUNK_DAYS,
+    MAX_EXPORT_DAYS,
+    stream_export
+)
+from app.services.portfolio_service import value_portfolio
+from app.services.simulation_service import run_simulation
+from app.core.compression import CompressedBodyCache, compressed_json_response
+from app.core.wire_format import JSON, negotiated_response, request_format
 
 router = APIRouter(prefix="/api/v1/exchange", tags=["exchange"])
 
@@ -19,47 +49,137 @@ router = APIRouter(prefix="/api/v1/exchange", tags=["exchange"])
 exchange_service = ExchangeRateService()
 llm_service = LLMService()
 
+# Encoded bodies for immutable responses (currencies, per-snapshot series)
+body_cache = CompressedBodyCache()
+
 
 @router.get("/currencies")
-async def get_currencies():
+async def get_currencies(request: Request):
     """
     Get all supported currencies
 
     Returns list of all available currencies with metadata
     """
-    return {"currencies": get_all_currencies()}
+    return await compressed_json_response(
+        request,
+        cache=body_cache,
+        cache_key=("currencies",),
+        build=lambda: {"currencies": get_all_currencies()}
+    )
+
+
+@router.get("/currencies/search")
+async def search_currency_registry(
+    q: str = Query(..., min_length=1, max_length=64),
+    limit: int = Query(10, ge=1, le=50)
+):
+    """
+    Autocomplete search over the ISO 4217 currency registry
+
+    Args:
+        q: Code, numeric code, symbol, name or alias (prefix or approximate)
+        limit: Maximum number of results (default: 10)
+
+    Returns matching currencies, best first
+    """
+    return {"query": q, "results": search_currencies(q, limit)}
 
 
 @router.post("/direct", response_model=DirectLookupResponse)
-async def direct_lookup(request: ExchangeRateRequest):
+async def direct_lookup(request: ExchangeRateRequest, http_request: Request):
     """
     Direct currency exchange rate lookup
 
-    Get the exchange rate between two currencies
+    Get the exchange rate between two currencies, plus an exact
+    fixed-point conversion when an amount is given. With as_of, the rate
+    quoted by the snapshot in effect at that time is returned instead.
+    Send Accept: application/msgpack or application/cbor for a binary body
+    with the same schema.
     """
     try:
-        rate = await exchange_service.get_rate(
-            request.base_currency,
-            request.target_currency
-        )
+        exact = None
+        if request.amount is not None:
+            exact = await exchange_service.convert_exact(
+                request.amount,
+                request.base_currency,
+                request.target_currency,
+                request.rounding,
+                request.as_of
+            )
+
+        if request.as_of is not None:
+            rate, snapshot_ms = exchange_service.get_rate_as_of(
+                request.base_currency,
+                request.target_currency,
+                request.as_of
+            )
+            timestamp = ms_to_iso(snapshot_ms)
+        else:
+            if exact is None:
+                rate = await exchange_service.get_rate(
+                    request.base_currency,
+                    request.target_currency
+                )
+            timestamp = datetime.utcnow().isoformat()
+
+        if exact is not None:
+            # Quote the rate the conversion used, not a separate pair fetch
+            # that may come from a different snapshot
+            rate = float(exact["rate"])
 
-        return DirectLookupResponse(
+        response = DirectLookupResponse(
             base_currency=request.base_currency,
             target_currency=request.target_currency,
             rate=rate,
-            timestamp=datetime.utcnow().isoformat()
+            timestamp=timestamp,
+            exact=exact
         )
+        fmt = request_format(http_request)
+        if fmt == JSON:
+            return response
+        return await negotiated_response(http_request, response, fmt=fmt)
 
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except OverflowError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/direct/batch", response_model=AsOfBatchResponse)
+async def direct_lookup_as_of_batch(request: AsOfBatchRequest):
+    """
+    Point-in-time rates for many timestamps
+
+    Resolves every as_of against the snapshot log with one vectorized
+    binary search. Entries before the first snapshot come back as null.
+    """
+    timestamps_ms = np.fromiter(
+        (datetime_to_ms(value) for value in request.as_of),
+        dtype=np.int64,
+        count=len(request.as_of)
+    )
+    rates, snapshot_ms = exchange_service.get_rates_as_of(
+        request.base_currency, request.target_currency, timestamps_ms
+    )
+    known = ~np.isnan(rates)
+
+    return AsOfBatchResponse(
+        base_currency=request.base_currency,
+        target_currency=request.target_currency,
+        rates=[float(r) if ok else None for r, ok in zip(rates, known)],
+        snapshot_timestamps=[ms_to_iso(int(t)) if ok else None for t, ok in zip(snapshot_ms, known)]
+    )
+
+
 @router.post("/nlp", response_model=NaturalLanguageResponse)
-async def natural_language_lookup(request: NaturalLanguageRequest):
+async def natural_language_lookup(request: NaturalLanguageRequest, http_request: Request):
     """
     Natural language exchange rate lookup
 
-    Process a natural language query to determine currency and get exchange rate
+    Process a natural language query to determine currency and get exchange rate.
+    Successful responses honour Accept: application/msgpack or application/cbor.
     """
     SUPPORTED_CURRENCIES = ["USD", "EUR", "GBP"]
 
@@ -95,13 +215,17 @@ async def natural_language_lookup(request: NaturalLanguageRequest):
             base_currency, "ZAR", rate
         )
 
-        return NaturalLanguageResponse(
+        response = NaturalLanguageResponse(
             base_currency=base_currency,
             target_currency="ZAR",
             target_currency_amount=rate,
             friendly_response=friendly_response,
             timestamp=datetime.utcnow().isoformat()
         )
+        fmt = request_format(http_request)
+        if fmt == JSON:
+            return response
+        return await negotiated_response(http_request, response, fmt=fmt)
 
     except HTTPException:
         raise
@@ -117,7 +241,9 @@ async def natural_language_lookup(request: NaturalLanguageRequest):
 
 
 @router.get("/historical/{base_currency}/{target_currency}")
-async def get_historical_rates(base_currency: str, target_currency: str, days: int = 30):
+async def get_historical_rates(
+    request: Request, base_currency: str, target_currency: str, days: int = 30
+):
     """
     Get historical exchange rates for a currency pair
 
@@ -126,18 +252,309 @@ async def get_historical_rates(base_currency: str, target_currency: str, days: i
         target_currency: Target currency code (e.g., ZAR)
         days: Number of days of historical data (default: 30)
 
-    Returns historical rate data
+    Returns historical rate data. JSON bodies list {date, rate} objects;
+    MessagePack and CBOR bodies (by Accept header) carry packed arrays
+    instead: "dates" as int64 days since 1970-01-01 and "rates" as float64
+    """
+    fmt = request_format(request)
+
+    try:
+        # A series is fixed for the lifetime of the snapshot it was built from,
+        # and seeded from it so every format carries the same numbers
+        version = await exchange_service.get_snapshot_version()
+        cache_key = seed = None
+        if version is not None:
+            cache_key = ("historical", base_currency, target_currency, days, version)
+            seed = zlib.crc32(repr(cache_key).encode())
+
+        async def build():
+            payload = {"base_currency": base_currency, "target_currency": target_currency}
+            if fmt == JSON:
+                payload["data"] = await exchange_service.get_historical_rates(
+                    base_currency, target_currency, days, seed
+                )
+            else:
+                payload["dates"], payload["rates"] = await exchange_service.get_historical_series(
+                    base_currency, target_currency, days, seed
+                )
+            return payload
+
+        return await negotiated_response(
+            request, cache=body_cache, cache_key=cache_key, build=build, fmt=fmt
+        )
+
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Historical data generation timed out")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/rates")
+async def get_rate_table(request: Request):
+    """
+    Full rate table from ZAR for the current snapshot
+
+    JSON bodies map currency codes to rates; MessagePack and CBOR bodies
+    (by Accept header) carry "currencies" and a packed float64 "rates" array
     """
+    fmt = request_format(request)
+
     try:
-        historical_data = await exchange_service.get_historical_rates(
-            base_currency, target_currency, days
+        rates = await exchange_service.get_all_rates_from_zar()
+        version = await exchange_service.get_snapshot_version()
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    def build():
+        payload = {"base_currency": "ZAR", "snapshot_version": version}
+        if fmt == JSON:
+            payload["rates"] = rates
+        else:
+            payload["currencies"] = list(rates)
+            payload["rates"] = np.fromiter(rates.values(), dtype=np.float64, count=len(rates))
+        return payload
+
+    return await negotiated_response(
+        request,
+        cache=body_cache,
+        cache_key=("rates", version) if version is not None else None,
+        build=build,
+        fmt=fmt
+    )
+
+
+@router.get("/export")
+async def export_historical_rates(
+    format: str = Query("csv", pattern="^(csv|arrow|parquet)$"),
+    target_currency: str = "ZAR",
+    currencies: Optional[str] = None,
+    days: int = Query(365, ge=0, le=MAX_EXPORT_DAYS),
+    chunk_size: int = Query(DEFAULT_CHUNK_DAYS, ge=1, le=MAX_CHUNK_DAYS),
+    seed: Optional[int] = None
+):
+    """
+    Stream a multi-currency historical dataset as CSV, Arrow IPC or Parquet
+
+    Args:
+        format: csv, arrow (IPC stream) or parquet
+        target_currency: Currency every column is quoted in (default: ZAR)
+        currencies: Comma-separated column projection (default: all supported)
+        days: Number of days of historical data (default: 365)
+        chunk_size: Rows per CSV chunk, Arrow batch or Parquet row group
+        seed: Seed for a reproducible series
+
+    Returns a streamed download with one date column and one column per currency
+    """
+    if currencies:
+        codes = [code.strip().upper() for code in currencies.split(",") if code.strip()]
+    else:
+        codes = [code for code in CURRENCY_INFO if code != target_currency]
+
+    unknown = [code for code in codes + [target_currency] if code not in CURRENCY_INFO]
+    if unknown or not codes:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Unsupported currencies: {', '.join(unknown) or 'none selected'}"
         )
 
-        return {
-            "base_currency": base_currency,
-            "target_currency": target_currency,
-            "data": historical_data
-        }
+    try:
+        current_rates = await exchange_service.get_cross_rates(codes, target_currency)
+        chunks = stream_export(format, codes, current_rates, days, chunk_size, seed)
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    filename = f"rates_{target_currency}_{days}d.{EXPORT_EXTENSIONS[format]}"
+    return StreamingResponse(
+        chunks,
+        media_type=EXPORT_MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'}
+    )
+
+
+@router.get("/analysis/consistency")
+async def get_rate_consistency():
+    """
+    Check the current rate graph for inconsistent quotes and arbitrage cycles
+
+    Builds the log-rate graph from the ZAR snapshot plus any secondary
+    provider tables and runs vectorized negative-cycle detection over it.
+
+    Returns anomalous quotes and cycles whose rate product exceeds 1
+    """
+    try:
+        version = await exchange_service.get_snapshot_version()
+        report = exchange_service.consistency.analyze()
+        return {"snapshot_version": version, **report}
 
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/simulate", response_model=SimulationResponse)
+async def simulate_scenarios(request: SimulationRequest):
+    """
+    Monte Carlo forward scenarios for one or more currencies against a target
+
+    Runs geometric Brownian motion or bootstrapped-return paths from the
+    current snapshot and returns percentile bands per reported step rather
+    than raw paths. Drift and covariance come from the snapshots recorded
+    over lookback_days; until enough are recorded GBM needs a caller-supplied
+    daily volatility, and the request is refused without one. Passing the
+    returned seed reproduces the result.
+    """
+    seed = request.seed if request.seed is not None else secrets.randbits(63)
+    currencies = list(dict.fromkeys(code.upper() for code in request.currencies))
+    target_currency = request.target_currency.upper()
+
+    try:
+        spot = await exchange_service.get_cross_rates(currencies, target_currency)
+        times_ms, history = exchange_service.get_cross_rate_history(
+            currencies, target_currency, request.lookback_days
+        )
+        result = await run_simulation(
+            currencies,
+            spot,
+            horizon_days=request.horizon_days,
+            paths=request.paths,
+            model=request.model,
+            history=history,
+            elapsed_days=times_ms / 86_400_000,
+            volatility=request.volatility,
+            percentiles=request.percentiles,
+            seed=seed,
+            executor=exchange_service.executor
+        )
+
+    except TimeoutError:
+        raise HTTPException(status_code=504, detail="Simulation timed out")
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+    return SimulationResponse(
+        model=request.model,
+        target_currency=target_currency,
+        seed=seed,
+        paths=request.paths,
+        horizon_days=request.horizon_days,
+        **result
+    )
+
+
+@router.post("/portfolio/valuation", response_model=PortfolioResponse)
+async def value_holdings(request: PortfolioRequest):
+    """
+    Value multi-currency holdings now and over a date range
+
+    Computes the valuation series over every recorded snapshot in the
+    window as one matrix-vector product, with per-currency contributions at
+    the end of the window and P&L attributed to each currency.
+    """
+    holdings = {}
+    for code, amount in request.holdings.items():
+        holdings[code.upper()] = holdings.get(code.upper(), 0.0) + amount
+
+    try:
+        # Make sure the latest snapshot is in the log
+        await exchange_service.get_snapshot_version()
+        return value_portfolio(
+            exchange_service.snapshot_log,
+            holdings,
+            request.reporting_currency.upper(),
+            datetime_to_ms(request.start) if request.start else None,
+            datetime_to_ms(request.end) if request.end else None
+        )
+
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@router.post("/alerts", response_model=AlertResponse, status_code=201)
+async def create_alert(request: AlertRequest):
+    """
+    Register a one-shot alert for when a pair crosses a threshold
+
+    "above" fires when the rate rises through the threshold between two
+    snapshots, "below" when it falls through it. Notifications go to the
+    configured sink (ALERT_WEBHOOK_URL, or the in-process queue).
+    """
+    base_currency = request.base_currency.upper()
+    target_currency = request.target_currency.upper()
+    if get_currency(base_currency) is None or get_currency(target_currency) is None:
+        raise HTTPException(status_code=400, detail="Unsupported currency pair")
+
+    try:
+        alert_id = exchange_service.alerts.register(
+            base_currency, target_currency, request.threshold, request.direction
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return AlertResponse(**exchange_service.alerts.get(alert_id))
+
+
+@router.get("/alerts/{alert_id}", response_model=AlertResponse)
+async def get_alert(alert_id: int):
+    """Get an alert and whether it has fired"""
+    alert = exchange_service.alerts.get(alert_id)
+    if alert is None:
+        raise HTTPException(status_code=404, detail="Alert not found")
+    return AlertResponse(**alert)
+
+
+@router.delete("/alerts/{alert_id}", status_code=204)
+async def cancel_alert(alert_id: int):
+    """Cancel an active alert"""
+    if not exchange_service.alerts.cancel(alert_id):
+        raise HTTPException(status_code=404, detail="Active alert not found")
+
+
+@router.post("/quote", response_model=QuoteResponse)
+async def price_quote(request: QuoteRequest):
+    """
+    Customer quote for a currency pair from the current price book
+
+    Returns mid, bid and ask with the pair's spread. With an amount, also
+    the volume-tier fee (charged in the base currency) and how much of the
+    target currency the amount buys at the bid after fees.
+    """
+    try:
+        # Make sure the book reflects the latest snapshot
+        await exchange_service.get_snapshot_version()
+        return exchange_service.pricing.quote(
+            request.base_currency.upper(), request.target_currency.upper(), request.amount
+        )
+
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@router.post("/quote/batch", response_model=QuoteBatchResponse)
+async def price_quote_batch(request: QuoteBatchRequest):
+    """
+    Customer quotes for many pairs and amounts in one vectorized pass
+
+    All quotes come from the same price book, so they are mutually
+    consistent even if a new snapshot lands while the batch is priced.
+    """
+    try:
+        await exchange_service.get_snapshot_version()
+        quotes = exchange_service.pricing.quote_batch(
+            [quote.base_currency.upper() for quote in request.quotes],
+            [quote.target_currency.upper() for quote in request.quotes],
+            [quote.amount for quote in request.quotes]
+        )
+        return {"quotes": quotes}
+
+    except LookupError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
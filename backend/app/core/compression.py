@@ -0,0 +1,191 @@
+"""Content-encoding negotiation and pre-compressed response bodies"""
+import gzip
+import inspect
+import json
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional codec
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional codec
+    zstandard = None
+
+
+# Dynamic bodies smaller than this are cheaper to send than to compress
+MIN_COMPRESS_SIZE = 1024
+
+CODECS: Dict[str, Callable[[bytes], bytes]] = {
+    "gzip": lambda data: gzip.compress(data, compresslevel=6),
+}
+if brotli is not None:
+    CODECS["br"] = lambda data: brotli.compress(data, quality=5)
+if zstandard is not None:
+    _zstd_compressor = zstandard.ZstdCompressor(level=3)
+    CODECS["zstd"] = _zstd_compressor.compress
+
+# Server preference when the client weights several codecs equally
+PREFERENCE = ["zstd", "br", "gzip"]
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> str:
+    """
+    Pick the best supported content-coding for an Accept-Encoding header
+
+    Args:
+        accept_encoding: Raw Accept-Encoding header value
+
+    Returns:
+        Codec name from CODECS, or "identity" when nothing usable is offered
+    """
+    if not accept_encoding:
+        return "identity"
+
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        token, _, params = part.strip().partition(";")
+        token = token.strip().lower()
+        if not token:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[token] = q
+
+    wildcard = weights.get("*")
+    best, best_q = "identity", 0.0
+    for codec in PREFERENCE:
+        if codec not in CODECS:
+            continue
+        q = weights.get(codec, wildcard if wildcard is not None else 0.0)
+        if q > best_q:
+            best, best_q = codec, q
+    return best
+
+
+def encode_json(payload: Any) -> bytes:
+    """Serialize a payload the same way FastAPI's JSONResponse does"""
+    return json.dumps(
+        payload, ensure_ascii=False, allow_nan=False, separators=(",", ":")
+    ).encode("utf-8")
+
+
+class CompressedBodyCache:
+    """Bounded LRU of encoded response bodies keyed by (key, encoding)"""
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[Hashable, str], bytes]" = OrderedDict()
+
+    def get(self, key: Hashable, encoding: str) -> Optional[bytes]:
+        entry = self._entries.get((key, encoding))
+        if entry is not None:
+            self._entries.move_to_end((key, encoding))
+        return entry
+
+    def put(self, key: Hashable, encoding: str, body: bytes) -> None:
+        self._entries[(key, encoding)] = body
+        self._entries.move_to_end((key, encoding))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+async def _resolve(payload: Any, build: Optional[Callable[[], Any]]) -> Any:
+    if build is None:
+        return payload
+    result = build()
+    if inspect.isawaitable(result):
+        result = await result
+    return result
+
+
+def _build_response(body: bytes, encoding: str, media_type: str, vary: str) -> Response:
+    headers = {"Vary": vary}
+    if encoding != "identity":
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+async def compressed_response(
+    request: Request,
+    payload: Any = None,
+    cache: Optional[CompressedBodyCache] = None,
+    cache_key: Optional[Hashable] = None,
+    build: Optional[Callable[[], Any]] = None,
+    encoder: Callable[[Any], bytes] = encode_json,
+    media_type: str = "application/json",
+    vary: str = "Accept-Encoding",
+) -> Response:
+    """
+    Build a response serialized by `encoder` and encoded for Accept-Encoding
+
+    Immutable bodies pass a cache and cache_key so they are serialized and
+    compressed once per encoding; `build` is only called on a cache miss.
+    Uncached bodies are compressed on the fly above MIN_COMPRESS_SIZE.
+
+    Args:
+        request: Incoming request (for the Accept-Encoding header)
+        payload: Serializable body
+        cache: Byte cache for immutable bodies
+        cache_key: Key identifying the immutable body
+        build: Lazy (sync or async) payload factory used on a cache miss
+        encoder: Payload serializer
+        media_type: Content-Type of the serialized body
+        vary: Vary header value
+
+    Returns:
+        Response with Content-Encoding and Vary headers set
+    """
+    encoding = negotiate_encoding(request.headers.get("accept-encoding"))
+    cacheable = cache is not None and cache_key is not None
+
+    if cacheable:
+        body = cache.get(cache_key, encoding)
+        if body is not None:
+            return _build_response(body, encoding, media_type, vary)
+        raw = cache.get(cache_key, "identity")
+        if raw is None:
+            raw = encoder(await _resolve(payload, build))
+            cache.put(cache_key, "identity", raw)
+        if encoding != "identity":
+            body = CODECS[encoding](raw)
+            cache.put(cache_key, encoding, body)
+            return _build_response(body, encoding, media_type, vary)
+        return _build_response(raw, encoding, media_type, vary)
+
+    raw = encoder(await _resolve(payload, build))
+    if encoding == "identity" or len(raw) < MIN_COMPRESS_SIZE:
+        return _build_response(raw, "identity", media_type, vary)
+    return _build_response(CODECS[encoding](raw), encoding, media_type, vary)
+
+
+async def compressed_json_response(
+    request: Request,
+    payload: Any = None,
+    cache: Optional[CompressedBodyCache] = None,
+    cache_key: Optional[Hashable] = None,
+    build: Optional[Callable[[], Any]] = None,
+) -> Response:
+    """
+    Build a JSON response encoded for the client's Accept-Encoding
+
+    See compressed_response for the caching behaviour.
+    """
+    return await compressed_response(request, payload, cache, cache_key, build)
@@ -0,0 +1,301 @@
+"""Bounded thread/process executor for CPU-bound work off the event loop"""
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np
+
+
+class SharedArray(NamedTuple):
+    """Picklable handle to an ndarray stored in a shared memory block"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def _untrack(block: shared_memory.SharedMemory) -> None:
+    # The creating process owns unlinking; stop this process's resource
+    # tracker from unlinking (and warning about) blocks handed to the parent
+    try:
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(block._name, "shared_memory")
+    except Exception:
+        pass
+
+
+def share_array(array: np.ndarray) -> Tuple[SharedArray, shared_memory.SharedMemory]:
+    """Copy an array into a new shared memory block"""
+    array = np.ascontiguousarray(array)
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)[...] = array
+    return SharedArray(block.name, array.shape, array.dtype.str), block
+
+
+def attach_array(handle: SharedArray) -> Tuple[np.ndarray, shared_memory.SharedMemory]:
+    """Map a shared array without copying; close the block when done"""
+    block = shared_memory.SharedMemory(name=handle.name)
+    return np.ndarray(handle.shape, dtype=np.dtype(handle.dtype), buffer=block.buf), block
+
+
+def _run_with_shared_arrays(func: Callable, args: Tuple) -> Any:
+    """Worker-side trampoline: attach array arguments, share an array result"""
+    blocks = []
+    resolved = []
+    for arg in args:
+        if isinstance(arg, SharedArray):
+            array, block = attach_array(arg)
+            blocks.append(block)
+            resolved.append(array)
+        else:
+            resolved.append(arg)
+    try:
+        result = func(*resolved)
+        if isinstance(result, np.ndarray):
+            handle, block = share_array(result)
+            _untrack(block)
+            block.close()
+            return handle
+        return result
+    finally:
+        del resolved
+        for block in blocks:
+            block.close()
+
+
+def _release_shared_result(future) -> None:
+    """Unlink the shared result of a worker call nobody is waiting for"""
+    if future.cancelled() or future.exception() is not None:
+        return
+    result = future.result()
+    if isinstance(result, SharedArray):
+        try:
+            block = shared_memory.SharedMemory(name=result.name)
+        except FileNotFoundError:
+            return
+        block.close()
+        block.unlink()
+
+
+class ComputeExecutor:
+    """
+    Run CPU-bound callables inline, in a thread pool, or in a process pool
+
+    Work below `threshold` (in caller-supplied size units, e.g. rows) runs
+    inline since dispatch would cost more than it saves. Larger work goes to
+    a bounded pool; `cpu_bound` work goes to the process pool when one is
+    configured, with ndarray arguments and results moved through shared
+    memory instead of being pickled. Awaiting callers can time out or be
+    cancelled; queued work is then cancelled before it starts, and running
+    work keeps its slot until it finishes.
+    """
+
+    def __init__(
+        self,
+        kind: str = "thread",
+        max_workers: int = 4,
+        threshold: int = 1000,
+        timeout: float = 30.0
+    ):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Unsupported executor kind: {kind}")
+        self.kind = kind
+        self.max_workers = max_workers
+        self.threshold = threshold
+        self.timeout = timeout
+        self._threads: Optional[ThreadPoolExecutor] = None
+        self._processes: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._metrics = {
+            "inline": 0,
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "active": 0,
+            "waiting": 0,
+            "max_active": 0,
+            "max_waiting": 0,
+            "busy_seconds": 0.0
+        }
+
+    @classmethod
+    def from_env(cls) -> "ComputeExecutor":
+        """Configure from COMPUTE_EXECUTOR, COMPUTE_WORKERS, COMPUTE_THRESHOLD and COMPUTE_TIMEOUT"""
+        return cls(
+            kind=os.getenv("COMPUTE_EXECUTOR", "thread"),
+            max_workers=int(os.getenv("COMPUTE_WORKERS", str(min(4, os.cpu_count() or 1)))),
+            threshold=int(os.getenv("COMPUTE_THRESHOLD", "1000")),
+            timeout=float(os.getenv("COMPUTE_TIMEOUT", "30"))
+        )
+
+    def _pool(self, cpu_bound: bool) -> Executor:
+        if cpu_bound and self.kind == "process":
+            if self._processes is None:
+                self._processes = ProcessPoolExecutor(max_workers=self.max_workers)
+            return self._processes
+        if self._threads is None:
+            self._threads = ThreadPoolExecutor(
+                max_workers=self.max_workers, thread_name_prefix="compute"
+            )
+        return self._threads
+
+    async def run(
+        self,
+        func: Callable,
+        *args,
+        size: int = 0,
+        cpu_bound: bool = False,
+        timeout: Optional[float] = None
+    ) -> Any:
+        """
+        Run func(*args), offloading when size reaches the threshold
+
+        Args:
+            func: Callable to run (module-level if it may go to a process)
+            *args: Positional arguments
+            size: Work size used for the inline/offload decision
+            cpu_bound: Prefer the process pool when configured
+            timeout: Seconds to wait (defaults to the executor timeout)
+
+        Returns:
+            The callable's result
+
+        Raises:
+            TimeoutError: If the work does not finish in time
+        """
+        if size < self.threshold:
+            self._metrics["inline"] += 1
+            return func(*args)
+
+        if self._slots is None:
+            self._slots = asyncio.Semaphore(self.max_workers)
+        timeout = self.timeout if timeout is None else timeout
+        loop = asyncio.get_running_loop()
+        use_processes = cpu_bound and self.kind == "process"
+        metrics = self._metrics
+
+        metrics["waiting"] += 1
+        metrics["max_waiting"] = max(metrics["max_waiting"], metrics["waiting"])
+        deadline = loop.time() + timeout
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout)
+        except asyncio.TimeoutError:
+            metrics["timeouts"] += 1
+            raise
+        except asyncio.CancelledError:
+            metrics["cancelled"] += 1
+            raise
+        finally:
+            metrics["waiting"] -= 1
+
+        blocks: List[shared_memory.SharedMemory] = []
+        metrics["submitted"] += 1
+        metrics["active"] += 1
+        metrics["max_active"] = max(metrics["max_active"], metrics["active"])
+        started = time.perf_counter()
+        slots = self._slots
+
+        def release() -> None:
+            metrics["active"] -= 1
+            metrics["busy_seconds"] += time.perf_counter() - started
+            slots.release()
+            for block in blocks:
+                block.close()
+                block.unlink()
+
+        future = None
+        abandoned = False
+        try:
+            if use_processes:
+                shared_args = []
+                for arg in args:
+                    if isinstance(arg, np.ndarray):
+                        handle, block = share_array(arg)
+                        blocks.append(block)
+                        shared_args.append(handle)
+                    else:
+                        shared_args.append(arg)
+                future = self._pool(True).submit(_run_with_shared_arrays, func, tuple(shared_args))
+            else:
+                future = self._pool(False).submit(func, *args)
+
+            result = await asyncio.wait_for(
+                asyncio.wrap_future(future), max(0.0, deadline - loop.time())
+            )
+            if use_processes and isinstance(result, SharedArray):
+                array, block = attach_array(result)
+                result = array.copy()
+                del array
+                block.close()
+                block.unlink()
+            metrics["completed"] += 1
+            return result
+
+        except asyncio.TimeoutError:
+            metrics["timeouts"] += 1
+            abandoned = self._abandon(future, use_processes, loop, release)
+            raise
+        except asyncio.CancelledError:
+            metrics["cancelled"] += 1
+            abandoned = self._abandon(future, use_processes, loop, release)
+            raise
+        except Exception:
+            metrics["failed"] += 1
+            raise
+        finally:
+            if not abandoned:
+                release()
+
+    @staticmethod
+    def _abandon(future, use_processes: bool, loop, release: Callable[[], None]) -> bool:
+        """
+        Hand a timed-out or cancelled call's cleanup over to its worker
+
+        A worker already running cannot be cancelled: it keeps its slot (and
+        counts as active) until it finishes, so the pool bound still holds,
+        and its shared-memory result, which only we unlink, is cleaned up
+        when it arrives.
+
+        Returns:
+            True if release runs when the worker finishes, False if the
+            caller should release now
+        """
+        if future is None or future.cancel():
+            return False
+        if use_processes:
+            future.add_done_callback(_release_shared_result)
+
+        def done(_) -> None:
+            try:
+                loop.call_soon_threadsafe(release)
+            except RuntimeError:
+                pass  # Event loop already closed
+
+        future.add_done_callback(done)
+        return True
+
+    def metrics(self) -> Dict[str, Any]:
+        """Pool configuration, counters and current saturation"""
+        return {
+            "kind": self.kind,
+            "max_workers": self.max_workers,
+            "threshold": self.threshold,
+            "timeout": self.timeout,
+            **self._metrics,
+            "busy_seconds": round(self._metrics["busy_seconds"], 6),
+            "saturation": self._metrics["active"] / self.max_workers
+        }
+
+    def shutdown(self) -> None:
+        for pool in (self._threads, self._processes):
+            if pool is not None:
+                pool.shutdown(wait=False, cancel_futures=True)
+        self._threads = self._processes = None
+        self._slots = None
+
+
+compute_executor = ComputeExecutor.from_env()
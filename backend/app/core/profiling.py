@@ -0,0 +1,161 @@
+"""Sampling profiler and event-loop lag monitor for production debugging"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter, deque
+from typing import Dict, List, Optional
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def _stack_of(frame, max_depth: int = 128) -> List[str]:
+    """Frames root-first, as flamegraph tools expect"""
+    stack = []
+    while frame is not None and len(stack) < max_depth:
+        stack.append(_frame_label(frame))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+
+def sample_stacks(seconds: float, rate_hz: float = 100.0) -> Counter:
+    """
+    Sample every thread's stack at a fixed rate via sys._current_frames
+
+    Meant to run off the event loop (e.g. in a worker thread) so the loop
+    itself is among the threads sampled.
+
+    Args:
+        seconds: How long to sample
+        rate_hz: Samples per second
+
+    Returns:
+        Counter of collapsed stacks ("thread;outer;...;inner") to sample counts
+    """
+    interval = 1.0 / rate_hz
+    own_id = threading.get_ident()
+    counts: Counter = Counter()
+    deadline = time.monotonic() + seconds
+
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == own_id:
+                continue
+            stack = _stack_of(frame)
+            counts[";".join([names.get(thread_id, str(thread_id))] + stack)] += 1
+        time.sleep(interval)
+
+    return counts
+
+
+def collapse(counts: Counter) -> str:
+    """Render counts in collapsed-stack format for flamegraph.pl / speedscope"""
+    return "".join(f"{stack} {count}\n" for stack, count in counts.most_common())
+
+
+class LoopLagMonitor:
+    """
+    Continuously measure event-loop scheduling lag and catch blocking stacks
+
+    A heartbeat coroutine sleeps for `interval` and records how late it
+    wakes up. A watchdog thread notices when the heartbeat stops and
+    captures the loop thread's stack while it is still blocked, so each
+    recorded stall comes with the code that caused it.
+    """
+
+    def __init__(self, interval: float = 0.05, threshold: float = 0.1, max_events: int = 100):
+        self.interval = interval
+        self.threshold = threshold
+        self.events: deque = deque(maxlen=max_events)
+        self.samples = 0
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._pending_stack: Optional[List[str]] = None
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self) -> None:
+        """Start monitoring the running event loop"""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    async def _heartbeat(self) -> None:
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self._last_beat = now
+            self.record_lag(max(0.0, now - expected))
+
+    def record_lag(self, lag: float) -> None:
+        """Account one heartbeat; lags over threshold become events"""
+        self.samples += 1
+        self.total_lag += lag
+        self.max_lag = max(self.max_lag, lag)
+        if lag < self.threshold:
+            return
+        with self._lock:
+            stack, self._pending_stack = self._pending_stack, None
+        self.events.append({
+            "detected_at": time.time(),
+            "duration_ms": round(lag * 1000, 3),
+            "stack": stack
+        })
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.interval):
+            stalled = time.monotonic() - self._last_beat - self.interval
+            if stalled < self.threshold:
+                continue
+            with self._lock:
+                if self._pending_stack is not None:
+                    continue
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._pending_stack = _stack_of(frame)
+
+    def snapshot(self) -> Dict:
+        """Lag statistics and the most recent blocking events"""
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "threshold_ms": self.threshold * 1000,
+            "samples": self.samples,
+            "mean_lag_ms": round(self.total_lag / self.samples * 1000, 3) if self.samples else 0.0,
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+            "events": list(self.events)
+        }
+
+
+loop_monitor = LoopLagMonitor(
+    threshold=float(os.getenv("LOOP_LAG_THRESHOLD_MS", "100")) / 1000
+)
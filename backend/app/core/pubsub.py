@@ -0,0 +1,159 @@
+"""Pub/sub brokers and leases for coordinating API nodes"""
+import asyncio
+import time
+from typing import AsyncIterator, Callable, Dict, List, Optional, Tuple
+
+try:
+    import redis.asyncio as redis_asyncio
+except ImportError:  # pragma: no cover - optional broker
+    redis_asyncio = None
+
+
+class Subscription:
+    """
+    Active channel subscription
+
+    Iterate with async for to receive message bodies; close() unsubscribes.
+    The subscription is live as soon as subscribe() returns, so nothing
+    published afterwards is missed.
+    """
+
+    def __init__(self, messages: AsyncIterator[bytes], close: Callable):
+        self._messages = messages
+        self._close = close
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        return self._messages
+
+    async def close(self) -> None:
+        await self._close()
+
+
+class InMemoryBroker:
+    """
+    Single-process stand-in for a Redis-protocol broker
+
+    Implements the same publish/subscribe and lease operations, so several
+    nodes (services) in one process, as in tests or local development,
+    coordinate exactly as they would through Redis.
+    """
+
+    def __init__(self):
+        self._subscribers: Dict[str, List[asyncio.Queue]] = {}
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    async def publish(self, channel: str, message: bytes) -> int:
+        """Deliver a message to every current subscriber; returns their number"""
+        queues = self._subscribers.get(channel, [])
+        for subscriber in queues:
+            subscriber.put_nowait(message)
+        return len(queues)
+
+    async def subscribe(self, channel: str) -> Subscription:
+        """Subscribe to a channel; messages published from now on are delivered"""
+        subscriber: asyncio.Queue = asyncio.Queue()
+        queues = self._subscribers.setdefault(channel, [])
+        queues.append(subscriber)
+
+        async def messages() -> AsyncIterator[bytes]:
+            while True:
+                yield await subscriber.get()
+
+        async def close() -> None:
+            if subscriber in queues:
+                queues.remove(subscriber)
+
+        return Subscription(messages(), close)
+
+    async def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        """
+        Take or renew a lease, like SET key owner NX PX plus an owner-checked PEXPIRE
+
+        Returns:
+            True if owner holds the lease for the next ttl seconds
+        """
+        now = time.monotonic()
+        holder = self._leases.get(key)
+        if holder is None or holder[1] <= now or holder[0] == owner:
+            self._leases[key] = (owner, now + ttl)
+            return True
+        return False
+
+    async def release_lease(self, key: str, owner: str) -> None:
+        """Give up a lease if owner still holds it"""
+        holder = self._leases.get(key)
+        if holder is not None and holder[0] == owner:
+            del self._leases[key]
+
+    async def close(self) -> None:
+        pass
+
+
+# Renew only while still the holder, so an expired leader cannot extend a
+# lease another node has since taken
+_RENEW_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisBroker:
+    """Broker over any Redis-protocol server (Redis, Valkey, KeyDB, ...)"""
+
+    def __init__(self, url: str):
+        if redis_asyncio is None:
+            raise RuntimeError("The redis package is required for a redis:// snapshot broker")
+        self.client = redis_asyncio.Redis.from_url(url)
+
+    async def publish(self, channel: str, message: bytes) -> int:
+        return await self.client.publish(channel, message)
+
+    async def subscribe(self, channel: str) -> Subscription:
+        pubsub = self.client.pubsub()
+        await pubsub.subscribe(channel)
+
+        async def messages() -> AsyncIterator[bytes]:
+            async for message in pubsub.listen():
+                if message["type"] == "message":
+                    yield message["data"]
+
+        return Subscription(messages(), pubsub.aclose)
+
+    async def acquire_lease(self, key: str, owner: str, ttl: float) -> bool:
+        ttl_ms = max(int(ttl * 1000), 1)
+        if await self.client.set(key, owner, nx=True, px=ttl_ms):
+            return True
+        return bool(await self.client.eval(_RENEW_SCRIPT, 1, key, owner, ttl_ms))
+
+    async def release_lease(self, key: str, owner: str) -> None:
+        await self.client.eval(_RELEASE_SCRIPT, 1, key, owner)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def broker_from_url(url: Optional[str]):
+    """
+    Broker for a SNAPSHOT_BROKER_URL value
+
+    "memory" gives the in-process stand-in and redis://, rediss:// or
+    unix:// URLs a Redis-protocol client. Unset disables snapshot sync.
+
+    Raises:
+        ValueError: For any other URL scheme
+    """
+    if not url:
+        return None
+    if url == "memory":
+        return InMemoryBroker()
+    if url.startswith(("redis://", "rediss://", "unix://")):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported snapshot broker URL: {url}")
@@ -0,0 +1,389 @@
+"""Lightweight request tracing with batched span export"""
+import functools
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+
+class Span:
+    """A timed unit of work within a trace"""
+
+    __slots__ = (
+        "trace_id", "span_id", "parent_id", "name", "sampled",
+        "start_ns", "end_ns", "attributes", "status", "_tracer"
+    )
+
+    def __init__(
+        self,
+        tracer: "Tracer",
+        name: str,
+        trace_id: str,
+        parent_id: Optional[str],
+        sampled: bool,
+        attributes: Optional[Dict[str, Any]] = None
+    ):
+        self._tracer = tracer
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.sampled = sampled
+        self.start_ns = time.time_ns()
+        self.end_ns: Optional[int] = None
+        self.attributes = dict(attributes) if attributes else {}
+        self.status = "ok"
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.sampled else '00'}"
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def end(self) -> None:
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+            if self.sampled:
+                self._tracer.processor.on_end(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "name": self.name,
+            "start_ns": self.start_ns,
+            "end_ns": self.end_ns,
+            "duration_ms": (self.end_ns - self.start_ns) / 1e6 if self.end_ns else None,
+            "attributes": self.attributes,
+            "status": self.status
+        }
+
+
+class _NoopSpan:
+    """Stand-in yielded when the current request is not sampled"""
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+class JsonlFileExporter:
+    """Append spans to a local file, one JSON object per line"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def export(self, spans: List[Span]) -> None:
+        lines = "".join(json.dumps(span.to_dict(), default=str) + "\n" for span in spans)
+        with open(self.path, "a", encoding="utf-8") as handle:
+            handle.write(lines)
+
+
+class OTLPHttpExporter:
+    """POST spans as OTLP/JSON to a collector (or any stand-in accepting it)"""
+
+    def __init__(self, endpoint: str, service_name: str = "zar-exchange-hub", timeout: float = 5.0):
+        self.endpoint = endpoint
+        self.service_name = service_name
+        self.timeout = timeout
+
+    def _encode(self, spans: List[Span]) -> Dict[str, Any]:
+        def attributes(values: Dict[str, Any]):
+            return [{"key": k, "value": {"stringValue": str(v)}} for k, v in values.items()]
+
+        return {
+            "resourceSpans": [{
+                "resource": {"attributes": attributes({"service.name": self.service_name})},
+                "scopeSpans": [{
+                    "scope": {"name": "app.core.tracing"},
+                    "spans": [
+                        {
+                            "traceId": span.trace_id,
+                            "spanId": span.span_id,
+                            "parentSpanId": span.parent_id or "",
+                            "name": span.name,
+                            "kind": 2 if span.parent_id is None else 1,
+                            "startTimeUnixNano": str(span.start_ns),
+                            "endTimeUnixNano": str(span.end_ns),
+                            "attributes": attributes(span.attributes),
+                            "status": {"code": 2 if span.status == "error" else 1}
+                        }
+                        for span in spans
+                    ]
+                }]
+            }]
+        }
+
+    def export(self, spans: List[Span]) -> None:
+        response = httpx.post(self.endpoint, json=self._encode(spans), timeout=self.timeout)
+        response.raise_for_status()
+
+
+class InMemoryExporter:
+    """Keep exported spans in a list (tests and local debugging)"""
+
+    def __init__(self):
+        self.spans: List[Span] = []
+
+    def export(self, spans: List[Span]) -> None:
+        self.spans.extend(spans)
+
+
+class BatchSpanProcessor:
+    """
+    Queue finished spans and export them in batches from a background thread
+
+    Export never runs on the event loop. When the queue is full new spans
+    are dropped and counted rather than blocking the request.
+    """
+
+    def __init__(
+        self,
+        exporter=None,
+        max_batch_size: int = 512,
+        max_queue_size: int = 8192,
+        flush_interval: float = 2.0
+    ):
+        self.exporter = exporter
+        self.max_batch_size = max_batch_size
+        self.max_queue_size = max_queue_size
+        self.flush_interval = flush_interval
+        self.dropped = 0
+        self.export_errors = 0
+        self._queue: deque = deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="span-exporter", daemon=True
+                    )
+                    self._thread.start()
+
+    def on_end(self, span: Span) -> None:
+        if self.exporter is None:
+            return
+        if len(self._queue) >= self.max_queue_size:
+            self.dropped += 1
+            return
+        self._queue.append(span)
+        self._ensure_worker()
+        if len(self._queue) >= self.max_batch_size:
+            self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Export everything queued so far"""
+        while self._queue:
+            batch = []
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return
+            try:
+                self.exporter.export(batch)
+            except Exception:
+                self.export_errors += 1
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        if self.exporter is not None:
+            self.flush()
+
+
+class Tracer:
+    """Creates spans and carries the active one through async code via contextvars"""
+
+    def __init__(self, processor: Optional[BatchSpanProcessor] = None, sample_rate: float = 0.1):
+        self.processor = processor or BatchSpanProcessor()
+        self.sample_rate = sample_rate
+
+    @classmethod
+    def from_env(cls) -> "Tracer":
+        """
+        Configure from TRACE_EXPORTER (none|jsonl|otlp), TRACE_FILE,
+        OTLP_ENDPOINT and TRACE_SAMPLE_RATE
+        """
+        exporter_name = os.getenv("TRACE_EXPORTER", "none").lower()
+        exporter = None
+        if exporter_name == "jsonl":
+            exporter = JsonlFileExporter(os.getenv("TRACE_FILE", "traces.jsonl"))
+        elif exporter_name == "otlp":
+            exporter = OTLPHttpExporter(
+                os.getenv("OTLP_ENDPOINT", "http://localhost:4318/v1/traces")
+            )
+        sample_rate = float(os.getenv("TRACE_SAMPLE_RATE", "0.1"))
+        return cls(BatchSpanProcessor(exporter), sample_rate)
+
+    def start_trace(self, name: str, traceparent: Optional[str] = None) -> Span:
+        """
+        Start a root span, continuing an incoming W3C traceparent when valid
+
+        An upstream sampling decision is honoured; otherwise the trace is
+        sampled with probability sample_rate.
+        """
+        match = _TRACEPARENT.match(traceparent.strip().lower()) if traceparent else None
+        if match:
+            trace_id, parent_id, flags = match.groups()
+            sampled = bool(int(flags, 16) & 1)
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            sampled = random.random() < self.sample_rate
+        return Span(self, name, trace_id, parent_id, sampled)
+
+    @contextmanager
+    def activate(self, span: Span):
+        """Make span the current parent for the duration of the block"""
+        token = _current_span.set(span)
+        try:
+            yield span
+        finally:
+            _current_span.reset(token)
+
+    def span(self, name: str, **attributes) -> "_SpanScope":
+        """
+        Record a child span of the current span (usable with `with` or `async with`)
+
+        Outside a sampled trace the scope yields a shared no-op, so
+        instrumented code costs one context variable lookup.
+        """
+        return _SpanScope(self, name, attributes)
+
+    def current_span(self):
+        """The active sampled span, or a no-op that ignores attributes"""
+        span = _current_span.get()
+        return span if span is not None and span.sampled else _NOOP_SPAN
+
+    def traced(self, name: str):
+        """Decorator recording each call of an async function as a span"""
+        def decorator(func):
+            @functools.wraps(func)
+            async def wrapper(*args, **kwargs):
+                with self.span(name):
+                    return await func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def shutdown(self) -> None:
+        self.processor.shutdown()
+
+
+class _SpanScope:
+    """Context manager opening a child span on entry and ending it on exit"""
+
+    __slots__ = ("_tracer", "_name", "_attributes", "_span", "_token")
+
+    def __init__(self, tracer: Tracer, name: str, attributes: Dict[str, Any]):
+        self._tracer = tracer
+        self._name = name
+        self._attributes = attributes
+        self._span: Optional[Span] = None
+        self._token = None
+
+    def __enter__(self):
+        parent = _current_span.get()
+        if parent is None or not parent.sampled:
+            return _NOOP_SPAN
+        self._span = Span(
+            self._tracer, self._name, parent.trace_id, parent.span_id, True, self._attributes
+        )
+        self._token = _current_span.set(self._span)
+        return self._span
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._span is None:
+            return False
+        if exc is not None:
+            self._span.status = "error"
+            self._span.set_attribute("error", repr(exc))
+        _current_span.reset(self._token)
+        self._span.end()
+        return False
+
+    async def __aenter__(self):
+        return self.__enter__()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        return self.__exit__(exc_type, exc, tb)
+
+
+tracer = Tracer.from_env()
+
+
+class TracingMiddleware:
+    """
+    ASGI middleware opening a root span per HTTP request
+
+    The trace ID is returned in X-Trace-Id and a W3C traceparent header on
+    every response, sampled or not, so slow requests can be looked up.
+    """
+
+    def __init__(self, app, tracer: Tracer = tracer):
+        self.app = app
+        self.tracer = tracer
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        traceparent = None
+        for key, value in scope.get("headers", []):
+            if key == b"traceparent":
+                traceparent = value.decode("latin-1")
+                break
+
+        root = self.tracer.start_trace(f"{scope['method']} {scope['path']}", traceparent)
+        root.set_attribute("http.method", scope["method"])
+        root.set_attribute("http.target", scope["path"])
+
+        async def send_with_trace(message):
+            if message["type"] == "http.response.start":
+                root.set_attribute("http.status_code", message["status"])
+                headers = list(message.get("headers", []))
+                headers.append((b"x-trace-id", root.trace_id.encode()))
+                headers.append((b"traceparent", root.traceparent.encode()))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        with self.tracer.activate(root):
+            try:
+                await self.app(scope, receive, send_with_trace)
+            except BaseException as e:
+                root.status = "error"
+                root.set_attribute("error", repr(e))
+                raise
+            finally:
+                root.end()
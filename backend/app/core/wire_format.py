@@ -0,0 +1,216 @@
+"""Accept-header negotiation of JSON, MessagePack and CBOR response bodies"""
+import json
+from typing import Any, Callable, Dict, Hashable, Optional
+
+import numpy as np
+from fastapi import Request
+from fastapi.responses import Response
+from pydantic import BaseModel
+
+from app.core.compression import CompressedBodyCache, compressed_response, encode_json
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional format
+    msgpack = None
+
+try:
+    import cbor2
+except ImportError:  # pragma: no cover - optional format
+    cbor2 = None
+
+
+JSON, MSGPACK, CBOR = "json", "msgpack", "cbor"
+
+MEDIA_TYPES = {
+    JSON: "application/json",
+    MSGPACK: "application/msgpack",
+    CBOR: "application/cbor",
+}
+_ACCEPTED = {
+    "application/json": JSON,
+    "application/msgpack": MSGPACK,
+    "application/x-msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/cbor": CBOR,
+}
+# Server preference when the client weights several formats equally
+PREFERENCE = [MSGPACK, CBOR, JSON]
+
+# MessagePack extension types for packed little-endian arrays
+MSGPACK_EXT_FLOAT64 = 1
+MSGPACK_EXT_INT64 = 2
+# RFC 8746 typed-array tags: float64 and int64, little endian
+CBOR_TAG_FLOAT64_LE = 86
+CBOR_TAG_INT64_LE = 79
+
+
+def available_formats() -> list:
+    formats = [JSON]
+    if msgpack is not None:
+        formats.append(MSGPACK)
+    if cbor2 is not None:
+        formats.append(CBOR)
+    return formats
+
+
+def negotiate_format(accept: Optional[str]) -> str:
+    """
+    Pick the response format for an Accept header
+
+    Wildcards and missing headers get JSON, so browsers and existing
+    clients are unaffected; binary formats must be asked for by name.
+
+    Args:
+        accept: Raw Accept header value
+
+    Returns:
+        One of JSON, MSGPACK or CBOR
+    """
+    if not accept:
+        return JSON
+
+    weights: Dict[str, float] = {}
+    for part in accept.split(","):
+        media, _, params = part.strip().partition(";")
+        media = media.strip().lower()
+        q = 1.0
+        for param in params.split(";"):
+            param = param.strip()
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        name = _ACCEPTED.get(media)
+        if name is None and media in ("*/*", "application/*"):
+            name = JSON
+        if name is not None:
+            weights[name] = max(weights.get(name, 0.0), q)
+
+    supported = available_formats()
+    best, best_q = JSON, 0.0
+    for name in PREFERENCE:
+        q = weights.get(name, 0.0)
+        if name in supported and q > best_q:
+            best, best_q = name, q
+    return best
+
+
+def _packed(value: np.ndarray):
+    if value.dtype.kind == "f":
+        return "float64", value.astype("<f8", copy=False).tobytes()
+    if value.dtype.kind in "iu":
+        return "int64", value.astype("<i8", copy=False).tobytes()
+    raise TypeError(f"Cannot pack array of dtype {value.dtype}")
+
+
+def _msgpack_default(value):
+    if isinstance(value, np.ndarray):
+        kind, data = _packed(value)
+        return msgpack.ExtType(MSGPACK_EXT_FLOAT64 if kind == "float64" else MSGPACK_EXT_INT64, data)
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _cbor_default(encoder, value):
+    if isinstance(value, np.ndarray):
+        kind, data = _packed(value)
+        tag = CBOR_TAG_FLOAT64_LE if kind == "float64" else CBOR_TAG_INT64_LE
+        encoder.encode(cbor2.CBORTag(tag, data))
+    elif isinstance(value, np.generic):
+        encoder.encode(value.item())
+    else:
+        raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_body(payload: Any, fmt: str) -> bytes:
+    """
+    Serialize a payload in the given format
+
+    NumPy arrays inside the payload go out as packed little-endian arrays:
+    MessagePack ext types 1 (float64) and 2 (int64), or RFC 8746 CBOR
+    typed-array tags 86 and 79. JSON payloads must not contain arrays.
+    """
+    if fmt == MSGPACK:
+        return msgpack.packb(payload, default=_msgpack_default, use_bin_type=True)
+    if fmt == CBOR:
+        return cbor2.dumps(payload, default=_cbor_default)
+    return encode_json(payload)
+
+
+def _unpack(kind: str, data: bytes) -> np.ndarray:
+    return np.frombuffer(data, dtype="<f8" if kind == "float64" else "<i8")
+
+
+def _msgpack_ext_hook(code: int, data: bytes):
+    if code == MSGPACK_EXT_FLOAT64:
+        return _unpack("float64", data)
+    if code == MSGPACK_EXT_INT64:
+        return _unpack("int64", data)
+    return msgpack.ExtType(code, data)
+
+
+def _cbor_tag_hook(*args):
+    # The hook's arguments differ between cbor2 releases; the tag is the CBORTag one
+    tag = next(arg for arg in args if isinstance(arg, cbor2.CBORTag))
+    if tag.tag == CBOR_TAG_FLOAT64_LE:
+        return _unpack("float64", tag.value)
+    if tag.tag == CBOR_TAG_INT64_LE:
+        return _unpack("int64", tag.value)
+    return tag
+
+
+def decode_body(body: bytes, fmt: str) -> Any:
+    """Parse a body produced by encode_body, packed arrays back into NumPy arrays"""
+    if fmt == MSGPACK:
+        return msgpack.unpackb(body, ext_hook=_msgpack_ext_hook, raw=False)
+    if fmt == CBOR:
+        return cbor2.loads(body, tag_hook=_cbor_tag_hook)
+    return json.loads(body)
+
+
+def request_format(request: Request) -> str:
+    """Response format negotiated from a request's Accept header"""
+    return negotiate_format(request.headers.get("accept"))
+
+
+async def negotiated_response(
+    request: Request,
+    payload: Any = None,
+    cache: Optional[CompressedBodyCache] = None,
+    cache_key: Optional[Hashable] = None,
+    build: Optional[Callable[[], Any]] = None,
+    fmt: Optional[str] = None,
+) -> Response:
+    """
+    Serialize in the format the client accepts, then compress as negotiated
+
+    Cached bodies are keyed per format as well as per content-coding.
+
+    Args:
+        request: Incoming request (Accept and Accept-Encoding headers)
+        payload: Body; a pydantic model is dumped in JSON mode so every
+            format carries the same schema
+        cache: Byte cache for immutable bodies
+        cache_key: Key identifying the immutable body
+        build: Lazy (sync or async) payload factory used on a cache miss
+        fmt: Already negotiated format (negotiated here when None)
+
+    Returns:
+        Response with Content-Type, Content-Encoding and Vary headers set
+    """
+    fmt = fmt or request_format(request)
+    if isinstance(payload, BaseModel):
+        payload = payload.model_dump(mode="json")
+    return await compressed_response(
+        request,
+        payload,
+        cache,
+        (cache_key, fmt) if cache_key is not None else None,
+        build,
+        encoder=lambda body: encode_body(body, fmt),
+        media_type=MEDIA_TYPES[fmt],
+        vary="Accept, Accept-Encoding",
+    )
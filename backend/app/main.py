@@ -1,11 +1,38 @@
+import os
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from app.api.routes import exchange
+from app.api.routes import debug, exchange
+from app.core.executor import compute_executor
+from app.core.profiling import loop_monitor
+from app.core.tracing import TracingMiddleware, tracer
+from app.services.snapshot_sync import snapshot_sync_from_env
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if os.getenv("LOOP_LAG_MONITOR", "1") != "0":
+        loop_monitor.start()
+    # Share one upstream fetcher between nodes when a broker is configured
+    app.state.snapshot_sync = snapshot_sync_from_env(exchange.exchange_service)
+    if app.state.snapshot_sync is not None:
+        await app.state.snapshot_sync.start()
+    yield
+    if app.state.snapshot_sync is not None:
+        await app.state.snapshot_sync.stop()
+    await loop_monitor.stop()
+    compute_executor.shutdown()
+    # Deliver alert notifications still queued
+    exchange.exchange_service.alerts.dispatcher.shutdown()
+    # Flush any spans still queued for export
+    tracer.shutdown()
+
 
 app = FastAPI(
     title="ZAR Exchange Hub API",
     description="Currency exchange rate API with AI-powered natural language queries",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # Configure CORS
@@ -20,10 +47,15 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Trace-Id", "traceparent"],
 )
 
+# Outermost, so the root span covers CORS handling too
+app.add_middleware(TracingMiddleware, tracer=tracer)
+
 # Include routers
 app.include_router(exchange.router)
+app.include_router(debug.router)
 
 
 @app.get("/")
@@ -1,11 +1,39 @@
 from pydantic import BaseModel, Field
-from typing import Literal, List, Optional
+from typing import Annotated, Dict, Literal, List, Optional
 from datetime import datetime
+from decimal import Decimal
+
+
+RoundingMode = Literal[
+    "ROUND_HALF_EVEN",
+    "ROUND_HALF_UP",
+    "ROUND_HALF_DOWN",
+    "ROUND_UP",
+    "ROUND_DOWN",
+    "ROUND_CEILING",
+    "ROUND_FLOOR",
+]
 
 
 class ExchangeRateRequest(BaseModel):
     base_currency: str
     target_currency: str = "ZAR"
+    amount: Optional[Decimal] = None
+    rounding: RoundingMode = "ROUND_HALF_EVEN"
+    as_of: Optional[datetime] = None
+
+
+class ExactConversion(BaseModel):
+    rate: Decimal
+    # Minor-unit rate as an integer mantissa: converted_minor is
+    # amount_minor * rate_scaled * 10**rate_exponent, rounded
+    rate_scaled: int
+    rate_exponent: int
+    amount: Decimal
+    amount_minor: int
+    converted_amount: Decimal
+    converted_minor: int
+    rounding: RoundingMode
 
 
 class DirectLookupResponse(BaseModel):
@@ -13,6 +41,131 @@ class DirectLookupResponse(BaseModel):
     target_currency: str
     rate: float
     timestamp: str
+    exact: Optional[ExactConversion] = None
+
+
+class AsOfBatchRequest(BaseModel):
+    base_currency: str
+    target_currency: str = "ZAR"
+    as_of: List[datetime] = Field(..., min_length=1, max_length=100_000)
+
+
+class AsOfBatchResponse(BaseModel):
+    base_currency: str
+    target_currency: str
+    rates: List[Optional[float]]
+    snapshot_timestamps: List[Optional[str]]
+
+
+class SimulationRequest(BaseModel):
+    currencies: List[str] = Field(..., min_length=1, max_length=20)
+    target_currency: str = "ZAR"
+    model: Literal["gbm", "bootstrap"] = "gbm"
+    horizon_days: int = Field(30, ge=1, le=1825)
+    paths: int = Field(10_000, ge=100, le=100_000)
+    lookback_days: int = Field(365, ge=30, le=3650)
+    # Daily log-return volatility, used only while too few snapshots are recorded
+    volatility: Optional[float] = Field(None, gt=0, le=0.5)
+    percentiles: List[Annotated[float, Field(ge=0, le=100)]] = Field(
+        default_factory=lambda: [5.0, 25.0, 50.0, 75.0, 95.0], min_length=1, max_length=21
+    )
+    seed: Optional[int] = Field(None, ge=0)
+
+
+class SimulationResponse(BaseModel):
+    model: str
+    target_currency: str
+    seed: int
+    paths: int
+    horizon_days: int
+    steps: List[int]
+    spot: Dict[str, float]
+    parameter_source: Literal["history", "volatility"]
+    history_points: int
+    daily_volatility: Dict[str, float]
+    bands: Dict[str, Dict[str, List[float]]]
+
+
+class AlertRequest(BaseModel):
+    base_currency: str
+    target_currency: str = "ZAR"
+    threshold: float = Field(..., gt=0)
+    direction: Literal["above", "below"]
+
+
+class AlertResponse(BaseModel):
+    id: int
+    base_currency: str
+    target_currency: str
+    threshold: float
+    direction: str
+    status: str
+    created_at: str
+    triggered_at: Optional[str] = None
+    triggered_rate: Optional[float] = None
+
+
+class PortfolioRequest(BaseModel):
+    holdings: Dict[str, float] = Field(..., min_length=1, max_length=200)
+    reporting_currency: str = "ZAR"
+    start: Optional[datetime] = None
+    end: Optional[datetime] = None
+
+
+class PortfolioPosition(BaseModel):
+    amount: float
+    value: Optional[float]
+    weight: Optional[float]
+
+
+class PortfolioSeries(BaseModel):
+    timestamps: List[str]
+    values: List[Optional[float]]
+
+
+class PortfolioPnL(BaseModel):
+    start_value: Optional[float]
+    end_value: Optional[float]
+    total: Optional[float]
+    by_currency: Dict[str, Optional[float]]
+
+
+class PortfolioResponse(BaseModel):
+    reporting_currency: str
+    as_of: str
+    total_value: Optional[float]
+    contributions: Dict[str, PortfolioPosition]
+    series: PortfolioSeries
+    pnl: PortfolioPnL
+
+
+class QuoteRequest(BaseModel):
+    base_currency: str
+    target_currency: str = "ZAR"
+    amount: Optional[float] = Field(None, gt=0)
+
+
+class QuoteBatchRequest(BaseModel):
+    quotes: List[QuoteRequest] = Field(..., min_length=1, max_length=10_000)
+
+
+class QuoteResponse(BaseModel):
+    base_currency: str
+    target_currency: str
+    mid: float
+    bid: float
+    ask: float
+    spread_bps: float
+    amount: Optional[float] = None
+    fee: Optional[float] = None
+    fee_bps: Optional[float] = None
+    fee_tier: Optional[int] = None
+    converted_amount: Optional[float] = None
+    priced_at: str
+
+
+class QuoteBatchResponse(BaseModel):
+    quotes: List[QuoteResponse]
 
 
 class NaturalLanguageRequest(BaseModel):
@@ -0,0 +1,392 @@
+"""Threshold rate alerts evaluated per snapshot, with batched notification delivery"""
+import itertools
+import os
+import queue
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Dict, List, Optional, Tuple
+
+import httpx
+import numpy as np
+
+from app.services.snapshot_log import ms_to_iso, now_ms
+
+
+ALERT_DIRECTIONS = ("above", "below")
+
+
+class ThresholdIndex:
+    """
+    Alert thresholds for one pair and direction, kept sorted for range queries
+
+    New alerts land in an unsorted buffer that is merged into the sorted
+    arrays before the next query, so registering is O(1) and a burst of
+    registrations costs one sort. Cancelled alerts are tombstoned and
+    compacted out of the arrays in the same merge step.
+    """
+
+    def __init__(self):
+        self.thresholds = np.empty(0, dtype=np.float64)
+        self.ids = np.empty(0, dtype=np.int64)
+        self._pending_thresholds: List[float] = []
+        self._pending_ids: List[int] = []
+        self._cancelled = set()
+
+    def __len__(self) -> int:
+        return len(self.ids) + len(self._pending_ids) - len(self._cancelled)
+
+    def add(self, threshold: float, alert_id: int) -> None:
+        self._pending_thresholds.append(threshold)
+        self._pending_ids.append(alert_id)
+
+    def cancel(self, alert_id: int) -> None:
+        self._cancelled.add(alert_id)
+
+    def _merge(self) -> None:
+        if self._cancelled:
+            cancelled = np.fromiter(self._cancelled, dtype=np.int64, count=len(self._cancelled))
+            keep = ~np.isin(self.ids, cancelled)
+            self.thresholds, self.ids = self.thresholds[keep], self.ids[keep]
+            if self._pending_ids:
+                pending = [
+                    (threshold, alert_id)
+                    for threshold, alert_id in zip(self._pending_thresholds, self._pending_ids)
+                    if alert_id not in self._cancelled
+                ]
+                self._pending_thresholds = [threshold for threshold, _ in pending]
+                self._pending_ids = [alert_id for _, alert_id in pending]
+            self._cancelled = set()
+        if not self._pending_ids:
+            return
+        thresholds = np.concatenate([self.thresholds, np.array(self._pending_thresholds)])
+        ids = np.concatenate([self.ids, np.array(self._pending_ids, dtype=np.int64)])
+        order = np.argsort(thresholds, kind="stable")
+        self.thresholds, self.ids = thresholds[order], ids[order]
+        self._pending_thresholds, self._pending_ids = [], []
+
+    def take(self, low: float, high: float, side: str) -> np.ndarray:
+        """
+        Remove and return the alerts whose threshold lies in the interval
+
+        Args:
+            low: Lower bound
+            high: Upper bound
+            side: "right" for (low, high], "left" for [low, high)
+
+        Returns:
+            IDs of the alerts in the interval, excluding cancelled ones
+        """
+        self._merge()
+        start, stop = np.searchsorted(self.thresholds, [low, high], side=side)
+        if start == stop:
+            return self.ids[:0]
+        hit = self.ids[start:stop]
+        self.thresholds = np.concatenate([self.thresholds[:start], self.thresholds[stop:]])
+        self.ids = np.concatenate([self.ids[:start], self.ids[stop:]])
+        return hit
+
+
+class QueueSink:
+    """Collect notifications in an in-process queue for a consumer to drain"""
+
+    def __init__(self, maxsize: int = 100_000):
+        self.queue: queue.Queue = queue.Queue(maxsize)
+
+    def send(self, batch: List[Dict]) -> None:
+        for notification in batch:
+            self.queue.put_nowait(notification)
+
+    def drain(self, limit: int = 1000) -> List[Dict]:
+        items = []
+        while len(items) < limit:
+            try:
+                items.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        return items
+
+
+class WebhookSink:
+    """POST each batch as JSON ({"alerts": [...]}) to a webhook URL"""
+
+    def __init__(self, url: str, timeout: float = 5.0, client: Optional[httpx.Client] = None):
+        self.url = url
+        self.timeout = timeout
+        self.client = client
+
+    def send(self, batch: List[Dict]) -> None:
+        payload = {"alerts": batch}
+        if self.client is not None:
+            response = self.client.post(self.url, json=payload, timeout=self.timeout)
+        else:
+            response = httpx.post(self.url, json=payload, timeout=self.timeout)
+        response.raise_for_status()
+
+
+class AlertDispatcher:
+    """
+    Deliver notifications to a sink in batches from a background thread
+
+    Failed batches are retried with exponential backoff; batches that still
+    fail are kept in a bounded dead-letter buffer. Delivery never runs on
+    the event loop, and a full queue drops and counts new notifications.
+    """
+
+    def __init__(
+        self,
+        sink,
+        max_batch_size: int = 500,
+        max_queue_size: int = 1_000_000,
+        flush_interval: float = 1.0,
+        max_retries: int = 3,
+        retry_backoff: float = 0.5
+    ):
+        self.sink = sink
+        self.max_batch_size = max_batch_size
+        self.max_queue_size = max_queue_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_backoff = retry_backoff
+        self.stats = {"delivered": 0, "retries": 0, "failed": 0, "dropped": 0}
+        self.dead_letters: deque = deque(maxlen=1000)
+        self._queue: deque = deque()
+        self._wakeup = threading.Event()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def _ensure_worker(self) -> None:
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="alert-dispatcher", daemon=True
+                    )
+                    self._thread.start()
+
+    def submit(self, notifications: List[Dict]) -> None:
+        for notification in notifications:
+            if len(self._queue) >= self.max_queue_size:
+                self.stats["dropped"] += 1
+                continue
+            self._queue.append(notification)
+        if notifications:
+            self._ensure_worker()
+            self._wakeup.set()
+
+    def _run(self) -> None:
+        while not self._stopped.is_set():
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _deliver(self, batch: List[Dict]) -> None:
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.sink.send(batch)
+                self.stats["delivered"] += len(batch)
+                return
+            except Exception:
+                if attempt == self.max_retries or self._stopped.is_set():
+                    break
+                self.stats["retries"] += 1
+                time.sleep(self.retry_backoff * 2 ** attempt)
+        self.stats["failed"] += len(batch)
+        self.dead_letters.append(batch)
+
+    def flush(self) -> None:
+        """Deliver everything queued so far"""
+        while self._queue:
+            batch = []
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(self._queue.popleft())
+                except IndexError:
+                    break
+            if not batch:
+                return
+            self._deliver(batch)
+
+    def shutdown(self) -> None:
+        self._stopped.set()
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5.0)
+        self.flush()
+
+
+class _Alert:
+    """
+    Compact per-alert record; the response dict is built only on demand
+
+    key is the (base, target, direction) tuple shared with the engine's
+    index map, and times are epoch milliseconds rather than ISO strings.
+    """
+
+    __slots__ = ("key", "threshold", "created_ms", "status", "triggered_ms", "triggered_rate")
+
+    def __init__(self, key: Tuple[str, str, str], threshold: float, created_ms: int):
+        self.key = key
+        self.threshold = threshold
+        self.created_ms = created_ms
+        self.status = "active"
+        self.triggered_ms: Optional[int] = None
+        self.triggered_rate: Optional[float] = None
+
+    def as_dict(self, alert_id: int) -> Dict:
+        base_currency, target_currency, direction = self.key
+        return {
+            "id": alert_id,
+            "base_currency": base_currency,
+            "target_currency": target_currency,
+            "threshold": self.threshold,
+            "direction": direction,
+            "status": self.status,
+            "created_at": ms_to_iso(self.created_ms),
+            "triggered_at": None if self.triggered_ms is None else ms_to_iso(self.triggered_ms),
+            "triggered_rate": self.triggered_rate
+        }
+
+
+def dispatcher_from_env() -> AlertDispatcher:
+    """Webhook delivery when ALERT_WEBHOOK_URL is set, otherwise an in-process queue"""
+    url = os.getenv("ALERT_WEBHOOK_URL")
+    return AlertDispatcher(WebhookSink(url) if url else QueueSink())
+
+
+class AlertEngine:
+    """
+    Per-pair threshold alerts checked against every new rate snapshot
+
+    "above" alerts fire when the rate moves up through the threshold
+    (old < threshold <= new) and "below" alerts when it moves down through
+    it (new <= threshold < old). Each check is two binary searches per pair
+    with alerts, whatever the number of alerts, and fired alerts leave the
+    index (alerts are one-shot). Crossings are measured between consecutive
+    snapshots, so the first snapshot only sets the baseline.
+
+    Triggered and cancelled alerts move to a history bounded by
+    history_size, oldest evicted first, so memory follows the number of
+    active alerts rather than every alert ever registered. Alerts are kept
+    as slotted records and only rendered as dicts when read or fired.
+    """
+
+    def __init__(self, dispatcher: Optional[AlertDispatcher] = None, history_size: int = 100_000):
+        self.dispatcher = dispatcher or AlertDispatcher(QueueSink())
+        self.history_size = history_size
+        self._ids = itertools.count(1)
+        self._alerts: Dict[int, _Alert] = {}
+        self._history: "OrderedDict[int, _Alert]" = OrderedDict()
+        self._indexes: Dict[Tuple[str, str, str], ThresholdIndex] = {}
+        # One key tuple per pair and direction, shared by all its alerts
+        self._keys: Dict[Tuple[str, str, str], Tuple[str, str, str]] = {}
+        self._last_rates: Optional[Dict[str, float]] = None
+        self.evaluations = 0
+
+    def register(
+        self, base_currency: str, target_currency: str, threshold: float, direction: str
+    ) -> int:
+        """
+        Register a one-shot alert
+
+        Returns:
+            The alert ID; get() renders the stored alert
+
+        Raises:
+            ValueError: If the threshold or direction is invalid
+        """
+        if direction not in ALERT_DIRECTIONS:
+            raise ValueError(f"Direction must be one of: {', '.join(ALERT_DIRECTIONS)}")
+        if not threshold > 0:
+            raise ValueError("Threshold must be positive")
+
+        key = (base_currency, target_currency, direction)
+        index = self._indexes.get(key)
+        if index is None:
+            index = self._indexes[key] = ThresholdIndex()
+            self._keys[key] = key
+        alert_id = next(self._ids)
+        alert = self._alerts[alert_id] = _Alert(self._keys[key], float(threshold), now_ms())
+        index.add(alert.threshold, alert_id)
+        return alert_id
+
+    def get(self, alert_id: int) -> Optional[Dict]:
+        alert = self._alerts.get(alert_id)
+        if alert is None:
+            alert = self._history.get(alert_id)
+        return None if alert is None else alert.as_dict(alert_id)
+
+    def _finish(self, alert_id: int) -> _Alert:
+        alert = self._alerts.pop(alert_id)
+        self._history[alert_id] = alert
+        if len(self._history) > self.history_size:
+            self._history.popitem(last=False)
+        return alert
+
+    def cancel(self, alert_id: int) -> bool:
+        """Cancel an active alert; False if it is unknown or no longer active"""
+        if alert_id not in self._alerts:
+            return False
+        alert = self._finish(alert_id)
+        alert.status = "cancelled"
+        self._indexes[alert.key].cancel(alert_id)
+        return True
+
+    def active_count(self) -> int:
+        return sum(len(index) for index in self._indexes.values())
+
+    @staticmethod
+    def _pair_rate(rates: Dict[str, float], base: str, target: str) -> Optional[float]:
+        base_rate = 1.0 if base == "ZAR" else rates.get(base)
+        target_rate = 1.0 if target == "ZAR" else rates.get(target)
+        if not base_rate or not target_rate:
+            return None
+        return target_rate / base_rate
+
+    def on_snapshot(self, rates: Dict[str, float]) -> List[Dict]:
+        """
+        Fire alerts crossed between the previous snapshot and this one
+
+        Args:
+            rates: ZAR-based rates of the new snapshot
+
+        Returns:
+            Notifications handed to the dispatcher
+        """
+        previous, self._last_rates = self._last_rates, dict(rates)
+        if previous is None:
+            return []
+        self.evaluations += 1
+
+        notifications = []
+        fired_ms = now_ms()
+        now = ms_to_iso(fired_ms)
+        for (base, target, direction), index in self._indexes.items():
+            old = self._pair_rate(previous, base, target)
+            new = self._pair_rate(rates, base, target)
+            if old is None or new is None or old == new:
+                continue
+            if direction == "above" and new > old:
+                fired = index.take(old, new, side="right")
+            elif direction == "below" and new < old:
+                fired = index.take(new, old, side="left")
+            else:
+                continue
+
+            for alert_id in fired.tolist():
+                alert = self._finish(alert_id)
+                alert.status, alert.triggered_ms, alert.triggered_rate = "triggered", fired_ms, new
+                notifications.append({
+                    "alert_id": alert_id,
+                    "base_currency": base,
+                    "target_currency": target,
+                    "direction": direction,
+                    "threshold": alert.threshold,
+                    "previous_rate": old,
+                    "rate": new,
+                    "triggered_at": now
+                })
+
+        self.dispatcher.submit(notifications)
+        return notifications
@@ -0,0 +1,262 @@
+"""Cross-rate consistency checks and arbitrage cycle detection"""
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+# Relative deviation from the snapshot's implied cross rate that marks a quote anomalous
+DEFAULT_ANOMALY_THRESHOLD = 0.02
+# Minimum log gain of a cycle worth reporting (filters float noise)
+DEFAULT_CYCLE_TOLERANCE = 1e-6
+# Cycles reported per analysis; each costs one more Bellman-Ford pass
+DEFAULT_MAX_CYCLES = 20
+
+
+def bellman_ford_predecessors(log_rates: np.ndarray, epsilon: float = 1e-12) -> Optional[np.ndarray]:
+    """
+    Predecessor snapshot of a Bellman-Ford pass that still relaxes after n rounds
+
+    Maximizing the product of rates is shortest paths on -log weights, so a
+    cycle whose rates multiply to more than 1 is a negative cycle. Every
+    currency starts at distance 0 (a virtual source linked to all of them)
+    and each round relaxes every edge in one vectorized min over the
+    matrix. If round n still improves a distance, the predecessor graph
+    taken at that point contains only positive-gain cycles.
+
+    Args:
+        log_rates: log(rate i -> j), -inf where there is no quote
+        epsilon: Smallest improvement counted as a relaxation (float noise)
+
+    Returns:
+        Predecessor index per currency (-1 for none), or None when no
+        positive cycle exists
+    """
+    n = log_rates.shape[0]
+    weights = -log_rates
+    columns = np.arange(n)
+    dist = np.zeros(n)
+    pred = np.full(n, -1)
+
+    for _ in range(n):
+        via = dist[:, np.newaxis] + weights
+        best_from = via.argmin(axis=0)
+        best = via[best_from, columns]
+        improved = best < dist - epsilon
+        if not improved.any():
+            return None
+        dist = np.where(improved, best, dist)
+        pred = np.where(improved, best_from, pred)
+
+    return pred
+
+
+def _predecessor_cycles(pred: np.ndarray) -> List[List[int]]:
+    # Each currency has one predecessor, so every cycle is found by walking
+    # from each unvisited node until the walk meets itself or a finished node
+    state = np.zeros(len(pred), dtype=np.int64)  # 0 new, walk id, -1 finished
+    cycles = []
+    for start in range(len(pred)):
+        walk, node = start + 1, start
+        path = []
+        while node >= 0 and state[node] == 0:
+            state[node] = walk
+            path.append(node)
+            node = int(pred[node])
+        if node >= 0 and state[node] == walk:
+            # pred points backwards along edges: reverse into conversion order
+            cycle = path[path.index(node):][::-1]
+            cycles.append(cycle + [cycle[0]])
+        state[path] = -1
+    return cycles
+
+
+def _canonical(cycle: List[int]) -> Tuple[int, ...]:
+    nodes = cycle[:-1]
+    pivot = nodes.index(min(nodes))
+    return tuple(nodes[pivot:] + nodes[:pivot])
+
+
+def find_positive_cycles(
+    log_rates: np.ndarray,
+    tolerance: float = DEFAULT_CYCLE_TOLERANCE,
+    max_cycles: int = DEFAULT_MAX_CYCLES
+) -> List[Tuple[List[int], float]]:
+    """
+    Distinct cycles whose rates multiply to more than exp(tolerance)
+
+    Cycles in one Bellman-Ford predecessor snapshot are vertex-disjoint, so
+    after taking them the weakest edge of each is removed and the search
+    reruns, until no positive cycle is left or max_cycles are found. Cycles
+    are deduplicated by rotation.
+
+    Args:
+        log_rates: log(rate i -> j), -inf where there is no quote
+        tolerance: Minimum log gain worth reporting
+        max_cycles: Maximum number of cycles to return
+
+    Returns:
+        List of (closed node path, log gain)
+    """
+    remaining = log_rates.copy()
+    found: Dict[Tuple[int, ...], Tuple[List[int], float]] = {}
+    while len(found) < max_cycles:
+        pred = bellman_ford_predecessors(remaining)
+        if pred is None:
+            break
+        cycles = _predecessor_cycles(pred)
+        if not cycles:
+            break
+        for cycle in cycles:
+            legs = list(zip(cycle, cycle[1:]))
+            gain = float(sum(log_rates[a, b] for a, b in legs))
+            if gain > tolerance and len(found) < max_cycles:
+                found.setdefault(_canonical(cycle), (cycle, gain))
+            a, b = min(legs, key=lambda leg: remaining[leg])
+            remaining[a, b] = -np.inf
+    return list(found.values())
+
+
+class RateConsistencyAnalyzer:
+    """
+    Log-rate graph over the primary snapshot plus secondary provider tables
+
+    The primary (ZAR-based) snapshot is internally consistent by construction;
+    inconsistency enters through secondary tables quoted from other bases.
+    Inputs are updated as they arrive. Every new snapshot is analyzed as it
+    is installed (on_snapshot) and the report cached; secondary tables only
+    invalidate it, and the next analyze() reruns the O(n^3) cycle search.
+    """
+
+    def __init__(
+        self,
+        anomaly_threshold: float = DEFAULT_ANOMALY_THRESHOLD,
+        cycle_tolerance: float = DEFAULT_CYCLE_TOLERANCE,
+        max_cycles: int = DEFAULT_MAX_CYCLES
+    ):
+        self.anomaly_threshold = anomaly_threshold
+        self.cycle_tolerance = cycle_tolerance
+        self.max_cycles = max_cycles
+        self._primary_base = "ZAR"
+        self._primary_log: Dict[str, float] = {}
+        self._secondary: Dict[str, Dict[str, float]] = {}
+        self._report: Optional[Dict] = None
+
+    def update_primary(self, rates: Dict[str, float], base: str = "ZAR") -> None:
+        """Replace the primary snapshot (rates quoted from base)"""
+        self._primary_base = base
+        self._primary_log = {
+            code: float(np.log(rate)) for code, rate in rates.items() if rate and rate > 0
+        }
+        self._primary_log[base] = 0.0
+        self._report = None
+
+    def on_snapshot(self, rates: Dict[str, float], base: str = "ZAR") -> None:
+        """Snapshot listener: replace the primary snapshot and analyze it right away"""
+        self.update_primary(rates, base)
+        self.analyze()
+
+    def update_secondary(self, base: str, rates: Dict[str, float]) -> None:
+        """Record a table quoted from another base by a secondary fetch"""
+        self._secondary[base] = {
+            code: float(rate) for code, rate in rates.items() if rate and rate > 0
+        }
+        self._report = None
+
+    def implied_rate(self, base: str, target: str) -> Optional[float]:
+        """Cross rate implied by the primary snapshot, if both legs are known"""
+        if base in self._primary_log and target in self._primary_log:
+            return float(np.exp(self._primary_log[target] - self._primary_log[base]))
+        return None
+
+    def check_quote(self, base: str, target: str, rate: float) -> Optional[Dict]:
+        """
+        Compare a quote with the primary snapshot's implied cross rate
+
+        Returns:
+            Anomaly dictionary if the quote deviates beyond the threshold, else None
+        """
+        implied = self.implied_rate(base, target)
+        if implied is None or rate <= 0:
+            return None
+        deviation = rate / implied - 1.0
+        if abs(deviation) <= self.anomaly_threshold:
+            return None
+        return {
+            "base_currency": base,
+            "target_currency": target,
+            "quoted": rate,
+            "implied": implied,
+            "deviation": deviation
+        }
+
+    def build_log_matrix(self) -> Tuple[List[str], np.ndarray]:
+        """
+        Build the log-rate matrix over every currency seen
+
+        Returns:
+            (currency codes, matrix of log(rate i -> j) with -inf for no edge)
+        """
+        codes = set(self._primary_log)
+        for base, rates in self._secondary.items():
+            codes.add(base)
+            codes.update(rates)
+        codes = sorted(codes)
+        index = {code: i for i, code in enumerate(codes)}
+        n = len(codes)
+
+        matrix = np.full((n, n), -np.inf)
+        if self._primary_log:
+            primary = np.full(n, np.nan)
+            for code, value in self._primary_log.items():
+                primary[index[code]] = value
+            # Implied cross rates: log(i -> j) = log(base -> j) - log(base -> i)
+            implied = primary[np.newaxis, :] - primary[:, np.newaxis]
+            matrix = np.where(np.isnan(implied), -np.inf, implied)
+
+        for base, rates in self._secondary.items():
+            i = index[base]
+            targets = np.array([index[code] for code in rates], dtype=np.intp)
+            logs = np.log(np.fromiter(rates.values(), dtype=np.float64, count=len(rates)))
+            # Keep the best available quote per direction
+            matrix[i, targets] = np.maximum(matrix[i, targets], logs)
+            matrix[targets, i] = np.maximum(matrix[targets, i], -logs)
+
+        np.fill_diagonal(matrix, 0.0)
+        return codes, matrix
+
+    def analyze(self) -> Dict:
+        """
+        Detect anomalous secondary quotes and arbitrage cycles
+
+        Returns:
+            Dictionary with currencies, anomalies and cycles (path and gain)
+        """
+        if self._report is not None:
+            return self._report
+
+        anomalies = []
+        for base, rates in self._secondary.items():
+            for target, rate in rates.items():
+                if target != base:
+                    anomaly = self.check_quote(base, target, rate)
+                    if anomaly:
+                        anomalies.append(anomaly)
+
+        codes, matrix = self.build_log_matrix()
+        cycles = []
+        if len(codes) > 1:
+            cycles = [
+                {"path": [codes[i] for i in cycle], "gain": float(np.exp(log_gain))}
+                for cycle, log_gain in find_positive_cycles(
+                    matrix, self.cycle_tolerance, self.max_cycles
+                )
+            ]
+        cycles.sort(key=lambda c: -c["gain"])
+
+        self._report = {
+            "base_currency": self._primary_base,
+            "currencies": len(codes),
+            "anomalies": anomalies,
+            "cycles": cycles
+        }
+        return self._report
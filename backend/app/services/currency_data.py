@@ -35,19 +35,24 @@ CURRENCY_INFO = {
 POPULAR_CURRENCIES = ["USD", "EUR", "GBP", "JPY", "CNY", "AUD", "CAD", "CHF"]
 
 
+# Built once at import; get_all_currencies hands out shallow copies
+_ALL_CURRENCIES = tuple(
+    {
+        "code": code,
+        "name": info["name"],
+        "symbol": info["symbol"],
+        "flag": info["flag"]
+    }
+    for code, info in CURRENCY_INFO.items()
+)
+
+
 def get_all_currencies():
     """Get all supported currencies"""
-    return [
-        {
-            "code": code,
-            "name": info["name"],
-            "symbol": info["symbol"],
-            "flag": info["flag"]
-        }
-        for code, info in CURRENCY_INFO.items()
-    ]
+    return [dict(currency) for currency in _ALL_CURRENCIES]
 
 
 def get_currency_info(code: str):
     """Get info for a specific currency"""
     return CURRENCY_INFO.get(code)
+
@@ -0,0 +1,527 @@
+"""ISO 4217 currency registry with O(1) indexes and prefix/fuzzy search"""
+import re
+import unicodedata
+from types import MappingProxyType
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from app.services.currency_data import CURRENCY_INFO
+
+
+class Currency(NamedTuple):
+    code: str
+    numeric: str
+    name: str
+    minor_units: int
+    symbol: str
+    flag: str
+
+    def to_dict(self) -> Dict:
+        return self._asdict()
+
+
+# Active ISO 4217 currencies: alpha code | numeric code | minor units | name
+_ISO_4217 = """
+AED|784|2|United Arab Emirates dirham
+AFN|971|2|Afghan afghani
+ALL|008|2|Albanian lek
+AMD|051|2|Armenian dram
+ANG|532|2|Netherlands Antillean guilder
+AOA|973|2|Angolan kwanza
+ARS|032|2|Argentine peso
+AUD|036|2|Australian dollar
+AWG|533|2|Aruban florin
+AZN|944|2|Azerbaijani manat
+BAM|977|2|Bosnia and Herzegovina convertible mark
+BBD|052|2|Barbados dollar
+BDT|050|2|Bangladeshi taka
+BGN|975|2|Bulgarian lev
+BHD|048|3|Bahraini dinar
+BIF|108|0|Burundian franc
+BMD|060|2|Bermudian dollar
+BND|096|2|Brunei dollar
+BOB|068|2|Boliviano
+BRL|986|2|Brazilian real
+BSD|044|2|Bahamian dollar
+BTN|064|2|Bhutanese ngultrum
+BWP|072|2|Botswana pula
+BYN|933|2|Belarusian ruble
+BZD|084|2|Belize dollar
+CAD|124|2|Canadian dollar
+CDF|976|2|Congolese franc
+CHF|756|2|Swiss franc
+CLP|152|0|Chilean peso
+CNY|156|2|Chinese yuan
+COP|170|2|Colombian peso
+CRC|188|2|Costa Rican colón
+CUP|192|2|Cuban peso
+CVE|132|2|Cape Verdean escudo
+CZK|203|2|Czech koruna
+DJF|262|0|Djiboutian franc
+DKK|208|2|Danish krone
+DOP|214|2|Dominican peso
+DZD|012|2|Algerian dinar
+EGP|818|2|Egyptian pound
+ERN|232|2|Eritrean nakfa
+ETB|230|2|Ethiopian birr
+EUR|978|2|Euro
+FJD|242|2|Fiji dollar
+FKP|238|2|Falkland Islands pound
+GBP|826|2|Pound sterling
+GEL|981|2|Georgian lari
+GHS|936|2|Ghanaian cedi
+GIP|292|2|Gibraltar pound
+GMD|270|2|Gambian dalasi
+GNF|324|0|Guinean franc
+GTQ|320|2|Guatemalan quetzal
+GYD|328|2|Guyanese dollar
+HKD|344|2|Hong Kong dollar
+HNL|340|2|Honduran lempira
+HTG|332|2|Haitian gourde
+HUF|348|2|Hungarian forint
+IDR|360|2|Indonesian rupiah
+ILS|376|2|Israeli new shekel
+INR|356|2|Indian rupee
+IQD|368|3|Iraqi dinar
+IRR|364|2|Iranian rial
+ISK|352|0|Icelandic króna
+JMD|388|2|Jamaican dollar
+JOD|400|3|Jordanian dinar
+JPY|392|0|Japanese yen
+KES|404|2|Kenyan shilling
+KGS|417|2|Kyrgyzstani som
+KHR|116|2|Cambodian riel
+KMF|174|0|Comoro franc
+KPW|408|2|North Korean won
+KRW|410|0|South Korean won
+KWD|414|3|Kuwaiti dinar
+KYD|136|2|Cayman Islands dollar
+KZT|398|2|Kazakhstani tenge
+LAK|418|2|Lao kip
+LBP|422|2|Lebanese pound
+LKR|144|2|Sri Lankan rupee
+LRD|430|2|Liberian dollar
+LSL|426|2|Lesotho loti
+LYD|434|3|Libyan dinar
+MAD|504|2|Moroccan dirham
+MDL|498|2|Moldovan leu
+MGA|969|2|Malagasy ariary
+MKD|807|2|Macedonian denar
+MMK|104|2|Myanmar kyat
+MNT|496|2|Mongolian tögrög
+MOP|446|2|Macanese pataca
+MRU|929|2|Mauritanian ouguiya
+MUR|480|2|Mauritian rupee
+MVR|462|2|Maldivian rufiyaa
+MWK|454|2|Malawian kwacha
+MXN|484|2|Mexican peso
+MYR|458|2|Malaysian ringgit
+MZN|943|2|Mozambican metical
+NAD|516|2|Namibian dollar
+NGN|566|2|Nigerian naira
+NIO|558|2|Nicaraguan córdoba
+NOK|578|2|Norwegian krone
+NPR|524|2|Nepalese rupee
+NZD|554|2|New Zealand dollar
+OMR|512|3|Omani rial
+PAB|590|2|Panamanian balboa
+PEN|604|2|Peruvian sol
+PGK|598|2|Papua New Guinean kina
+PHP|608|2|Philippine peso
+PKR|586|2|Pakistani rupee
+PLN|985|2|Polish złoty
+PYG|600|0|Paraguayan guaraní
+QAR|634|2|Qatari riyal
+RON|946|2|Romanian leu
+RSD|941|2|Serbian dinar
+RUB|643|2|Russian ruble
+RWF|646|0|Rwandan franc
+SAR|682|2|Saudi riyal
+SBD|090|2|Solomon Islands dollar
+SCR|690|2|Seychelles rupee
+SDG|938|2|Sudanese pound
+SEK|752|2|Swedish krona
+SGD|702|2|Singapore dollar
+SHP|654|2|Saint Helena pound
+SLE|925|2|Sierra Leonean leone
+SOS|706|2|Somali shilling
+SRD|968|2|Surinamese dollar
+SSP|728|2|South Sudanese pound
+STN|930|2|São Tomé and Príncipe dobra
+SVC|222|2|Salvadoran colón
+SYP|760|2|Syrian pound
+SZL|748|2|Swazi lilangeni
+THB|764|2|Thai baht
+TJS|972|2|Tajikistani somoni
+TMT|934|2|Turkmenistan manat
+TND|788|3|Tunisian dinar
+TOP|776|2|Tongan paʻanga
+TRY|949|2|Turkish lira
+TTD|780|2|Trinidad and Tobago dollar
+TWD|901|2|New Taiwan dollar
+TZS|834|2|Tanzanian shilling
+UAH|980|2|Ukrainian hryvnia
+UGX|800|0|Ugandan shilling
+USD|840|2|United States dollar
+UYU|858|2|Uruguayan peso
+UZS|860|2|Uzbekistan sum
+VES|928|2|Venezuelan bolívar
+VND|704|0|Vietnamese đồng
+VUV|548|0|Vanuatu vatu
+WST|882|2|Samoan tālā
+XAF|950|0|Central African CFA franc
+XCD|951|2|East Caribbean dollar
+XOF|952|0|West African CFA franc
+XPF|953|0|CFP franc
+YER|886|2|Yemeni rial
+ZAR|710|2|South African rand
+ZMW|967|2|Zambian kwacha
+ZWG|924|2|Zimbabwe Gold
+"""
+
+# Symbols for currencies outside CURRENCY_INFO (which takes precedence)
+_EXTRA_SYMBOLS = {
+    "ILS": "₪", "VND": "₫", "NGN": "₦", "UAH": "₴", "KZT": "₸", "ARS": "$",
+    "CLP": "$", "COP": "$", "CZK": "Kč", "HUF": "Ft", "IDR": "Rp", "KWD": "KD",
+    "PKR": "₨", "QAR": "QR", "RON": "lei", "BHD": "BD", "KES": "KSh",
+}
+
+# Common names that are not part of the ISO name
+ALIASES = {
+    "USD": ("us dollar", "dollar", "buck", "greenback", "american dollar"),
+    "EUR": ("euro",),
+    "GBP": ("british pound", "pound", "sterling", "quid"),
+    "ZAR": ("rand",),
+    "JPY": ("yen",),
+    "CNY": ("yuan", "renminbi", "rmb"),
+    "INR": ("rupee",),
+    "CHF": ("swiss franc",),
+    "RUB": ("rouble",),
+    "SEK": ("krona",),
+    "NOK": ("krone",),
+    "TRY": ("lira",),
+}
+
+# Codes that are also everyday English words; only matched when written uppercase
+AMBIGUOUS_CODE_WORDS = frozenset(
+    {"ALL", "BAM", "BOB", "CUP", "DOP", "GEL", "MAD", "MOP", "PEN", "SOS", "TOP", "TRY"}
+)
+
+# Currency nouns that are also everyday English words; never taken as a currency term
+AMBIGUOUS_CURRENCY_WORDS = frozenset({"gold", "mark", "real", "sol", "som", "sum", "won"})
+
+# Trie match ranks, best first
+_RANK_CODE, _RANK_NUMERIC, _RANK_NAME, _RANK_WORD = 0, 1, 2, 3
+_FUZZY_THRESHOLD = 0.3
+# Closer match needed for a misspelt word to count as a currency term
+_TERM_THRESHOLD = 0.6
+_MAX_PHRASE_WORDS = 5
+
+
+def _normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(re.findall(r"[\w$€£¥₹₩₽₺₪₫₦₱฿₴₸₨]+", stripped))
+
+
+def _trigrams(term: str) -> frozenset:
+    padded = f"  {term} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def _build_currencies() -> Tuple[Currency, ...]:
+    currencies = []
+    for line in _ISO_4217.strip().splitlines():
+        code, numeric, minor, name = line.split("|")
+        info = CURRENCY_INFO.get(code, {})
+        currencies.append(Currency(
+            code=code,
+            numeric=numeric,
+            name=name,
+            minor_units=int(minor),
+            symbol=info.get("symbol", _EXTRA_SYMBOLS.get(code, "")),
+            flag=info.get("flag", ""),
+        ))
+    return tuple(currencies)
+
+
+CURRENCIES: Tuple[Currency, ...] = _build_currencies()
+
+_BY_CODE = MappingProxyType({c.code: c for c in CURRENCIES})
+_BY_NUMERIC = MappingProxyType({c.numeric: c for c in CURRENCIES})
+
+
+def _build_symbol_index():
+    index: Dict[str, List[Currency]] = {}
+    # Supported (CURRENCY_INFO) currencies first, so "$" leads with USD
+    ordered = sorted(CURRENCIES, key=lambda c: (c.code not in CURRENCY_INFO, c.code))
+    for currency in ordered:
+        if currency.symbol:
+            index.setdefault(currency.symbol, []).append(currency)
+    return MappingProxyType({symbol: tuple(group) for symbol, group in index.items()})
+
+
+_BY_SYMBOL = _build_symbol_index()
+
+
+def _search_terms():
+    """Yield (normalized term, currency index, rank) for every searchable term"""
+    for idx, currency in enumerate(CURRENCIES):
+        yield currency.code.lower(), idx, _RANK_CODE
+        yield currency.numeric, idx, _RANK_NUMERIC
+        name = _normalize(currency.name)
+        yield name, idx, _RANK_NAME
+        for word in name.split()[1:]:
+            yield word, idx, _RANK_WORD
+        for alias in ALIASES.get(currency.code, ()):
+            yield alias, idx, _RANK_NAME
+        display = CURRENCY_INFO.get(currency.code, {}).get("name")
+        if display:
+            yield _normalize(display), idx, _RANK_NAME
+
+
+def _sort_key(idx: int, rank: int):
+    code = CURRENCIES[idx].code
+    return (rank, code not in CURRENCY_INFO, code)
+
+
+def _build_trie():
+    """Character trie whose nodes hold every currency reachable below them, ranked"""
+    root: Dict = {}
+    best: Dict[int, Dict[int, int]] = {}
+    nodes = {id(root): root}
+
+    for term, idx, rank in _search_terms():
+        node = root
+        for char in term:
+            node = node.setdefault(char, {})
+            nodes[id(node)] = node
+            ranks = best.setdefault(id(node), {})
+            if rank < ranks.get(idx, rank + 1):
+                ranks[idx] = rank
+
+    # Freeze hits into tuples stored under a key no character can collide with
+    for node_id, ranks in best.items():
+        ordered = sorted(ranks.items(), key=lambda item: _sort_key(*item))
+        nodes[node_id][None] = tuple(idx for idx, _ in ordered)
+    return root
+
+
+def _build_trigram_index():
+    terms: List[Tuple[int, int, int]] = []  # (currency index, trigram count, rank)
+    postings: Dict[str, List[int]] = {}
+    # A term listed twice for one currency (name word and alias) keeps its best rank
+    best: Dict[Tuple[str, int], int] = {}
+    for term, idx, rank in _search_terms():
+        if rank not in (_RANK_CODE, _RANK_NUMERIC) and rank < best.get((term, idx), rank + 1):
+            best[(term, idx)] = rank
+    for (term, idx), rank in best.items():
+        grams = _trigrams(term)
+        term_id = len(terms)
+        terms.append((idx, len(grams), rank))
+        for gram in grams:
+            postings.setdefault(gram, []).append(term_id)
+    return tuple(terms), MappingProxyType({g: tuple(ids) for g, ids in postings.items()})
+
+
+def _build_phrases():
+    phrases: Dict[str, str] = {}
+    for term, idx, rank in _search_terms():
+        if rank == _RANK_NAME:
+            phrases.setdefault(term, CURRENCIES[idx].code)
+    return MappingProxyType(phrases)
+
+
+def _build_currency_words():
+    """Currency nouns (last word of every name and alias) -> (codes, trigrams)"""
+    codes: Dict[str, set] = {}
+    for term, idx, rank in _search_terms():
+        word = term.split()[-1]
+        if rank == _RANK_NAME and word not in AMBIGUOUS_CURRENCY_WORDS:
+            codes.setdefault(word, set()).add(CURRENCIES[idx].code)
+    return MappingProxyType({
+        word: (frozenset(codes[word]), _trigrams(word)) for word in sorted(codes)
+    })
+
+
+_TRIE = _build_trie()
+_TRIGRAM_TERMS, _TRIGRAM_POSTINGS = _build_trigram_index()
+_PHRASES = _build_phrases()
+_CURRENCY_WORDS = _build_currency_words()
+_SYMBOL_CHARS = frozenset(symbol for symbol in _BY_SYMBOL if len(symbol) == 1 and not symbol.isalnum())
+
+
+def get_currency(code: str) -> Optional[Currency]:
+    """Look up a currency by ISO alpha code"""
+    return _BY_CODE.get(code.upper())
+
+
+def get_currency_by_numeric(numeric) -> Optional[Currency]:
+    """Look up a currency by ISO numeric code (e.g. 710 or "710")"""
+    return _BY_NUMERIC.get(str(numeric).zfill(3))
+
+
+def get_currencies_by_symbol(symbol: str) -> Tuple[Currency, ...]:
+    """Look up every currency using a symbol, supported currencies first"""
+    return _BY_SYMBOL.get(symbol, ())
+
+
+def get_minor_units(code: str) -> int:
+    """Get the number of minor-unit decimals for a currency (default 2)"""
+    currency = _BY_CODE.get(code)
+    return currency.minor_units if currency else 2
+
+
+def get_display_name(code: str) -> str:
+    """Get the friendly name for a currency, falling back to the code"""
+    info = CURRENCY_INFO.get(code)
+    if info:
+        return info["name"]
+    currency = _BY_CODE.get(code)
+    return currency.name if currency else code
+
+
+def search_currencies(query: str, limit: int = 10) -> List[Dict]:
+    """
+    Autocomplete search over codes, numeric codes, symbols, names and aliases
+
+    Symbol and prefix matches come from the symbol index and the trie; only
+    when neither matches does the trigram index supply fuzzy matches.
+
+    Args:
+        query: Search text
+        limit: Maximum number of results
+
+    Returns:
+        List of currency dictionaries with a "match" field
+    """
+    results: List[Dict] = []
+    seen = set()
+
+    def add(currency: Currency, match: str):
+        if currency.code not in seen and len(results) < limit:
+            seen.add(currency.code)
+            results.append({**currency.to_dict(), "match": match})
+
+    for currency in get_currencies_by_symbol(query.strip()):
+        add(currency, "symbol")
+
+    term = _normalize(query)
+    if not term:
+        return results
+
+    node = _TRIE
+    for char in term:
+        node = node.get(char)
+        if node is None:
+            break
+    else:
+        for idx in node.get(None, ()):
+            if len(results) >= limit:
+                return results
+            add(CURRENCIES[idx], "prefix")
+
+    if not results:
+        grams = _trigrams(term)
+        overlaps: Dict[int, int] = {}
+        for gram in grams:
+            for term_id in _TRIGRAM_POSTINGS.get(gram, ()):
+                overlaps[term_id] = overlaps.get(term_id, 0) + 1
+
+        # Best (score, rank) per currency; equal scores rank like prefix
+        # matches, so "dolar" resolves to USD's alias before every other dollar
+        scores: Dict[int, Tuple[float, int]] = {}
+        for term_id, common in overlaps.items():
+            idx, size, rank = _TRIGRAM_TERMS[term_id]
+            score = 2.0 * common / (len(grams) + size)
+            if score < _FUZZY_THRESHOLD:
+                continue
+            best = scores.get(idx)
+            if best is None or score > best[0] or (score == best[0] and rank < best[1]):
+                scores[idx] = (score, rank)
+
+        for idx in sorted(scores, key=lambda i: (-scores[i][0], *_sort_key(i, scores[i][1]))):
+            add(CURRENCIES[idx], "fuzzy")
+
+    return results
+
+
+def find_currency_mentions(text: str) -> List[str]:
+    """
+    Find currency codes mentioned in free text, in order of appearance
+
+    Matches ISO codes, names and aliases (longest phrase first, with simple
+    plurals). Codes that double as English words must be written uppercase.
+
+    Args:
+        text: Free text such as a user query
+
+    Returns:
+        List of ISO alpha codes without duplicates
+    """
+    mentions: List[str] = []
+    raw_words = re.findall(r"\w+", text)
+    words = [_normalize(word) for word in raw_words]
+
+    i = 0
+    while i < len(words):
+        matched = 0
+        for size in range(min(_MAX_PHRASE_WORDS, len(words) - i), 0, -1):
+            phrase = " ".join(words[i:i + size])
+            code = _PHRASES.get(phrase)
+            if code is None and phrase.endswith("s"):
+                code = _PHRASES.get(phrase[:-1])
+            if code is not None:
+                if code not in mentions:
+                    mentions.append(code)
+                matched = size
+                break
+
+        if not matched:
+            upper = raw_words[i].upper()
+            if upper in _BY_CODE and (
+                upper not in AMBIGUOUS_CODE_WORDS or raw_words[i] == upper
+            ):
+                if upper not in mentions:
+                    mentions.append(upper)
+            matched = 1
+        i += matched
+
+    return mentions
+
+
+def has_currency_term(text: str, ignore: Iterable[str] = ()) -> bool:
+    """
+    Whether free text contains anything that looks like a currency
+
+    True for a currency symbol, a code, name or alias found by
+    find_currency_mentions, or a word that is, or closely misspells, a
+    currency noun ("naira", "greenbak", "euroos"). Words like "money" or a
+    place name do not count, so "send money to my mom in Lagos" is False.
+
+    Args:
+        text: Free text such as a user query
+        ignore: Codes whose names and aliases do not count (e.g. the home
+            currency, named in most queries)
+
+    Returns:
+        True if some token looks like a currency outside ignore
+    """
+    ignore = frozenset(ignore)
+    if any(char in _SYMBOL_CHARS for char in text):
+        return True
+    if any(code not in ignore for code in find_currency_mentions(text)):
+        return True
+    for word in _normalize(text).split():
+        for candidate in (word, word[:-1] if word.endswith("s") else None):
+            entry = _CURRENCY_WORDS.get(candidate)
+            if entry is not None and entry[0] - ignore:
+                return True
+        if len(word) < 4 or word in AMBIGUOUS_CURRENCY_WORDS:
+            continue
+        grams = _trigrams(word)
+        for target, (codes, target_grams) in _CURRENCY_WORDS.items():
+            if len(target) < 4 or not codes - ignore:
+                continue
+            if 2.0 * len(grams & target_grams) / (len(grams) + len(target_grams)) >= _TERM_THRESHOLD:
+                return True
+    return False
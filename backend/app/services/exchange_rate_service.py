@@ -1,9 +1,70 @@
 import httpx
+from collections import deque
 from datetime import datetime, timedelta
-from typing import Dict, List
+from decimal import Decimal, ROUND_HALF_EVEN
+from typing import Callable, Dict, List, Optional, Tuple
 import numpy as np
 from functools import lru_cache
 
+from app.core.executor import compute_executor
+from app.core.tracing import tracer
+from app.services.alert_service import AlertEngine, dispatcher_from_env
+from app.services.arbitrage_service import RateConsistencyAnalyzer
+from app.services.pricing_service import pricing_engine_from_env
+from app.services.snapshot_log import SnapshotLog, datetime_to_ms, now_ms
+from app.services.fixed_point import (
+    convert_minor_units,
+    from_minor_units,
+    precise_minor_unit_rate,
+    quantize_rate,
+    to_minor_units
+)
+
+
+def simulate_rate_history(
+    current_rates: np.ndarray,
+    day_indices: np.ndarray,
+    days: int,
+    rng: Optional[np.random.Generator] = None,
+) -> np.ndarray:
+    """
+    Generate historical rates for several currencies in one vectorized pass
+
+    Args:
+        current_rates: Current rate per currency, shape (currencies,)
+        day_indices: Days before today for each row, shape (rows,)
+        days: Total length of the series, scales the trend factor
+        rng: Random generator (defaults to the global numpy state)
+
+    Returns:
+        Rates rounded to 4 decimals, shape (rows, currencies)
+    """
+    random = rng if rng is not None else np.random
+    shape = (len(day_indices), len(current_rates))
+
+    # Generate all random variations at once
+    variations = random.uniform(-0.05, 0.05, shape)
+
+    # Generate trend factors
+    trend = (day_indices / max(days, 1))[:, np.newaxis]
+    trend_factors = 1 + random.uniform(-0.1, 0.1, shape) * trend
+
+    # Calculate all historical rates at once (vectorized operation)
+    return np.round(current_rates * (1 + variations) * trend_factors, 4)
+
+
+def _single_rate_history(current_rate: float, days: int, seed: Optional[int] = None) -> np.ndarray:
+    # Module-level so it can run in a worker process; a fresh generator
+    # keeps forked workers from replaying the parent's random state
+    return simulate_rate_history(
+        np.array([current_rate]), np.arange(days, -1, -1), days, np.random.default_rng(seed)
+    )[:, 0]
+
+
+def _history_records(dates: np.ndarray, rates: np.ndarray) -> List[Dict]:
+    labels = np.datetime_as_string(dates.astype("datetime64[D]")).tolist()
+    return [{"date": date, "rate": rate} for date, rate in zip(labels, rates.tolist())]
+
 
 class ExchangeRateService:
     """Service for fetching exchange rates from external API"""
@@ -14,11 +75,58 @@ class ExchangeRateService:
         # In-memory cache for ALL rates (10 minute TTL for batch fetch)
         self._batch_cache = {}
         self._batch_cache_time = None
-        self._batch_cache_ttl = 600  # 10 minutes
+        self._batch_cache_ttl = 600  # 10 minutes, when the provider gives no schedule
+        # Refresh scheduling driven by the provider's own update timestamps
+        self._batch_next_refresh: Optional[datetime] = None
+        self._provider_update_interval = 86400  # publish cadence; learned from successive updates
+        self._update_interval_bounds = (3600, 25 * 3600)
+        self._update_deltas = deque(maxlen=8)
+        self._refresh_grace = 30  # provider publishes a little after its stated time
+        # Polling delay once an update is overdue or the schedule is unknown;
+        # doubles on every fetch that brings nothing new
+        self._refresh_backoff = self._batch_cache_ttl
+        self._refresh_backoff_max = 4 * 3600
+        self._provider_last_updated: Optional[int] = None
+        self._batch_validators: Dict[str, str] = {}
+        self.refresh_stats = {"fetches": 0, "useful": 0, "not_modified": 0, "unchanged": 0, "errors": 0, "replicated": 0}
+        # Bumped on every successful batch fetch; keys per-snapshot caches
+        self._snapshot_version = 0
         # Individual rate cache
         self._cache = {}
         self._cache_ttl = 600  # 10 minutes
+        # Callbacks run with the rates of every new snapshot
+        self._snapshot_listeners: List[Callable[[Dict[str, float]], None]] = []
+        # Cross-checks secondary quotes against the snapshot before serving them
+        self.consistency = RateConsistencyAnalyzer()
+        self.add_snapshot_listener(self.consistency.on_snapshot)
+        # Every snapshot, retained for point-in-time (as_of) queries
+        self.snapshot_log = SnapshotLog()
+        self.add_snapshot_listener(self.snapshot_log.append)
+        # Threshold alerts, checked against each new snapshot
+        self.alerts = AlertEngine(dispatcher_from_env())
+        self.add_snapshot_listener(self.alerts.on_snapshot)
+        # Customer bid/ask and fees, repriced for each new snapshot
+        self.pricing = pricing_engine_from_env()
+        self.add_snapshot_listener(self.pricing.on_snapshot)
+        # Long series are built off the event loop
+        self.executor = compute_executor
+
+    def add_snapshot_listener(self, listener: Callable[[Dict[str, float]], None]) -> None:
+        """
+        Register a callback invoked with the ZAR-based rates of each new snapshot
+
+        Listener errors are swallowed so they can never break rate serving.
+        """
+        self._snapshot_listeners.append(listener)
 
+    def _notify_snapshot(self, rates: Dict[str, float]) -> None:
+        for listener in self._snapshot_listeners:
+            try:
+                listener(rates)
+            except Exception:
+                pass
+
+    @tracer.traced("exchange.get_all_rates_from_zar")
     async def get_all_rates_from_zar(self) -> Dict[str, float]:
         """
         Fetch ALL exchange rates from ZAR in ONE API call
@@ -28,32 +136,204 @@ class ExchangeRateService:
             Dictionary of currency codes to rates
         """
         # Check batch cache first
-        if self._batch_cache and self._batch_cache_time:
-            if (datetime.now() - self._batch_cache_time).seconds < self._batch_cache_ttl:
-                return self._batch_cache.copy()
+        if self._is_batch_fresh():
+            tracer.current_span().set_attribute("cache", "hit")
+            return self._batch_cache.copy()
 
+        tracer.current_span().set_attribute("cache", "miss")
+        self.refresh_stats["fetches"] += 1
         try:
             async with httpx.AsyncClient() as client:
                 # Fetch from ZAR to get all rates in ONE call
                 url = f"{self.base_url}/latest/ZAR"
-                response = await client.get(url, timeout=5.0)
-                response.raise_for_status()
+                # Conditional request: the provider can answer 304 with no body
+                headers = self._batch_validators if self._batch_cache else {}
+                with tracer.span("exchange.upstream_fetch", url=url) as span:
+                    response = await client.get(url, headers=headers, timeout=5.0)
+                    span.set_attribute("http.status_code", response.status_code)
+                    if response.status_code == 304:
+                        return self._batch_unchanged("not_modified")
+                    response.raise_for_status()
 
                 data = response.json()
                 rates = data.get("rates", {})
+                self._remember_validators(response)
+                last_updated = data.get("time_last_updated")
+
+                # Same table as before: keep the snapshot version so per-snapshot
+                # caches, matrices and ETags are not rebuilt
+                if self._batch_cache and rates == self._batch_cache and (
+                    last_updated is None or last_updated == self._provider_last_updated
+                ):
+                    return self._batch_unchanged("unchanged")
 
                 # Cache all rates
                 self._batch_cache = rates
                 self._batch_cache_time = datetime.now()
+                self._learn_update_interval(last_updated)
+                self._provider_last_updated = last_updated
+                self._refresh_backoff = self._batch_cache_ttl
+                self._schedule_refresh(data)
+                self._snapshot_version += 1
+                self.refresh_stats["useful"] += 1
+                self._notify_snapshot(rates)
 
                 return rates.copy()
 
         except Exception as e:
+            self.refresh_stats["errors"] += 1
             # If batch fails, return cached data if available
             if self._batch_cache:
                 return self._batch_cache.copy()
             raise Exception(f"Failed to fetch batch rates: {str(e)}")
 
+    def _is_batch_fresh(self) -> bool:
+        if not self._batch_cache:
+            return False
+        if self._batch_next_refresh is not None:
+            return datetime.now() < self._batch_next_refresh
+        if self._batch_cache_time is None:
+            return False
+        return (datetime.now() - self._batch_cache_time).total_seconds() < self._batch_cache_ttl
+
+    def _remember_validators(self, response) -> None:
+        validators = {}
+        etag = response.headers.get("ETag")
+        if isinstance(etag, str):
+            validators["If-None-Match"] = etag
+        last_modified = response.headers.get("Last-Modified")
+        if isinstance(last_modified, str):
+            validators["If-Modified-Since"] = last_modified
+        self._batch_validators = validators
+
+    def _learn_update_interval(self, last_updated: Optional[int]) -> None:
+        # Successive provider timestamps give its actual publish cadence. A
+        # skipped publish or a restart shows up as a multiple of it, so take
+        # the shortest recent gap, within sane bounds
+        previous = self._provider_last_updated
+        if last_updated is not None and previous is not None and last_updated > previous:
+            self._update_deltas.append(last_updated - previous)
+            low, high = self._update_interval_bounds
+            self._provider_update_interval = min(max(min(self._update_deltas), low), high)
+
+    def _schedule_refresh(self, data: Optional[Dict] = None) -> None:
+        """
+        Set the next batch refresh from the provider's publish schedule
+
+        Uses time_next_update when the payload has it, otherwise
+        time_last_updated plus the provider cadence. When that time has
+        passed, or the provider gives no schedule, polls back off
+        exponentially from the fixed TTL up to _refresh_backoff_max.
+        """
+        now = datetime.now().timestamp()
+        data = data or {}
+        next_update = data.get("time_next_update")
+        if next_update is None and self._provider_last_updated is not None:
+            next_update = self._provider_last_updated + self._provider_update_interval
+        if next_update is not None and float(next_update) + self._refresh_grace > now:
+            due = float(next_update) + self._refresh_grace
+        else:
+            due = now + self._refresh_backoff
+            self._refresh_backoff = min(self._refresh_backoff * 2, self._refresh_backoff_max)
+        self._batch_next_refresh = datetime.fromtimestamp(due)
+
+    def _batch_unchanged(self, outcome: str) -> Dict[str, float]:
+        self.refresh_stats[outcome] += 1
+        self._batch_cache_time = datetime.now()
+        self._schedule_refresh()
+        tracer.current_span().set_attribute("refresh", outcome)
+        return self._batch_cache.copy()
+
+    def apply_snapshot(
+        self,
+        rates: Dict[str, float],
+        hold_seconds: float,
+        provider_last_updated: Optional[int] = None
+    ) -> None:
+        """
+        Install a snapshot fetched by another node
+
+        The table is swapped in with a single assignment, so concurrent
+        requests see the old or the new snapshot, never a mix. The node then
+        does not poll upstream itself for hold_seconds.
+
+        Args:
+            rates: Complete ZAR-based rate table
+            hold_seconds: How long to serve it without fetching
+            provider_last_updated: Provider timestamp of the table
+        """
+        self._batch_cache = rates
+        self._batch_cache_time = datetime.now()
+        self._batch_next_refresh = self._batch_cache_time + timedelta(seconds=hold_seconds)
+        self._provider_last_updated = provider_last_updated
+        # Our validators describe the table we fetched, not this one
+        self._batch_validators = {}
+        self._snapshot_version += 1
+        self.refresh_stats["replicated"] += 1
+        self._notify_snapshot(rates)
+
+    def hold_snapshot(self, hold_seconds: float) -> None:
+        """Keep serving the current snapshot without fetching for at least hold_seconds"""
+        until = datetime.now() + timedelta(seconds=hold_seconds)
+        if self._batch_next_refresh is None or self._batch_next_refresh < until:
+            self._batch_next_refresh = until
+
+    def get_refresh_stats(self) -> Dict:
+        """
+        Batch refresh counters: useful fetches vs wasted ones
+
+        Returns:
+            Counters, wasted total, and the provider/next-refresh times
+        """
+        stats = dict(self.refresh_stats)
+        stats["wasted"] = stats["not_modified"] + stats["unchanged"]
+        stats["provider_last_updated"] = self._provider_last_updated
+        stats["provider_update_interval"] = self._provider_update_interval
+        stats["next_refresh"] = (
+            self._batch_next_refresh.isoformat() if self._batch_next_refresh else None
+        )
+        return stats
+
+    async def get_snapshot_version(self) -> Optional[int]:
+        """
+        Get the version of the current rate snapshot, refreshing it if stale
+
+        Returns:
+            Monotonic snapshot version, or None if no snapshot is available
+        """
+        try:
+            await self.get_all_rates_from_zar()
+        except Exception:
+            return None
+        return self._snapshot_version if self._batch_cache else None
+
+    async def get_cross_rates(
+        self, currencies: List[str], target_currency: str
+    ) -> np.ndarray:
+        """
+        Get current rates from several currencies to one target using the batch snapshot
+
+        Args:
+            currencies: Base currency codes
+            target_currency: The target currency code
+
+        Returns:
+            Array of rates aligned with currencies
+
+        Raises:
+            LookupError: If a currency is missing from the snapshot
+        """
+        all_rates = await self.get_all_rates_from_zar()
+        all_rates.setdefault("ZAR", 1.0)
+
+        missing = [c for c in currencies + [target_currency] if not all_rates.get(c)]
+        if missing:
+            raise LookupError(f"Rates not available for: {', '.join(missing)}")
+
+        zar_rates = np.array([all_rates[c] for c in currencies], dtype=np.float64)
+        return all_rates[target_currency] / zar_rates
+
+    @tracer.traced("exchange.get_rate")
     async def get_rate(self, base_currency: str, target_currency: str) -> float:
         """
         Fetch exchange rate from base currency to target currency
@@ -73,8 +353,11 @@ class ExchangeRateService:
         if cache_key in self._cache:
             cached_rate, cached_time = self._cache[cache_key]
             if (datetime.now() - cached_time).seconds < self._cache_ttl:
+                tracer.current_span().set_attribute("cache", "hit")
                 return cached_rate
 
+        tracer.current_span().set_attribute("cache", "miss")
+
         # If converting TO ZAR, try to use batch cache first
         if target_currency == "ZAR":
             try:
@@ -93,8 +376,9 @@ class ExchangeRateService:
                 # Using the latest endpoint
                 url = f"{self.base_url}/latest/{base_currency}"
 
-                response = await client.get(url, timeout=5.0)
-                response.raise_for_status()
+                with tracer.span("exchange.upstream_fetch", url=url):
+                    response = await client.get(url, timeout=5.0)
+                    response.raise_for_status()
 
                 data = response.json()
 
@@ -106,6 +390,12 @@ class ExchangeRateService:
 
                 rate_value = float(rate)
 
+                # Quotes that disagree with the snapshot are replaced by its cross rate
+                self.consistency.update_secondary(base_currency, rates)
+                anomaly = self.consistency.check_quote(base_currency, target_currency, rate_value)
+                if anomaly:
+                    rate_value = anomaly["implied"]
+
                 # Cache the result
                 self._cache[cache_key] = (rate_value, datetime.now())
 
@@ -116,49 +406,225 @@ class ExchangeRateService:
         except Exception as e:
             raise Exception(f"Error getting exchange rate: {str(e)}")
 
-    async def get_historical_rates(
-        self, base_currency: str, target_currency: str, days: int
-    ) -> List[Dict]:
+    def get_rate_as_of(
+        self, base_currency: str, target_currency: str, as_of: datetime
+    ) -> Tuple[float, int]:
         """
-        Generate historical exchange rate data using numpy for performance
+        Get the rate that was quoted at a point in time
 
         Args:
             base_currency: The base currency code
             target_currency: The target currency code
-            days: Number of days to go back
+            as_of: Point in time (naive values are UTC)
 
         Returns:
-            List of dictionaries with date and rate
+            (rate, snapshot time in epoch ms)
+
+        Raises:
+            LookupError: If no snapshot or no quote for the pair existed then
+        """
+        rates, snapshot_times = self.get_rates_as_of(
+            base_currency, target_currency, np.array([datetime_to_ms(as_of)])
+        )
+        if snapshot_times[0] < 0 or np.isnan(rates[0]):
+            raise LookupError(
+                f"No {base_currency}/{target_currency} rate recorded at or before {as_of.isoformat()}"
+            )
+        return float(rates[0]), int(snapshot_times[0])
+
+    def get_rates_as_of(
+        self, base_currency: str, target_currency: str, timestamps_ms: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Resolve many points in time with one vectorized binary search
+
+        Args:
+            base_currency: The base currency code
+            target_currency: The target currency code
+            timestamps_ms: Points in time as epoch milliseconds
+
+        Returns:
+            (rates with NaN where unknown, snapshot times with -1 where none existed)
         """
+        rows = self.snapshot_log.locate(timestamps_ms)
+        rates = self.snapshot_log.cross_rates(rows, base_currency, target_currency)
+        return rates, self.snapshot_log.times_of(rows)
+
+    def get_cross_rate_history(
+        self, currencies: List[str], target_currency: str, lookback_days: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Recorded rates from several currencies to one target over a lookback window
+
+        Only snapshots that quote every currency are kept.
+
+        Args:
+            currencies: Base currency codes
+            target_currency: The target currency code
+            lookback_days: Length of the window ending now
+
+        Returns:
+            (snapshot times in epoch ms, rates of shape (snapshots, currencies)),
+            oldest first
+
+        Raises:
+            LookupError: If a currency was never recorded
+        """
+        log = self.snapshot_log
+        start, stop = log.rows_between(now_ms() - lookback_days * 86_400_000)
+        block = log.rate_block(currencies + [target_currency], start, stop)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rates = block[:, -1:] / block[:, :-1]
+        complete = np.all(np.isfinite(rates) & (rates > 0), axis=1)
+        return log.timestamps[start:stop][complete], rates[complete]
+
+    async def get_exact_rate(
+        self, base_currency: str, target_currency: str, as_of: Optional[datetime] = None
+    ) -> Decimal:
+        """
+        Get the exchange rate as a Decimal quantized by quantize_rate
+
+        Cross rates are divided in Decimal from the provider's quoted values,
+        avoiding the float error of 1.0 / rate.
+
+        Args:
+            base_currency: The base currency code
+            target_currency: The target currency code
+            as_of: Use the snapshot in effect at this time instead of the latest
+
+        Returns:
+            Rate with 9 decimal places, or 12 significant digits for small rates
+        """
+        if as_of is not None:
+            _, snapshot = self.snapshot_log.rates_at(datetime_to_ms(as_of))
+            if not snapshot.get(base_currency) or not snapshot.get(target_currency):
+                raise LookupError(f"No {base_currency}/{target_currency} rate recorded at {as_of.isoformat()}")
+            rate = Decimal(str(snapshot[target_currency])) / Decimal(str(snapshot[base_currency]))
+            return quantize_rate(rate)
+
+        rate = None
         try:
-            # Get current rate as baseline
-            current_rate = await self.get_rate(base_currency, target_currency)
+            all_rates = await self.get_all_rates_from_zar()
+            all_rates.setdefault("ZAR", 1.0)
+            if all_rates.get(base_currency) and all_rates.get(target_currency):
+                rate = Decimal(str(all_rates[target_currency])) / Decimal(str(all_rates[base_currency]))
+        except Exception:
+            pass  # Fall through to the pair rate
+
+        if rate is None:
+            rate = Decimal(str(await self.get_rate(base_currency, target_currency)))
+
+        return quantize_rate(rate)
+
+    async def convert_exact(
+        self,
+        amount: Decimal,
+        base_currency: str,
+        target_currency: str,
+        rounding: str = ROUND_HALF_EVEN,
+        as_of: Optional[datetime] = None
+    ) -> Dict:
+        """
+        Convert an amount exactly using int64 minor units and a scaled rate
+
+        Args:
+            amount: Amount in base currency major units
+            base_currency: The base currency code
+            target_currency: The target currency code
+            rounding: A decimal ROUND_* mode applied to the amount and result
+            as_of: Convert at the snapshot in effect at this time
+
+        Returns:
+            Dictionary matching the ExactConversion schema
+        """
+        rate = await self.get_exact_rate(base_currency, target_currency, as_of)
+        amount_minor = to_minor_units(amount, base_currency, rounding)
+        scaled, shift = precise_minor_unit_rate(rate, base_currency, target_currency)
+        converted_minor = int(convert_minor_units(amount_minor, scaled, rounding, shift)[0])
+
+        return {
+            "rate": rate,
+            "rate_scaled": scaled,
+            "rate_exponent": -9 - shift,
+            "amount": from_minor_units(amount_minor, base_currency),
+            "amount_minor": amount_minor,
+            "converted_amount": from_minor_units(converted_minor, target_currency),
+            "converted_minor": converted_minor,
+            "rounding": rounding
+        }
+
+    async def convert_exact_batch(
+        self,
+        amounts_minor: np.ndarray,
+        base_currency: str,
+        target_currency: str,
+        rounding: str = ROUND_HALF_EVEN
+    ) -> np.ndarray:
+        """
+        Convert many int64 minor-unit amounts in one vectorized pass
 
-            # Use numpy for vectorized operations (100x faster than Python loops)
-            # Generate all random variations at once
-            variations = np.random.uniform(-0.05, 0.05, days + 1)
+        Raises:
+            OverflowError: If any converted amount does not fit in int64
+        """
+        rate = await self.get_exact_rate(base_currency, target_currency)
+        scaled, shift = precise_minor_unit_rate(rate, base_currency, target_currency)
+        return convert_minor_units(amounts_minor, scaled, rounding, shift)
 
-            # Generate trend factors
-            day_indices = np.arange(days, -1, -1)
-            trend_factors = 1 + (np.random.uniform(-0.1, 0.1, days + 1) * (day_indices / max(days, 1)))
+    async def get_historical_series(
+        self, base_currency: str, target_currency: str, days: int, seed: Optional[int] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Generate a historical rate series as packed arrays
 
-            # Calculate all historical rates at once (vectorized operation)
-            historical_rates = current_rate * (1 + variations) * trend_factors
+        Args:
+            base_currency: The base currency code
+            target_currency: The target currency code
+            days: Number of days to go back
+            seed: Seed making the series reproducible (random when None)
 
-            # Round all rates
-            historical_rates = np.round(historical_rates, 4)
+        Returns:
+            (dates as int64 days since 1970-01-01, float64 rates), oldest first
 
-            # Generate dates
-            base_date = datetime.now()
-            dates = [(base_date - timedelta(days=i)).strftime("%Y-%m-%d") for i in range(days, -1, -1)]
+        Raises:
+            TimeoutError: If the compute pool did not finish in time
+        """
+        # Get current rate as baseline
+        current_rate = await self.get_rate(base_currency, target_currency)
 
-            # Build result list
-            historical_data = [
-                {"date": date, "rate": float(rate)}
-                for date, rate in zip(dates, historical_rates)
-            ]
+        # Long series go to the compute pool (a worker process when configured)
+        rates = await self.executor.run(
+            _single_rate_history, current_rate, days, seed, size=days + 1, cpu_bound=True
+        )
+        today = np.datetime64(datetime.now().date(), "D").astype(np.int64)
+        return today - np.arange(days, -1, -1, dtype=np.int64), rates
 
-            return historical_data
+    @tracer.traced("exchange.get_historical_rates")
+    async def get_historical_rates(
+        self, base_currency: str, target_currency: str, days: int, seed: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        Generate historical exchange rate data using numpy for performance
+
+        Args:
+            base_currency: The base currency code
+            target_currency: The target currency code
+            days: Number of days to go back
+            seed: Seed making the series reproducible (random when None)
 
+        Returns:
+            List of dictionaries with date and rate
+
+        Raises:
+            TimeoutError: If the compute pool did not finish in time
+        """
+        try:
+            dates, rates = await self.get_historical_series(
+                base_currency, target_currency, days, seed
+            )
+            # Record building for long series runs in a pool thread
+            return await self.executor.run(_history_records, dates, rates, size=days + 1)
+
+        except TimeoutError:
+            raise
         except Exception as e:
             raise Exception(f"Error generating historical data: {str(e)}")
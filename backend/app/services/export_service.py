@@ -0,0 +1,170 @@
+"""Bulk historical export streamed as CSV, Arrow IPC or Parquet"""
+from datetime import date
+from typing import Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.services.exchange_rate_service import simulate_rate_history
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # pragma: no cover - optional dependency
+    pa = None
+    pq = None
+
+
+EXPORT_MEDIA_TYPES = {
+    "csv": "text/csv",
+    "arrow": "application/vnd.apache.arrow.stream",
+    "parquet": "application/vnd.apache.parquet",
+}
+EXPORT_EXTENSIONS = {"csv": "csv", "arrow": "arrows", "parquet": "parquet"}
+
+DEFAULT_CHUNK_DAYS = 365
+MAX_CHUNK_DAYS = 10_000
+MAX_EXPORT_DAYS = 365 * 50
+
+
+def iter_history_chunks(
+    current_rates: np.ndarray,
+    days: int,
+    chunk_size: int = DEFAULT_CHUNK_DAYS,
+    seed: Optional[int] = None,
+) -> Iterator[Tuple[np.ndarray, np.ndarray]]:
+    """
+    Generate a multi-currency history oldest-first, one bounded chunk at a time
+
+    Args:
+        current_rates: Current rate per currency, shape (currencies,)
+        days: Number of days to go back
+        chunk_size: Maximum rows per chunk
+        seed: Seed for a reproducible series
+
+    Yields:
+        (dates as datetime64[D], rates of shape (rows, currencies))
+    """
+    rng = np.random.default_rng(seed)
+    today = np.datetime64(date.today(), "D")
+
+    for start in range(days, -1, -chunk_size):
+        stop = max(start - chunk_size, -1)
+        day_indices = np.arange(start, stop, -1)
+        dates = today - day_indices.astype("timedelta64[D]")
+        yield dates, simulate_rate_history(current_rates, day_indices, days, rng)
+
+
+class _ChunkSink:
+    """Write-only file object whose contents are drained after each chunk"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.closed = True
+
+    def writable(self) -> bool:
+        return True
+
+    def drain(self) -> bytes:
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def _stream_csv(
+    currencies: List[str], chunks: Iterator[Tuple[np.ndarray, np.ndarray]]
+) -> Iterator[bytes]:
+    yield (",".join(["date"] + currencies) + "\n").encode("utf-8")
+    for dates, rates in chunks:
+        columns = np.column_stack([dates.astype(str), np.char.mod("%.4f", rates)])
+        yield ("\n".join(map(",".join, columns)) + "\n").encode("utf-8")
+
+
+def _record_batch(currencies: List[str], dates: np.ndarray, rates: np.ndarray):
+    arrays = [pa.array(dates)] + [pa.array(rates[:, i]) for i in range(len(currencies))]
+    return pa.RecordBatch.from_arrays(arrays, names=["date"] + currencies)
+
+
+def _arrow_schema(currencies: List[str]):
+    return pa.schema(
+        [pa.field("date", pa.date32())]
+        + [pa.field(code, pa.float64()) for code in currencies]
+    )
+
+
+def _stream_arrow(
+    currencies: List[str], chunks: Iterator[Tuple[np.ndarray, np.ndarray]]
+) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    with pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), _arrow_schema(currencies)) as writer:
+        for dates, rates in chunks:
+            writer.write_batch(_record_batch(currencies, dates, rates))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def _stream_parquet(
+    currencies: List[str], chunks: Iterator[Tuple[np.ndarray, np.ndarray]]
+) -> Iterator[bytes]:
+    sink = _ChunkSink()
+    with pq.ParquetWriter(pa.PythonFile(sink, mode="w"), _arrow_schema(currencies)) as writer:
+        for dates, rates in chunks:
+            # One row group per chunk, flushed to the sink as it is written
+            writer.write_batch(_record_batch(currencies, dates, rates), row_group_size=len(dates))
+            yield sink.drain()
+    yield sink.drain()
+
+
+def stream_export(
+    export_format: str,
+    currencies: List[str],
+    current_rates: np.ndarray,
+    days: int,
+    chunk_size: int = DEFAULT_CHUNK_DAYS,
+    seed: Optional[int] = None,
+) -> Iterator[bytes]:
+    """
+    Stream a wide date x currency history in the requested format
+
+    Memory is bounded by chunk_size rows regardless of the range requested.
+
+    Args:
+        export_format: One of EXPORT_MEDIA_TYPES
+        currencies: Column codes, aligned with current_rates
+        current_rates: Current rate per currency to the target
+        days: Number of days to go back
+        chunk_size: Rows per CSV chunk / Arrow batch / Parquet row group
+        seed: Seed for a reproducible series
+
+    Returns:
+        Iterator of encoded byte chunks
+
+    Raises:
+        ValueError: If the format is unknown or its dependency is missing
+    """
+    if export_format not in EXPORT_MEDIA_TYPES:
+        raise ValueError(f"Unsupported export format: {export_format}")
+    if export_format != "csv" and pa is None:
+        raise ValueError(f"Export format '{export_format}' requires pyarrow")
+
+    chunks = iter_history_chunks(current_rates, days, chunk_size, seed)
+    if export_format == "csv":
+        return _stream_csv(currencies, chunks)
+    if export_format == "arrow":
+        return _stream_arrow(currencies, chunks)
+    return _stream_parquet(currencies, chunks)
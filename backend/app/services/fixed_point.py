@@ -0,0 +1,230 @@
+"""Exact fixed-point currency conversion over scaled int64 values"""
+from decimal import (
+    Decimal,
+    ROUND_CEILING,
+    ROUND_DOWN,
+    ROUND_FLOOR,
+    ROUND_HALF_DOWN,
+    ROUND_HALF_EVEN,
+    ROUND_HALF_UP,
+    ROUND_UP,
+)
+from typing import Tuple, Union
+
+import numpy as np
+
+from app.services.currency_registry import get_minor_units
+
+
+# Rates carry 9 decimals; RATE_SCALE**2 must stay below the int64 limit so
+# the low-limb product in convert_minor_units cannot overflow
+RATE_SCALE = 10 ** 9
+# Significant digits kept for small rates, using up to MAX_RATE_SHIFT extra
+# decimals; RATE_SCALE * 10**MAX_RATE_SHIFT must stay below INT64_MAX / 3
+RATE_DIGITS = 12
+MAX_RATE_SHIFT = 9
+INT64_MAX = np.iinfo(np.int64).max
+INT64_MIN = np.iinfo(np.int64).min
+
+ROUNDING_MODES = (
+    ROUND_HALF_EVEN,
+    ROUND_HALF_UP,
+    ROUND_HALF_DOWN,
+    ROUND_UP,
+    ROUND_DOWN,
+    ROUND_CEILING,
+    ROUND_FLOOR,
+)
+
+Number = Union[Decimal, str, int, float]
+
+
+def _to_decimal(value: Number) -> Decimal:
+    # str() of a float is its shortest round-trip repr, not its binary expansion
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def _check_rounding(rounding: str) -> None:
+    if rounding not in ROUNDING_MODES:
+        raise ValueError(f"Unsupported rounding mode: {rounding}")
+
+
+def to_minor_units(amount: Number, currency: str, rounding: str = ROUND_HALF_EVEN) -> int:
+    """
+    Convert a major-unit amount to integer minor units (e.g. 12.34 USD -> 1234)
+
+    Raises:
+        OverflowError: If the result does not fit in int64
+    """
+    _check_rounding(rounding)
+    minor = _to_decimal(amount).scaleb(get_minor_units(currency))
+    value = int(minor.to_integral_value(rounding=rounding))
+    if not INT64_MIN < value <= INT64_MAX:
+        raise OverflowError(f"Amount {amount} {currency} does not fit in int64")
+    return value
+
+
+def from_minor_units(minor: int, currency: str) -> Decimal:
+    """Convert integer minor units back to an exact major-unit Decimal"""
+    return Decimal(int(minor)).scaleb(-get_minor_units(currency))
+
+
+def scale_rate(rate: Number) -> int:
+    """Quantize a major-unit rate to RATE_SCALE fixed point"""
+    scaled = int((_to_decimal(rate) * RATE_SCALE).to_integral_value(rounding=ROUND_HALF_EVEN))
+    if not 0 < scaled <= INT64_MAX:
+        raise ValueError(f"Rate {rate} is not representable as a positive scaled int64")
+    return scaled
+
+
+def quantize_rate(rate: Number) -> Decimal:
+    """
+    Round a rate of 1 or more to 9 decimal places, a smaller one to
+    RATE_DIGITS significant digits
+
+    Cross rates between a weak and a strong currency (IRR -> KWD is about
+    0.000007) would keep only a few significant digits at 9 decimals.
+    """
+    rate = _to_decimal(rate)
+    exponent = -9
+    if rate and rate.adjusted() < 0:
+        exponent = rate.adjusted() - (RATE_DIGITS - 1)
+    exponent = max(exponent, -9 - MAX_RATE_SHIFT)
+    return rate.quantize(Decimal(1).scaleb(exponent), rounding=ROUND_HALF_EVEN)
+
+
+def minor_unit_rate(rate: Number, base_currency: str, target_currency: str) -> int:
+    """
+    Scaled rate from base minor units to target minor units
+
+    Folds the minor-unit exponents into the rate, so a KWD (3) -> JPY (0)
+    rate of 500 becomes 0.5 yen per fils before scaling.
+    """
+    exponent = get_minor_units(target_currency) - get_minor_units(base_currency)
+    return scale_rate(_to_decimal(rate).scaleb(exponent))
+
+
+def precise_minor_unit_rate(rate: Number, base_currency: str, target_currency: str) -> Tuple[int, int]:
+    """
+    Minor-unit rate keeping RATE_DIGITS significant digits
+
+    Like minor_unit_rate, but the exponents are folded in before the single
+    quantization, and small rates get up to MAX_RATE_SHIFT extra decimals
+    instead of being cut at 9.
+
+    Returns:
+        (scaled, shift) with the rate equal to scaled / (RATE_SCALE * 10**shift)
+    """
+    exponent = get_minor_units(target_currency) - get_minor_units(base_currency)
+    rate = quantize_rate(_to_decimal(rate).scaleb(exponent))
+    shift = max(0, -rate.as_tuple().exponent - 9)
+    scaled = int(rate.scaleb(9 + shift))
+    if not 0 < scaled <= INT64_MAX:
+        raise ValueError(f"Rate {rate} is not representable as a positive scaled int64")
+    return scaled, shift
+
+
+def _rounding_increment(remainder, divisor: int, quotient, negative, rounding: str):
+    twice = remainder * 2
+    if rounding == ROUND_DOWN:
+        return np.zeros_like(remainder, dtype=bool)
+    if rounding == ROUND_UP:
+        return remainder > 0
+    if rounding == ROUND_HALF_UP:
+        return twice >= divisor
+    if rounding == ROUND_HALF_DOWN:
+        return twice > divisor
+    if rounding == ROUND_HALF_EVEN:
+        return (twice > divisor) | ((twice == divisor) & (quotient % 2 == 1))
+    if rounding == ROUND_CEILING:
+        return (remainder > 0) & ~negative
+    return (remainder > 0) & negative  # ROUND_FLOOR
+
+
+def _scaled_product(magnitude: np.ndarray, scaled_rate: int) -> Tuple[np.ndarray, np.ndarray]:
+    # floor(magnitude * scaled_rate / RATE_SCALE) and the remainder, without
+    # a 128-bit product (see convert_minor_units)
+    rate_whole, rate_frac = divmod(int(scaled_rate), RATE_SCALE)
+    amount_high, amount_low = np.divmod(magnitude, RATE_SCALE)
+
+    if rate_whole and np.any(magnitude > INT64_MAX // rate_whole):
+        raise OverflowError("Converted amount exceeds int64 range")
+    if rate_frac and np.any(amount_high > INT64_MAX // rate_frac):
+        raise OverflowError("Converted amount exceeds int64 range")
+
+    whole = magnitude * rate_whole
+    partial = amount_high * rate_frac
+    quotient, remainder = np.divmod(amount_low * rate_frac, RATE_SCALE)
+
+    if np.any(whole > INT64_MAX - partial - quotient - 1):
+        raise OverflowError("Converted amount exceeds int64 range")
+    return whole + partial + quotient, remainder
+
+
+def convert_minor_units(
+    amounts: Union[np.ndarray, int],
+    scaled_rate: int,
+    rounding: str = ROUND_HALF_EVEN,
+    shift: int = 0,
+) -> np.ndarray:
+    """
+    Exactly convert int64 minor-unit amounts with a scaled minor-unit rate
+
+    Computes amount * scaled_rate / RATE_SCALE without a 128-bit product by
+    splitting both operands at RATE_SCALE:
+
+        a * (ri*S + rf) / S = a*ri + ah*rf + (al*rf) / S
+
+    where a = ah*S + al. Only the last term is fractional, and al*rf < S**2
+    always fits in int64, so the single rounding step is exact.
+
+    With a shift (rates from precise_minor_unit_rate, below 1000 in minor
+    units), the divisor is N = S * D with D = 10**shift, and the amount is
+    split at D instead: a = ah*D + al gives ah*r/S + al*ri/D + al*rf/N,
+    whose three fractional remainders sum below 3N without overflowing.
+
+    Args:
+        amounts: Minor-unit amounts (scalar or int64 array)
+        scaled_rate: Rate from minor_unit_rate or precise_minor_unit_rate
+        rounding: A decimal ROUND_* mode
+        shift: Extra rate decimals from precise_minor_unit_rate
+
+    Returns:
+        int64 array of converted minor-unit amounts
+
+    Raises:
+        OverflowError: If any converted amount does not fit in int64
+        ValueError: If the rounding mode or shift is invalid
+    """
+    _check_rounding(rounding)
+    if not 0 <= shift <= MAX_RATE_SHIFT:
+        raise ValueError(f"Rate shift must be between 0 and {MAX_RATE_SHIFT}")
+    amounts = np.atleast_1d(np.asarray(amounts, dtype=np.int64))
+    if np.any(amounts == INT64_MIN):
+        raise OverflowError("Amount INT64_MIN cannot be negated safely")
+
+    negative = amounts < 0
+    magnitude = np.abs(amounts)
+
+    if not shift:
+        total, remainder = _scaled_product(magnitude, scaled_rate)
+        divisor = RATE_SCALE
+    else:
+        unit = 10 ** shift
+        divisor = RATE_SCALE * unit
+        rate_whole, rate_frac = divmod(int(scaled_rate), RATE_SCALE)
+        if rate_whole >= 1000:
+            raise ValueError("Shifted rates must be below 1000 minor units")
+        amount_high, amount_low = np.divmod(magnitude, unit)
+
+        high, high_rem = _scaled_product(amount_high, scaled_rate)
+        whole, whole_rem = np.divmod(amount_low * rate_whole, unit)
+        frac, frac_rem = np.divmod(amount_low * rate_frac, divisor)
+        carry, remainder = np.divmod(high_rem * unit + whole_rem * RATE_SCALE + frac_rem, divisor)
+
+        if np.any(high > INT64_MAX - whole - frac - carry - 1):
+            raise OverflowError("Converted amount exceeds int64 range")
+        total = high + whole + frac + carry
+
+    total += _rounding_increment(remainder, divisor, total, negative, rounding)
+    return np.where(negative, -total, total)
@@ -0,0 +1,207 @@
+"""Character n-gram naive Bayes classifier for currency intent"""
+import re
+import unicodedata
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+DEFAULT_MODEL_PATH = Path(__file__).parent / "models" / "currency_intent.npz"
+DEFAULT_FEATURE_DIM = 1 << 13
+DEFAULT_NGRAM_RANGE = (2, 4)
+# Label for queries that name no supported currency
+NO_CURRENCY = "NONE"
+
+_WHITESPACE = re.compile(r"\s+")
+
+
+def _normalize(text: str) -> str:
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return _WHITESPACE.sub(" ", stripped).strip()
+
+
+def hash_ngrams(
+    text: str,
+    dim: int = DEFAULT_FEATURE_DIM,
+    ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE
+) -> np.ndarray:
+    """
+    Hash the character n-grams of a text into feature indices
+
+    The text is normalized and padded with spaces so word boundaries become
+    part of the n-grams. CRC32 keeps hashes stable across processes (the
+    built-in hash() is salted per interpreter).
+
+    Args:
+        text: Raw query text
+        dim: Number of hash buckets (a power of two)
+        ngram_range: Smallest and largest n-gram length
+
+    Returns:
+        int64 array of bucket indices, one per n-gram (repeats included)
+    """
+    padded = f" {_normalize(text)} ".encode("utf-8")
+    low, high = ngram_range
+    mask = dim - 1
+    return np.fromiter(
+        (
+            zlib.crc32(padded[i:i + n]) & mask
+            for n in range(low, high + 1)
+            for i in range(len(padded) - n + 1)
+        ),
+        dtype=np.int64
+    )
+
+
+class CurrencyIntentClassifier:
+    """
+    Multinomial naive Bayes over hashed character n-grams
+
+    Character n-grams make the model robust to typos, plurals and symbols
+    that exact matching misses. The whole model is a (labels x buckets)
+    float32 log-likelihood table plus priors, so scoring a query is one
+    gather and a row sum. A temperature fitted on held-out free-form
+    queries tempers naive Bayes' overconfidence so the confidence can gate
+    escalation.
+    """
+
+    def __init__(
+        self,
+        labels: Sequence[str],
+        log_prior: np.ndarray,
+        log_likelihood: np.ndarray,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+        temperature: float = 1.0
+    ):
+        self.labels = list(labels)
+        self.log_prior = np.asarray(log_prior, dtype=np.float32)
+        self.log_likelihood = np.asarray(log_likelihood, dtype=np.float32)
+        self.ngram_range = tuple(ngram_range)
+        self.temperature = float(temperature)
+
+    @property
+    def dim(self) -> int:
+        return self.log_likelihood.shape[1]
+
+    @classmethod
+    def train(
+        cls,
+        texts: Iterable[str],
+        labels: Iterable[str],
+        dim: int = DEFAULT_FEATURE_DIM,
+        ngram_range: Tuple[int, int] = DEFAULT_NGRAM_RANGE,
+        alpha: float = 0.1
+    ) -> "CurrencyIntentClassifier":
+        """
+        Fit priors and n-gram likelihoods with additive smoothing
+
+        Args:
+            texts: Training queries
+            labels: Label per query
+            dim: Number of hash buckets
+            ngram_range: Smallest and largest n-gram length
+            alpha: Additive (Lidstone) smoothing
+
+        Returns:
+            Trained classifier (temperature 1.0)
+        """
+        texts, labels = list(texts), list(labels)
+        names = sorted(set(labels))
+        index = {name: i for i, name in enumerate(names)}
+        counts = np.zeros((len(names), dim))
+        docs = np.zeros(len(names))
+
+        for text, label in zip(texts, labels):
+            row = index[label]
+            counts[row] += np.bincount(hash_ngrams(text, dim, ngram_range), minlength=dim)
+            docs[row] += 1
+
+        smoothed = counts + alpha
+        log_likelihood = np.log(smoothed / smoothed.sum(axis=1, keepdims=True))
+        log_prior = np.log(docs / docs.sum())
+        return cls(names, log_prior, log_likelihood, ngram_range)
+
+    def scores(self, text: str) -> np.ndarray:
+        """Unnormalized log posterior per label"""
+        features = hash_ngrams(text, self.dim, self.ngram_range)
+        return self.log_prior + self.log_likelihood[:, features].sum(axis=1)
+
+    def predict_proba(self, text: str) -> np.ndarray:
+        """Temperature-scaled posterior per label"""
+        logits = self.scores(text) / self.temperature
+        logits -= logits.max()
+        probabilities = np.exp(logits)
+        return probabilities / probabilities.sum()
+
+    def predict(self, text: str) -> Tuple[str, float]:
+        """
+        Classify a query
+
+        Returns:
+            (label, confidence in [0, 1])
+        """
+        probabilities = self.predict_proba(text)
+        best = int(np.argmax(probabilities))
+        return self.labels[best], float(probabilities[best])
+
+    def fit_temperature(
+        self,
+        texts: Sequence[str],
+        labels: Sequence[str],
+        grid: Optional[np.ndarray] = None
+    ) -> float:
+        """
+        Pick the temperature minimizing held-out negative log-likelihood
+
+        Returns:
+            The chosen temperature (also stored on the model)
+        """
+        grid = np.geomspace(1.0, 200.0, 60) if grid is None else grid
+        logits = np.stack([self.scores(text) for text in texts]).astype(np.float64)
+        target = np.array([self.labels.index(label) for label in labels])
+
+        best_nll, best_t = np.inf, 1.0
+        for t in grid:
+            scaled = logits / t
+            scaled -= scaled.max(axis=1, keepdims=True)
+            log_norm = np.log(np.exp(scaled).sum(axis=1))
+            nll = float(np.mean(log_norm - scaled[np.arange(len(target)), target]))
+            if nll < best_nll:
+                best_nll, best_t = nll, float(t)
+
+        self.temperature = best_t
+        return best_t
+
+    def save(self, path) -> None:
+        """Write the model as a compressed .npz weights file"""
+        np.savez_compressed(
+            path,
+            labels=np.array(self.labels),
+            log_prior=self.log_prior,
+            log_likelihood=self.log_likelihood,
+            ngram_range=np.array(self.ngram_range),
+            temperature=np.array(self.temperature)
+        )
+
+    @classmethod
+    def load(cls, path=DEFAULT_MODEL_PATH) -> "CurrencyIntentClassifier":
+        """Load a weights file written by save()"""
+        with np.load(path) as data:
+            return cls(
+                [str(label) for label in data["labels"]],
+                data["log_prior"],
+                data["log_likelihood"],
+                tuple(int(n) for n in data["ngram_range"]),
+                float(data["temperature"])
+            )
+
+
+def load_default_classifier(path=None) -> Optional[CurrencyIntentClassifier]:
+    """Load the shipped weights, or None if the file is missing or unreadable"""
+    try:
+        return CurrencyIntentClassifier.load(path or DEFAULT_MODEL_PATH)
+    except Exception:
+        return None
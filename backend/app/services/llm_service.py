@@ -2,18 +2,28 @@ import httpx
 import re
 from typing import Tuple, Optional
 
+from app.core.tracing import tracer
+from app.services.currency_registry import find_currency_mentions, get_display_name, has_currency_term
+from app.services.intent_classifier import load_default_classifier
+
 
 class LLMService:
     """Service for interacting with Ollama LLM for natural language processing"""
 
+    SUPPORTED_CURRENCIES = ("USD", "EUR", "GBP")
+
     def __init__(self, ollama_url: str = None):
+        import os
         # Use host.docker.internal when running in Docker, localhost otherwise
         if ollama_url is None:
-            import os
             ollama_url = os.getenv("OLLAMA_URL", "http://host.docker.internal:11434")
         self.ollama_url = ollama_url
         self.model = "llama3:8b"
+        # Local n-gram classifier; Ollama is only asked when it is unsure
+        self.classifier = load_default_classifier(os.getenv("INTENT_MODEL_PATH"))
+        self.classifier_threshold = float(os.getenv("INTENT_CONFIDENCE_THRESHOLD", "0.98"))
 
+    @tracer.traced("llm.extract_currency_from_query")
     async def extract_currency_from_query(self, query: str) -> Optional[str]:
         """
         Extract currency code from natural language query using LLM
@@ -24,23 +34,35 @@ class LLMService:
         Returns:
             Currency code (USD, EUR, GBP) or None
         """
-        # First try simple regex pattern matching (faster)
-        query_upper = query.upper()
-        if "USD" in query_upper or "DOLLAR" in query_upper:
-            return "USD"
-        elif "EUR" in query_upper or "EURO" in query_upper:
-            return "EUR"
-        elif "GBP" in query_upper or "POUND" in query_upper or "STERLING" in query_upper:
-            return "GBP"
-
-        # If pattern matching fails, use LLM
+        # First try the currency registry's code/name/alias index (faster)
+        with tracer.span("llm.registry_match") as span:
+            mentions = find_currency_mentions(query)
+            span.set_attribute("mentions", ",".join(mentions))
+        for code in mentions:
+            if code in self.SUPPORTED_CURRENCIES:
+                return code
+
+        # Then the local classifier, which handles typos, slang and symbols;
+        # a confident NONE means no supported currency, so skip the LLM too.
+        # Its answer is only trusted when the query has a currency-like
+        # token: "send money to my mom in Lagos" names none, and the n-gram
+        # model knows nothing about such queries however confident it is
+        if self.classifier is not None and has_currency_term(query, ignore=("ZAR",)):
+            with tracer.span("llm.classifier") as span:
+                label, confidence = self.classifier.predict(query)
+                span.set_attribute("label", label)
+                span.set_attribute("confidence", confidence)
+            if confidence >= self.classifier_threshold:
+                return label if label in self.SUPPORTED_CURRENCIES else None
+
+        # If the classifier is unsure, use LLM
         try:
             prompt = f"""Extract the currency code from this query.
 Valid options: USD, EUR, GBP
 Query: "{query}"
 Reply with ONLY the 3-letter currency code, nothing else."""
 
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient() as client, tracer.span("llm.ollama_generate", model=self.model):
                 response = await client.post(
                     f"{self.ollama_url}/api/generate",
                     json={
@@ -56,7 +78,7 @@ Reply with ONLY the 3-letter currency code, nothing else."""
                     currency = result.get("response", "").strip().upper()
 
                     # Validate the response
-                    if currency in ["USD", "EUR", "GBP"]:
+                    if currency in self.SUPPORTED_CURRENCIES:
                         return currency
 
         except Exception:
@@ -64,6 +86,7 @@ Reply with ONLY the 3-letter currency code, nothing else."""
 
         return None
 
+    @tracer.traced("llm.generate_friendly_response")
     async def generate_friendly_response(
         self, base_currency: str, target_currency: str, rate: float
     ) -> str:
@@ -82,15 +105,8 @@ Reply with ONLY the 3-letter currency code, nothing else."""
         simple_response = f"The current exchange rate is {rate:.4f} {target_currency} per 1 {base_currency}."
 
         # Currency names for better context
-        currency_names = {
-            "USD": "US Dollar",
-            "EUR": "Euro",
-            "GBP": "British Pound",
-            "ZAR": "South African Rand"
-        }
-
-        base_name = currency_names.get(base_currency, base_currency)
-        target_name = currency_names.get(target_currency, target_currency)
+        base_name = get_display_name(base_currency)
+        target_name = get_display_name(target_currency)
 
         try:
             prompt = f"""You are a helpful currency exchange assistant. Explain this exchange rate in a friendly, conversational way.
@@ -111,7 +127,7 @@ Instructions:
 
 Response:"""
 
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient() as client, tracer.span("llm.ollama_generate", model=self.model):
                 response = await client.post(
                     f"{self.ollama_url}/api/generate",
                     json={
@@ -137,6 +153,7 @@ Response:"""
 
         return simple_response
 
+    @tracer.traced("llm.generate_unsupported_currency_response")
     async def generate_unsupported_currency_response(
         self, query: str, supported_currencies: list
     ) -> str:
@@ -150,14 +167,7 @@ Response:"""
         Returns:
             Friendly explanation about supported currencies
         """
-        # Currency names for better context
-        currency_names = {
-            "USD": "US Dollar",
-            "EUR": "Euro",
-            "GBP": "British Pound",
-        }
-
-        supported_list = ", ".join([f"{code} ({currency_names.get(code, code)})" for code in supported_currencies])
+        supported_list = ", ".join([f"{code} ({get_display_name(code)})" for code in supported_currencies])
 
         fallback_response = f"I couldn't identify a supported currency in your query. Currently, I can help you with exchange rates for: {supported_list}. Try asking something like 'What is the USD to ZAR rate?'"
 
@@ -180,7 +190,7 @@ Keep your response to 2-3 sentences. Make it feel natural and encouraging, not r
 
 Response:"""
 
-            async with httpx.AsyncClient() as client:
+            async with httpx.AsyncClient() as client, tracer.span("llm.ollama_generate", model=self.model):
                 response = await client.post(
                     f"{self.ollama_url}/api/generate",
                     json={
@@ -0,0 +1,81 @@
+"""Multi-currency portfolio valuation over the snapshot log"""
+from typing import Dict, Optional
+
+import numpy as np
+
+from app.services.snapshot_log import SnapshotLog, ms_to_iso
+
+
+def _optional(values: np.ndarray) -> list:
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+
+def value_portfolio(
+    log: SnapshotLog,
+    holdings: Dict[str, float],
+    reporting_currency: str = "ZAR",
+    start_ms: Optional[int] = None,
+    end_ms: Optional[int] = None
+) -> Dict:
+    """
+    Value fixed holdings over every snapshot in a time window
+
+    Snapshot rates are quoted from the log's base (ZAR), so one unit of
+    currency c is worth rate[reporting] / rate[c] in the reporting currency.
+    With P the (snapshots x currencies) block of those unit prices and a the
+    amounts, the valuation series is the single product P @ a.
+
+    Args:
+        log: Snapshot log to read rates from
+        holdings: Currency code to amount held
+        reporting_currency: Currency to express values in
+        start_ms: Window start (epoch ms); the snapshot in effect then opens it
+        end_ms: Window end (epoch ms), defaults to the latest snapshot
+
+    Returns:
+        Dictionary with the series, per-currency contributions at the end of
+        the window, and P&L attributed to each currency
+
+    Raises:
+        LookupError: If no snapshot covers the window or a currency was never quoted
+    """
+    start, stop = log.rows_between(start_ms, end_ms)
+    if start == stop:
+        raise LookupError("No rate snapshots recorded in the requested window")
+
+    codes = list(holdings)
+    amounts = np.array([holdings[code] for code in codes], dtype=np.float64)
+    block = log.rate_block(codes + [reporting_currency], start, stop)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prices = block[:, -1:] / block[:, :-1]
+    values = prices @ amounts
+
+    positions = prices[-1] * amounts
+    end_value = float(values[-1])
+    weights = positions / end_value if end_value else np.full(len(codes), np.nan)
+    # Holdings are fixed, so each currency's P&L is its amount times its price move
+    pnl = (prices[-1] - prices[0]) * amounts
+
+    times = log.timestamps[start:stop]
+    return {
+        "reporting_currency": reporting_currency,
+        "as_of": ms_to_iso(int(times[-1])),
+        "total_value": _optional(values[-1:])[0],
+        "contributions": {
+            code: {"amount": float(amount), "value": value, "weight": weight}
+            for code, amount, value, weight in zip(
+                codes, amounts, _optional(positions), _optional(weights)
+            )
+        },
+        "series": {
+            "timestamps": [ms_to_iso(int(t)) for t in times],
+            "values": _optional(values)
+        },
+        "pnl": {
+            "start_value": _optional(values[:1])[0],
+            "end_value": _optional(values[-1:])[0],
+            "total": _optional(values[-1:] - values[:1])[0],
+            "by_currency": dict(zip(codes, _optional(pnl)))
+        }
+    }
@@ -0,0 +1,301 @@
+"""Bid/ask spreads and volume-tiered fees over the live rate snapshot"""
+import bisect
+import json
+import os
+from datetime import datetime
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+# Spreads are the full bid/ask width in basis points of mid; a pair's spread is
+# the sum of its two currencies' spreads unless the pair is listed explicitly.
+# Fee tiers are lower bounds on the conversion's value in fee_currency.
+DEFAULT_PRICING_TABLE = {
+    "default_spread_bps": 80.0,
+    "currency_spread_bps": {
+        "ZAR": 0.0,
+        "USD": 15.0,
+        "EUR": 15.0,
+        "GBP": 20.0,
+        "JPY": 25.0,
+        "CHF": 25.0,
+        "AUD": 30.0,
+        "CAD": 30.0,
+        "CNY": 50.0
+    },
+    "pair_spread_bps": {
+        "USD/ZAR": 20.0,
+        "EUR/ZAR": 25.0,
+        "GBP/ZAR": 30.0
+    },
+    "fee_currency": "ZAR",
+    "fee_tiers": [
+        {"min_amount": 0, "fee_bps": 100.0, "min_fee": 50.0},
+        {"min_amount": 10_000, "fee_bps": 60.0},
+        {"min_amount": 100_000, "fee_bps": 35.0},
+        {"min_amount": 1_000_000, "fee_bps": 20.0},
+        {"min_amount": 10_000_000, "fee_bps": 10.0}
+    ]
+}
+
+
+class PriceBook(NamedTuple):
+    """Quoted rates for every pair of one snapshot, indexed [base, target]"""
+    codes: List[str]
+    index: Dict[str, int]
+    mid: np.ndarray
+    bid: np.ndarray
+    ask: np.ndarray
+    spread_bps: np.ndarray
+    priced_at: str
+
+
+def load_pricing_table(path: Optional[str] = None) -> Dict:
+    """
+    Read a pricing table from a JSON file, or the default table
+
+    Keys missing from the file fall back to the default table.
+    """
+    if not path:
+        return DEFAULT_PRICING_TABLE
+    with open(path) as f:
+        return {**DEFAULT_PRICING_TABLE, **json.load(f)}
+
+
+def _optional(values: np.ndarray) -> list:
+    return [None if np.isnan(v) else v for v in values.tolist()]
+
+
+class PricingEngine:
+    """
+    Customer bid/ask rates and conversion fees for every currency pair
+
+    The spread table is compiled into an (n x n) spread matrix for the
+    snapshot's currencies, rebuilt only when that set changes. Each new
+    snapshot reprices every pair in one vectorized pass into a PriceBook
+    that replaces the previous one in a single assignment, so a quote is two
+    dict lookups and an array read. Fee tiers are sorted thresholds resolved
+    by binary search on the conversion's value in the fee currency.
+    """
+
+    def __init__(self, table: Optional[Dict] = None):
+        self._rates: Optional[Dict[str, float]] = None
+        self._book: Optional[PriceBook] = None
+        self._spread_codes: Optional[Tuple[str, ...]] = None
+        self._spread_matrix: Optional[np.ndarray] = None
+        self.repricings = 0
+        self.set_table(table or DEFAULT_PRICING_TABLE)
+
+    def set_table(self, table: Dict) -> None:
+        """
+        Load a spread/fee table and reprice the current snapshot with it
+
+        Raises:
+            ValueError: If spreads or fee tiers are invalid
+        """
+        currency_spreads = {code.upper(): float(bps) for code, bps in table.get("currency_spread_bps", {}).items()}
+        pair_spreads = {}
+        for pair, bps in table.get("pair_spread_bps", {}).items():
+            base, _, target = pair.upper().partition("/")
+            if not base or not target:
+                raise ValueError(f"Pair spreads are keyed BASE/TARGET, got {pair!r}")
+            pair_spreads[(base, target)] = float(bps)
+        default_spread = float(table.get("default_spread_bps", 0.0))
+        spreads = [default_spread, *currency_spreads.values(), *pair_spreads.values()]
+        if any(not 0 <= bps < 10_000 for bps in spreads):
+            raise ValueError("Spreads must be between 0 and 10000 basis points")
+
+        tiers = table.get("fee_tiers") or [{"min_amount": 0, "fee_bps": 0.0}]
+        tier_mins = np.array([tier["min_amount"] for tier in tiers], dtype=np.float64)
+        tier_bps = np.array([tier.get("fee_bps", 0.0) for tier in tiers], dtype=np.float64)
+        tier_min_fees = np.array([tier.get("min_fee", 0.0) for tier in tiers], dtype=np.float64)
+        if tier_mins[0] != 0 or np.any(np.diff(tier_mins) <= 0):
+            raise ValueError("Fee tiers must start at 0 and increase strictly")
+        if np.any(tier_bps < 0) or np.any(tier_bps >= 10_000) or np.any(tier_min_fees < 0):
+            raise ValueError("Fees must be non-negative and below 10000 basis points")
+
+        self.default_spread = default_spread
+        self.currency_spreads = currency_spreads
+        self.pair_spreads = pair_spreads
+        self.fee_currency = table.get("fee_currency", "ZAR").upper()
+        self.tier_mins, self.tier_bps, self.tier_min_fees = tier_mins, tier_bps, tier_min_fees
+        self._tier_mins_list = tier_mins.tolist()
+        self._spread_codes = None
+        if self._rates is not None:
+            self.on_snapshot(self._rates)
+
+    def _spreads_for(self, codes: Tuple[str, ...], index: Dict[str, int]) -> np.ndarray:
+        if codes != self._spread_codes:
+            per_currency = np.array([self.currency_spreads.get(code, self.default_spread) for code in codes])
+            matrix = per_currency[:, np.newaxis] + per_currency[np.newaxis, :]
+            for (base, target), bps in self.pair_spreads.items():
+                if base in index and target in index:
+                    matrix[index[base], index[target]] = matrix[index[target], index[base]] = bps
+            np.fill_diagonal(matrix, 0.0)
+            self._spread_codes, self._spread_matrix = codes, matrix
+        return self._spread_matrix
+
+    def on_snapshot(self, rates: Dict[str, float], base: str = "ZAR") -> None:
+        """Reprice every pair from a snapshot of rates quoted from base"""
+        usable = {code: float(rate) for code, rate in rates.items() if rate and rate > 0}
+        usable[base] = 1.0
+        codes = tuple(sorted(usable))
+        index = {code: i for i, code in enumerate(codes)}
+        quoted = np.array([usable[code] for code in codes])
+
+        spread = self._spreads_for(codes, index)
+        # mid[i, j]: units of currency j per unit of currency i
+        mid = quoted[np.newaxis, :] / quoted[:, np.newaxis]
+        half = spread / 20_000
+        self._rates = rates
+        self._book = PriceBook(
+            codes=list(codes),
+            index=index,
+            mid=mid,
+            bid=mid * (1 - half),
+            ask=mid * (1 + half),
+            spread_bps=spread,
+            priced_at=datetime.now().isoformat()
+        )
+        self.repricings += 1
+
+    def _positions(self, book: PriceBook, codes: Sequence[str]) -> np.ndarray:
+        try:
+            return np.fromiter((book.index[code] for code in codes), dtype=np.intp, count=len(codes))
+        except KeyError as e:
+            raise LookupError(f"No price for currency: {e.args[0]}") from None
+
+    def quote_batch(
+        self,
+        bases: Sequence[str],
+        targets: Sequence[str],
+        amounts: Optional[Sequence[Optional[float]]] = None
+    ) -> List[Dict]:
+        """
+        Price many conversions against the current price book
+
+        Args:
+            bases: Currency sold by the customer, per quote
+            targets: Currency bought, per quote
+            amounts: Amount of base to convert per quote, or None for a
+                rate-only quote
+
+        Returns:
+            One quote dictionary per input. The customer sells base at the
+            bid; amount fields (fee, tier, converted amount) are None for
+            rate-only quotes.
+
+        Raises:
+            LookupError: If no snapshot has been priced or a currency is unknown
+            ValueError: If an amount is not positive
+        """
+        book = self._book
+        if book is None:
+            raise LookupError("No rate snapshot has been priced yet")
+        i = self._positions(book, bases)
+        j = self._positions(book, targets)
+        fee_index = self._positions(book, [self.fee_currency])[0]
+
+        amount = np.array(
+            [np.nan if a is None else a for a in (amounts or [None] * len(i))], dtype=np.float64
+        )
+        if np.any(amount <= 0):
+            raise ValueError("Amounts must be positive")
+
+        mid, bid, ask = book.mid[i, j], book.bid[i, j], book.ask[i, j]
+        # Tier on the conversion's value in the fee currency; NaN amounts
+        # sort past every tier and are masked back to NaN below
+        notional = amount * book.mid[i, fee_index]
+        tier = np.searchsorted(self.tier_mins, notional, side="right") - 1
+        priced = ~np.isnan(amount)
+        tier = np.where(priced, tier, 0)
+        fee_bps = np.where(priced, self.tier_bps[tier], np.nan)
+        fee_in_fee_currency = np.maximum(notional * fee_bps / 10_000, self.tier_min_fees[tier])
+        fee = np.minimum(fee_in_fee_currency * book.mid[fee_index, i], amount)
+        converted = (amount - fee) * bid
+
+        return [
+            {
+                "base_currency": base,
+                "target_currency": target,
+                "mid": m,
+                "bid": b,
+                "ask": a,
+                "spread_bps": s,
+                "amount": amt,
+                "fee": f,
+                "fee_bps": bps,
+                "fee_tier": int(t) if amt is not None else None,
+                "converted_amount": c,
+                "priced_at": book.priced_at
+            }
+            for base, target, m, b, a, s, amt, f, bps, t, c in zip(
+                bases, targets, mid.tolist(), bid.tolist(), ask.tolist(),
+                book.spread_bps[i, j].tolist(), _optional(amount), _optional(fee),
+                _optional(fee_bps), tier.tolist(), _optional(converted)
+            )
+        ]
+
+    def quote(self, base: str, target: str, amount: Optional[float] = None) -> Dict:
+        """
+        Price a single conversion; same result as a one-item quote_batch
+
+        Reads the book directly and bisects the tier list in Python, which
+        for one quote is several times faster than the array path.
+        """
+        book = self._book
+        if book is None:
+            raise LookupError("No rate snapshot has been priced yet")
+        try:
+            i, j, fee_index = book.index[base], book.index[target], book.index[self.fee_currency]
+        except KeyError as e:
+            raise LookupError(f"No price for currency: {e.args[0]}") from None
+        if amount is not None and amount <= 0:
+            raise ValueError("Amounts must be positive")
+
+        quote = {
+            "base_currency": base,
+            "target_currency": target,
+            "mid": float(book.mid[i, j]),
+            "bid": float(book.bid[i, j]),
+            "ask": float(book.ask[i, j]),
+            "spread_bps": float(book.spread_bps[i, j]),
+            "amount": amount,
+            "fee": None,
+            "fee_bps": None,
+            "fee_tier": None,
+            "converted_amount": None,
+            "priced_at": book.priced_at
+        }
+        if amount is not None:
+            amount = float(amount)
+            notional = amount * float(book.mid[i, fee_index])
+            tier = bisect.bisect_right(self._tier_mins_list, notional) - 1
+            fee_bps = float(self.tier_bps[tier])
+            fee = max(notional * fee_bps / 10_000, float(self.tier_min_fees[tier]))
+            fee = min(fee * float(book.mid[fee_index, i]), amount)
+            quote.update(
+                amount=amount,
+                fee=fee,
+                fee_bps=fee_bps,
+                fee_tier=tier,
+                converted_amount=(amount - fee) * quote["bid"]
+            )
+        return quote
+
+    def stats(self) -> Dict:
+        """Repricing count and the shape of the current price book"""
+        book = self._book
+        return {
+            "repricings": self.repricings,
+            "currencies": len(book.codes) if book else 0,
+            "priced_at": book.priced_at if book else None,
+            "fee_currency": self.fee_currency,
+            "fee_tiers": len(self.tier_mins)
+        }
+
+
+def pricing_engine_from_env() -> PricingEngine:
+    """Engine with the table at PRICING_TABLE_PATH, or the default table"""
+    return PricingEngine(load_pricing_table(os.getenv("PRICING_TABLE_PATH")))
@@ -0,0 +1,229 @@
+"""Monte Carlo FX scenario simulation with percentile bands"""
+import asyncio
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.executor import ComputeExecutor
+
+
+SIMULATION_MODELS = ("gbm", "bootstrap")
+DEFAULT_PERCENTILES = (5.0, 25.0, 50.0, 75.0, 95.0)
+# Paths per independently seeded block; fixed so results do not depend on worker count
+PATH_BLOCK = 2000
+# Upper bound on float64 elements generated per time chunk within a block (~16 MB)
+MAX_CHUNK_ELEMENTS = 2_000_000
+# Horizons longer than this report bands at an even stride of steps
+MAX_BAND_POINTS = 250
+# Upper bound on retained simulated rates (paths x reported steps x currencies, ~160 MB)
+MAX_RESULT_ELEMENTS = 20_000_000
+# Recorded returns needed before drift and covariance are estimated from history
+MIN_HISTORY_RETURNS = 20
+
+
+def estimate_parameters(
+    history: np.ndarray, elapsed_days: Optional[np.ndarray] = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Estimate daily log-return drift and covariance from a rate history
+
+    Recorded snapshots need not be a day apart: each log return is treated
+    as a Brownian increment over its own gap and rescaled to one day, so
+    the daily returns used for the covariance and by bootstrap have the
+    same distribution whatever the spacing.
+
+    Args:
+        history: Rates, shape (observations, currencies), oldest first
+        elapsed_days: Time of each observation in days (default: one a day)
+
+    Returns:
+        (daily drift per currency, daily covariance matrix, daily log returns)
+    """
+    returns = np.diff(np.log(history), axis=0)
+    gaps = np.ones(len(returns)) if elapsed_days is None else np.diff(elapsed_days)
+    drift = returns.sum(axis=0) / gaps.sum()
+    daily = drift + (returns - np.outer(gaps, drift)) / np.sqrt(gaps)[:, np.newaxis]
+    covariance = np.atleast_2d(np.cov(daily, rowvar=False))
+    return drift, covariance, daily
+
+
+def report_steps(steps: int, max_points: int = MAX_BAND_POINTS) -> np.ndarray:
+    """Step numbers (1-based) at which bands are reported, always ending at the horizon"""
+    stride = -(-steps // max_points)
+    points = np.arange(stride, steps + 1, stride)
+    if points[-1] != steps:
+        points = np.append(points, steps)
+    return points
+
+
+def simulate_paths_block(
+    model: str,
+    spot: np.ndarray,
+    drift: np.ndarray,
+    factor: np.ndarray,
+    returns: np.ndarray,
+    steps: int,
+    n_paths: int,
+    seed: np.random.SeedSequence,
+    chunk_steps: int,
+    reported: np.ndarray
+) -> np.ndarray:
+    """
+    Simulate one block of paths in time chunks, keeping only reported steps
+
+    Cumulative log returns are carried from chunk to chunk, so memory is
+    bounded by n_paths x chunk_steps x currencies whatever the horizon.
+    GBM draws correlated normal shocks (log-space drift plus Cholesky factor
+    times standard normals); bootstrap resamples whole historical return
+    rows, which keeps the cross-currency dependence of the sample.
+
+    Returns:
+        Simulated rates, shape (n_paths, len(reported), currencies)
+    """
+    rng = np.random.default_rng(seed)
+    currencies = len(spot)
+    out = np.empty((n_paths, len(reported), currencies))
+    level = np.zeros((n_paths, currencies))
+    filled = 0
+
+    for start in range(0, steps, chunk_steps):
+        count = min(chunk_steps, steps - start)
+        # Draw step-major so the random stream, and the result, does not
+        # depend on the chunk size
+        if model == "gbm":
+            shocks = rng.standard_normal((count, n_paths, currencies)).transpose(1, 0, 2)
+            increments = drift + shocks @ factor.T
+        else:
+            increments = returns[rng.integers(0, len(returns), size=(count, n_paths)).T]
+
+        paths = level[:, np.newaxis, :] + np.cumsum(increments, axis=1)
+        level = paths[:, -1, :]
+
+        wanted = reported[(reported > start) & (reported <= start + count)]
+        out[:, filled:filled + len(wanted), :] = paths[:, wanted - start - 1, :]
+        filled += len(wanted)
+
+    return spot * np.exp(out)
+
+
+async def _gather_or_cancel(jobs) -> list:
+    """Await all jobs; on the first failure cancel the rest and re-raise it"""
+    tasks = [asyncio.ensure_future(job) for job in jobs]
+    try:
+        return await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+
+
+def percentile_bands(levels: np.ndarray, percentiles: np.ndarray) -> np.ndarray:
+    """Percentiles across paths, shape (percentiles, reported steps, currencies)"""
+    return np.percentile(levels, percentiles, axis=0)
+
+
+async def run_simulation(
+    currencies: List[str],
+    spot: np.ndarray,
+    horizon_days: int,
+    paths: int,
+    model: str = "gbm",
+    history: Optional[np.ndarray] = None,
+    elapsed_days: Optional[np.ndarray] = None,
+    volatility: Optional[float] = None,
+    percentiles=DEFAULT_PERCENTILES,
+    seed: Optional[int] = None,
+    executor: Optional[ComputeExecutor] = None
+) -> Dict:
+    """
+    Simulate forward rate scenarios and summarise them as percentile bands
+
+    Drift and covariance are estimated from recorded rates when there are
+    at least MIN_HISTORY_RETURNS returns. Otherwise GBM runs driftless with
+    the caller's daily volatility and no cross-currency correlation; with
+    neither, the simulation is refused rather than run on made-up
+    parameters. Path blocks run concurrently through the compute executor
+    (worker processes when it is configured for them), and a seed
+    reproduces the result.
+
+    Args:
+        currencies: Currency codes, aligned with spot
+        spot: Current rate per currency to the target currency
+        horizon_days: Number of daily steps to simulate
+        paths: Number of paths
+        model: "gbm" or "bootstrap"
+        history: Recorded rates, shape (observations, currencies), oldest first
+        elapsed_days: Time of each history row in days
+        volatility: Daily log-return volatility to use without enough history
+        percentiles: Percentiles to report (0-100)
+        seed: Seed for every random draw
+        executor: Pool to run blocks in (defaults to running inline)
+
+    Returns:
+        Dictionary with steps, parameter source, volatility and bands per currency
+
+    Raises:
+        ValueError: If the model is unknown, or there is too little history
+            and no usable volatility
+    """
+    if model not in SIMULATION_MODELS:
+        raise ValueError(f"Unsupported simulation model: {model}")
+    observations = 0 if history is None else len(history)
+    if observations > MIN_HISTORY_RETURNS:
+        source = "history"
+        drift, covariance, returns = estimate_parameters(history, elapsed_days)
+    elif model == "bootstrap":
+        raise ValueError(
+            f"Bootstrap needs {MIN_HISTORY_RETURNS + 1} recorded snapshots, "
+            f"only {observations} available"
+        )
+    elif volatility is not None:
+        source = "volatility"
+        drift = np.zeros(len(spot))
+        covariance = np.diag(np.full(len(spot), float(volatility) ** 2))
+        returns = np.empty((0, len(spot)))
+    else:
+        raise ValueError(
+            f"Only {observations} recorded snapshots, {MIN_HISTORY_RETURNS + 1} needed to "
+            "estimate volatility; pass a daily volatility instead"
+        )
+    # Without a pool every block runs inline
+    executor = executor or ComputeExecutor(threshold=np.iinfo(np.int64).max)
+
+    block_seeds = np.random.SeedSequence(seed).spawn(-(-paths // PATH_BLOCK))
+    factor = np.linalg.cholesky(covariance + np.eye(len(spot)) * 1e-12)
+    # Very large requests get coarser bands rather than unbounded memory
+    reported = report_steps(
+        horizon_days, max(1, min(MAX_BAND_POINTS, MAX_RESULT_ELEMENTS // (paths * len(spot))))
+    )
+
+    jobs = []
+    for i, block_seed in enumerate(block_seeds):
+        n_paths = min(PATH_BLOCK, paths - i * PATH_BLOCK)
+        chunk_steps = max(1, MAX_CHUNK_ELEMENTS // (n_paths * len(spot)))
+        jobs.append(executor.run(
+            simulate_paths_block,
+            model, spot, drift, factor, returns, horizon_days, n_paths, block_seed,
+            chunk_steps, reported,
+            size=n_paths * horizon_days * len(spot),
+            cpu_bound=True
+        ))
+    levels = np.concatenate(await _gather_or_cancel(jobs), axis=0)
+
+    percentiles = np.asarray(percentiles, dtype=np.float64)
+    bands = await executor.run(percentile_bands, levels, percentiles, size=levels.size)
+
+    return {
+        "steps": reported.tolist(),
+        "spot": dict(zip(currencies, spot.tolist())),
+        "parameter_source": source,
+        "history_points": observations,
+        "daily_volatility": dict(zip(currencies, np.sqrt(np.diag(covariance)).tolist())),
+        "bands": {
+            code: {
+                f"p{p:g}": bands[k, :, j].tolist() for k, p in enumerate(percentiles)
+            }
+            for j, code in enumerate(currencies)
+        }
+    }
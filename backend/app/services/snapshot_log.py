@@ -0,0 +1,197 @@
+"""Time-ordered, array-backed log of rate snapshots for point-in-time lookups"""
+import time
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+
+def now_ms() -> int:
+    """Current UTC time as epoch milliseconds"""
+    return time.time_ns() // 1_000_000
+
+
+def datetime_to_ms(value: datetime) -> int:
+    """Convert a datetime to epoch milliseconds, treating naive values as UTC"""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp() * 1000)
+
+
+def ms_to_iso(timestamp_ms: int) -> str:
+    """Format epoch milliseconds as a naive UTC ISO string, like utcnow().isoformat()"""
+    return datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc).replace(tzinfo=None).isoformat()
+
+
+class SnapshotLog:
+    """
+    Append-only log of ZAR-based rate snapshots
+
+    Snapshot times live in a sorted int64 array (epoch milliseconds) and
+    rates in a 2D float64 block with one row per snapshot and one column per
+    currency. Both grow by doubling, so appends are amortized O(1), and an
+    as_of lookup is a binary search over the time array. Currencies that
+    appear later get a new column, NaN for earlier snapshots.
+    """
+
+    def __init__(self, base_currency: str = "ZAR", initial_capacity: int = 64):
+        self.base_currency = base_currency
+        capacity = max(1, initial_capacity)
+        self._times = np.empty(capacity, dtype=np.int64)
+        self._block = np.full((capacity, 0), np.nan)
+        self._size = 0
+        self._columns: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def timestamps(self) -> np.ndarray:
+        """Read-only view of snapshot times (epoch ms), ascending"""
+        view = self._times[:self._size]
+        view.flags.writeable = False
+        return view
+
+    @property
+    def currencies(self) -> List[str]:
+        return list(self._columns)
+
+    def _ensure_columns(self, codes) -> None:
+        new = [code for code in codes if code not in self._columns]
+        if not new:
+            return
+        for code in new:
+            self._columns[code] = len(self._columns)
+        padding = np.full((self._block.shape[0], len(new)), np.nan)
+        self._block = np.concatenate([self._block, padding], axis=1)
+
+    def _ensure_capacity(self) -> None:
+        if self._size < len(self._times):
+            return
+        capacity = len(self._times) * 2
+        times = np.empty(capacity, dtype=np.int64)
+        times[:self._size] = self._times[:self._size]
+        block = np.full((capacity, self._block.shape[1]), np.nan)
+        block[:self._size] = self._block[:self._size]
+        self._times, self._block = times, block
+
+    def append(self, rates: Dict[str, float], timestamp_ms: Optional[int] = None) -> None:
+        """
+        Record a snapshot quoted from the base currency
+
+        Args:
+            rates: Currency code to rate from the base currency
+            timestamp_ms: Snapshot time (defaults to now); a snapshot with the
+                same time as the latest one replaces it
+
+        Raises:
+            ValueError: If the timestamp is older than the latest snapshot
+        """
+        timestamp_ms = now_ms() if timestamp_ms is None else int(timestamp_ms)
+        if self._size and timestamp_ms < self._times[self._size - 1]:
+            raise ValueError("Snapshots must be appended in time order")
+
+        codes = list(rates)
+        if self.base_currency not in rates:
+            codes.append(self.base_currency)
+        self._ensure_columns(codes)
+
+        if self._size and timestamp_ms == self._times[self._size - 1]:
+            row = self._size - 1
+        else:
+            self._ensure_capacity()
+            row = self._size
+            self._size += 1
+
+        values = np.full(self._block.shape[1], np.nan)
+        values[self._columns[self.base_currency]] = 1.0
+        for code, rate in rates.items():
+            values[self._columns[code]] = rate
+        self._times[row] = timestamp_ms
+        self._block[row] = values
+
+    def locate(self, timestamps_ms) -> np.ndarray:
+        """
+        Find the snapshot in effect at each timestamp in one searchsorted call
+
+        Returns:
+            Row index per timestamp, -1 where it precedes the first snapshot
+        """
+        targets = np.asarray(timestamps_ms, dtype=np.int64)
+        return np.searchsorted(self._times[:self._size], targets, side="right") - 1
+
+    def times_of(self, rows: np.ndarray) -> np.ndarray:
+        """Snapshot time (epoch ms) per row index, -1 where the row is -1"""
+        rows = np.asarray(rows)
+        return np.where(rows >= 0, self._times[np.maximum(rows, 0)], -1)
+
+    def cross_rates(self, rows: np.ndarray, base_currency: str, target_currency: str) -> np.ndarray:
+        """
+        Rates from base to target for the given snapshot rows
+
+        Returns:
+            float64 array, NaN where the row is -1 or a currency was not quoted
+        """
+        rows = np.asarray(rows)
+        result = np.full(rows.shape, np.nan)
+        base_col = self._columns.get(base_currency)
+        target_col = self._columns.get(target_currency)
+        if base_col is None or target_col is None:
+            return result
+
+        valid = rows >= 0
+        picked = self._block[rows[valid]]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            result[valid] = picked[:, target_col] / picked[:, base_col]
+        return result
+
+    def rates_at(self, timestamp_ms: int) -> Tuple[int, Dict[str, float]]:
+        """
+        Full rate table of the snapshot in effect at a point in time
+
+        Returns:
+            (snapshot time in epoch ms, currency code to rate from the base)
+
+        Raises:
+            LookupError: If no snapshot existed at that time
+        """
+        row = int(self.locate(timestamp_ms))
+        if row < 0:
+            raise LookupError("No rate snapshot recorded at or before the requested time")
+        values = self._block[row]
+        rates = {
+            code: float(values[col]) for code, col in self._columns.items()
+            if not np.isnan(values[col])
+        }
+        return int(self._times[row]), rates
+
+    def rows_between(self, start_ms: Optional[int] = None, end_ms: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Row range covering a time window
+
+        The first row is the snapshot in effect at start_ms (so the window's
+        opening value is known); the range ends with the last snapshot at or
+        before end_ms.
+
+        Returns:
+            (start row, stop row), empty when nothing was recorded by end_ms
+        """
+        stop = self._size if end_ms is None else int(self.locate(end_ms)) + 1
+        start = 0 if start_ms is None else max(int(self.locate(start_ms)), 0)
+        return start, max(start, stop)
+
+    def rate_block(self, codes: List[str], start: int, stop: int) -> np.ndarray:
+        """
+        Rates from the base for the given currencies over a row range
+
+        Returns:
+            float64 array, shape (stop - start, len(codes)), NaN where not quoted
+
+        Raises:
+            LookupError: If a currency never appeared in the log
+        """
+        missing = [code for code in codes if code not in self._columns]
+        if missing:
+            raise LookupError(f"No rates recorded for: {', '.join(missing)}")
+        columns = [self._columns[code] for code in codes]
+        return self._block[start:stop, columns]
@@ -0,0 +1,345 @@
+"""Leader-elected snapshot distribution between API nodes"""
+import asyncio
+import json
+import os
+import time
+import uuid
+from typing import Dict, Optional, Tuple
+
+from app.core.pubsub import broker_from_url
+
+
+LEADER, FOLLOWER, INDEPENDENT = "leader", "follower", "independent"
+
+
+def encode_message(message: Dict) -> bytes:
+    return json.dumps(message, separators=(",", ":")).encode()
+
+
+def decode_message(data: bytes) -> Dict:
+    return json.loads(data)
+
+
+def rate_delta(old: Dict[str, float], new: Dict[str, float]) -> Tuple[Dict[str, float], list]:
+    """
+    Changes turning one rate table into another
+
+    Returns:
+        (rates that are new or changed, currencies no longer quoted)
+    """
+    changed = {code: rate for code, rate in new.items() if old.get(code) != rate}
+    removed = [code for code in old if code not in new]
+    return changed, removed
+
+
+class SnapshotSync:
+    """
+    Share one upstream rate fetcher between all API nodes
+
+    Every node competes for a broker lease; the holder is the leader and is
+    the only node polling the provider. Each new snapshot it gets is
+    published, versioned, on the snapshot channel as a delta against the
+    previous one, with a full table (keyframe) every keyframe_every versions
+    and whenever a follower asks for one. Between snapshots the leader
+    publishes heartbeats.
+
+    Followers rebuild the table from the messages and swap it into their
+    ExchangeRateService atomically, so caches, alerts and the snapshot log
+    advance on every node together. A follower that misses a version asks
+    for a keyframe instead of applying a delta to the wrong base.
+
+    Each message tells followers to hold the table for silence_timeout
+    seconds. If the leader goes silent that hold runs out and the follower's
+    service goes back to fetching on its own (independent mode) until a
+    leader is heard from again.
+    """
+
+    def __init__(
+        self,
+        service,
+        broker,
+        node_id: Optional[str] = None,
+        channel: str = "zar-exchange:snapshots",
+        lease_key: str = "zar-exchange:refresh-leader",
+        interval: float = 10.0,
+        lease_ttl: Optional[float] = None,
+        silence_timeout: Optional[float] = None,
+        keyframe_every: int = 20
+    ):
+        self.service = service
+        self.broker = broker
+        self.node_id = node_id or uuid.uuid4().hex[:12]
+        self.channel = channel
+        self.lease_key = lease_key
+        self.interval = interval
+        self.lease_ttl = lease_ttl or 3 * interval
+        self.silence_timeout = silence_timeout or 3 * interval
+        self.keyframe_every = keyframe_every
+        self.role = INDEPENDENT
+
+        # Leader state: last table published and its version
+        self._version = 0
+        self._published: Optional[Dict[str, float]] = None
+        self._since_keyframe = 0
+        self._pending: Optional[Dict[str, float]] = None
+        self._keyframe_requested = False
+
+        # Follower state: replica of the leader's table and its (leader, version)
+        self._replica: Optional[Dict[str, float]] = None
+        self._applied: Optional[Tuple[str, int]] = None
+        self._last_heard: Optional[float] = None
+        self._last_resync = float("-inf")
+        self._applying = False
+
+        self.stats = {
+            "elections": 0, "published": 0, "keyframes": 0, "heartbeats": 0,
+            "applied": 0, "gaps": 0, "resyncs": 0, "resubscribes": 0, "errors": 0
+        }
+        self._resubscribe_delay = min(1.0, interval)
+        self._resubscribe_max_delay = 30.0
+        self._subscription = None
+        self._tasks = []
+        service.add_snapshot_listener(self._on_snapshot)
+
+    def _on_snapshot(self, rates: Dict[str, float]) -> None:
+        # Snapshots we install from the leader are not ours to republish
+        if not self._applying:
+            self._pending = rates
+
+    async def start(self) -> None:
+        """Subscribe to the snapshot channel and start the election loop"""
+        self._subscription = await self.broker.subscribe(self.channel)
+        self._tasks = [
+            asyncio.create_task(self._listen()),
+            asyncio.create_task(self._run())
+        ]
+
+    async def stop(self) -> None:
+        """Stop both loops and hand the lease over to another node"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._subscription is not None:
+            await self._subscription.close()
+            self._subscription = None
+        if self.role == LEADER:
+            await self.broker.release_lease(self.lease_key, self.node_id)
+            self.role = INDEPENDENT
+        await self.broker.close()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.tick()
+            except Exception:
+                self.stats["errors"] += 1
+            await asyncio.sleep(self.interval)
+
+    async def _listen(self) -> None:
+        # A dropped broker connection ends the subscription; resubscribe with
+        # backoff so the node hears the leader again once the broker is back
+        delay = self._resubscribe_delay
+        while True:
+            try:
+                if self._subscription is None:
+                    self._subscription = await self.broker.subscribe(self.channel)
+                async for data in self._subscription:
+                    delay = self._resubscribe_delay
+                    try:
+                        await self.handle(decode_message(data))
+                    except Exception:
+                        self.stats["errors"] += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                self.stats["errors"] += 1
+
+            subscription, self._subscription = self._subscription, None
+            if subscription is not None:
+                try:
+                    await subscription.close()
+                except Exception:
+                    pass
+            self.stats["resubscribes"] += 1
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, self._resubscribe_max_delay)
+
+    async def tick(self) -> None:
+        """
+        One election round
+
+        The leader renews its lease, refreshes from upstream when the
+        provider schedule says so, and publishes a snapshot or heartbeat.
+        Other nodes only work out whether they still hear a leader.
+        """
+        if await self.broker.acquire_lease(self.lease_key, self.node_id, self.lease_ttl):
+            if self.role != LEADER:
+                self.role = LEADER
+                self.stats["elections"] += 1
+                # Followers may hold another leader's table: start with a keyframe
+                self._published = None
+                if self.service._batch_cache:
+                    self._pending = self.service._batch_cache
+            try:
+                await self.service.get_all_rates_from_zar()
+            except Exception:
+                # Nothing fetched yet; heartbeats still tell followers we are alive
+                pass
+            await self._publish()
+            return
+
+        # Tables fetched while not leading are never published
+        self._pending = None
+        heard = self._last_heard is not None and (
+            time.monotonic() - self._last_heard < self.silence_timeout
+        )
+        self.role = FOLLOWER if heard else INDEPENDENT
+
+    async def _publish(self) -> None:
+        # State only advances once the broker accepted the message: a failed
+        # publish leaves the snapshot pending for the next tick, so followers
+        # never hold on to an older table behind heartbeats
+        rates = self._pending
+        if rates is None and self._keyframe_requested and self._published is not None:
+            # Nothing new: resend the current version in full for the follower that asked
+            await self._send({
+                "type": "snapshot",
+                "version": self._version,
+                "provider_last_updated": self.service._provider_last_updated,
+                "rates": self._published
+            })
+            self._keyframe_requested = False
+            self.stats["keyframes"] += 1
+            return
+        if rates is None:
+            await self._send({"type": "heartbeat", "version": self._version})
+            self.stats["heartbeats"] += 1
+            return
+
+        message = {
+            "type": "snapshot",
+            "version": self._version + 1,
+            "base_version": self._version,
+            "provider_last_updated": self.service._provider_last_updated
+        }
+        keyframe = (
+            self._published is None
+            or self._keyframe_requested
+            or self._since_keyframe >= self.keyframe_every
+        )
+        if keyframe:
+            message["rates"] = rates
+        else:
+            message["changed"], message["removed"] = rate_delta(self._published, rates)
+        await self._send(message)
+
+        # A newer snapshot may have arrived while sending; keep it pending
+        if self._pending is rates:
+            self._pending = None
+        if keyframe:
+            self._since_keyframe = 0
+            self._keyframe_requested = False
+            self.stats["keyframes"] += 1
+        else:
+            self._since_keyframe += 1
+        self._version += 1
+        self._published = rates
+        self.stats["published"] += 1
+
+    async def _send(self, message: Dict) -> None:
+        message.update(leader=self.node_id, hold=self.silence_timeout)
+        await self.broker.publish(self.channel, encode_message(message))
+
+    async def handle(self, message: Dict) -> None:
+        """Apply one message received on the snapshot channel"""
+        kind = message.get("type")
+        if kind == "resync":
+            if self.role == LEADER:
+                self._keyframe_requested = True
+            return
+        leader = message.get("leader")
+        if leader == self.node_id or self.role == LEADER:
+            return
+
+        self._last_heard = time.monotonic()
+        self.role = FOLLOWER
+        if kind == "heartbeat":
+            if self._applied == (leader, message["version"]):
+                self.service.hold_snapshot(message["hold"])
+            elif message["version"]:
+                await self._request_keyframe()
+            return
+
+        if self._applied == (leader, message["version"]):
+            # Keyframe resent for another follower: nothing new here
+            self.service.hold_snapshot(message["hold"])
+            return
+        if "rates" in message:
+            rates = dict(message["rates"])
+        elif self._applied == (leader, message["base_version"]):
+            rates = {**self._replica, **message["changed"]}
+            for code in message["removed"]:
+                rates.pop(code, None)
+        else:
+            self.stats["gaps"] += 1
+            await self._request_keyframe()
+            return
+
+        self._applying = True
+        try:
+            self.service.apply_snapshot(
+                dict(rates), message["hold"], message.get("provider_last_updated")
+            )
+        finally:
+            self._applying = False
+        self._replica = rates
+        self._applied = (leader, message["version"])
+        self.stats["applied"] += 1
+
+    async def _request_keyframe(self) -> None:
+        # At most one request per interval while waiting for the keyframe
+        now = time.monotonic()
+        if now - self._last_resync < self.interval:
+            return
+        self._last_resync = now
+        self.stats["resyncs"] += 1
+        await self.broker.publish(
+            self.channel, encode_message({"type": "resync", "node": self.node_id})
+        )
+
+    def status(self) -> Dict:
+        """Role, versions and message counters of this node"""
+        return {
+            "node_id": self.node_id,
+            "role": self.role,
+            "published_version": self._version if self.role == LEADER else None,
+            "applied": (
+                {"leader": self._applied[0], "version": self._applied[1]}
+                if self._applied else None
+            ),
+            "seconds_since_leader": (
+                round(time.monotonic() - self._last_heard, 3)
+                if self._last_heard is not None else None
+            ),
+            **self.stats
+        }
+
+
+def snapshot_sync_from_env(service) -> Optional[SnapshotSync]:
+    """
+    Snapshot sync configured from the environment, or None when disabled
+
+    SNAPSHOT_BROKER_URL selects the broker ("memory" or a redis:// URL);
+    SNAPSHOT_SYNC_INTERVAL sets the election/heartbeat period in seconds and
+    NODE_ID names this node (random when unset).
+    """
+    broker = broker_from_url(os.getenv("SNAPSHOT_BROKER_URL"))
+    if broker is None:
+        return None
+    return SnapshotSync(
+        service,
+        broker,
+        node_id=os.getenv("NODE_ID") or None,
+        interval=float(os.getenv("SNAPSHOT_SYNC_INTERVAL", "10"))
+    )
@@ -0,0 +1,55 @@
+"""
+Benchmark CPU cost per request vs. bytes saved for each response codec
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_compression
+"""
+import time
+
+import numpy as np
+
+from app.core.compression import CODECS, encode_json
+from app.services.currency_data import get_all_currencies
+
+
+def _historical_payload(days: int) -> dict:
+    rates = np.round(18.0 + np.random.uniform(-1, 1, days + 1), 4)
+    return {
+        "base_currency": "USD",
+        "target_currency": "ZAR",
+        "data": [
+            {"date": f"2025-{(i // 28) % 12 + 1:02d}-{i % 28 + 1:02d}", "rate": float(r)}
+            for i, r in enumerate(rates)
+        ]
+    }
+
+
+def _time_codec(compress, raw: bytes, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        compress(raw)
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    payloads = {
+        "currencies": {"currencies": get_all_currencies()},
+        "historical 30d": _historical_payload(30),
+        "historical 365d": _historical_payload(365),
+        "historical 3650d": _historical_payload(3650),
+    }
+
+    print(f"{'payload':<18}{'codec':<8}{'bytes':>10}{'saved':>9}{'us/req':>10}")
+    for name, payload in payloads.items():
+        raw = encode_json(payload)
+        print(f"{name:<18}{'identity':<8}{len(raw):>10}{'0.0%':>9}{0.0:>10.1f}")
+        for codec, compress in CODECS.items():
+            body = compress(raw)
+            saved = 100.0 * (1 - len(body) / len(raw))
+            micros = _time_codec(compress, raw, repeat=50)
+            print(f"{name:<18}{codec:<8}{len(body):>10}{saved:>8.1f}%{micros:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
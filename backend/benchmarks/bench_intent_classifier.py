@@ -0,0 +1,106 @@
+"""
+Benchmark currency extraction: registry matching alone vs. registry plus
+the local n-gram classifier, on a generated corpus disjoint from training
+
+Queries the registry cannot resolve would go to Ollama; the report counts
+those escalations, how many the classifier absorbs, and per-query latency.
+With --ollama N, N escalated queries are also sent to the configured Ollama
+server to measure the path being replaced.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_intent_classifier [--ollama 20]
+"""
+import argparse
+import asyncio
+import time
+
+from app.services.currency_registry import find_currency_mentions
+from app.services.intent_classifier import NO_CURRENCY, load_default_classifier
+from app.services.llm_service import LLMService
+from training.train_intent_classifier import build_corpus
+
+
+SUPPORTED = LLMService.SUPPORTED_CURRENCIES
+
+
+def _registry(query: str):
+    for code in find_currency_mentions(query):
+        if code in SUPPORTED:
+            return code
+    return None
+
+
+def _per_query_us(func, queries) -> float:
+    start = time.perf_counter()
+    for query in queries:
+        func(query)
+    return (time.perf_counter() - start) / len(queries) * 1e6
+
+
+async def _time_ollama(queries):
+    service = LLMService()
+    service.classifier = None
+    correct, start = 0, time.perf_counter()
+    for query, label in queries:
+        result = await service.extract_currency_from_query(query)
+        correct += (result or NO_CURRENCY) == label
+    return correct, (time.perf_counter() - start) / len(queries)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Currency extraction benchmark")
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=12345)
+    parser.add_argument("--ollama", type=int, default=0, help="escalated queries to send to Ollama")
+    args = parser.parse_args()
+
+    classifier = load_default_classifier()
+    if classifier is None:
+        raise SystemExit("No weights file; run python -m training.train_intent_classifier first")
+    threshold = LLMService().classifier_threshold
+    corpus = build_corpus(size=args.size, seed=args.seed)
+    queries = [query for query, _ in corpus]
+
+    registry_correct = escalated = combined_correct = still_escalated = 0
+    escalated_queries = []
+    for query, label in corpus:
+        code = _registry(query)
+        if code is not None:
+            registry_correct += code == label
+            combined_correct += code == label
+            continue
+        escalated += 1
+        escalated_queries.append((query, label))
+        predicted, confidence = classifier.predict(query)
+        if confidence >= threshold:
+            combined_correct += predicted == label
+        else:
+            still_escalated += 1
+
+    # Without escalation, a registry miss reads as "no supported currency"
+    registry_only = sum((_registry(q) or NO_CURRENCY) == label for q, label in corpus)
+    classifier_only = sum(classifier.predict(q)[0] == label for q, label in corpus)
+
+    total = len(corpus)
+    print(f"corpus: {total} queries (seed {args.seed}), threshold {threshold}")
+    print(f"{'path':<34}{'accuracy':>10}{'to ollama':>11}{'us/query':>10}")
+    print(f"{'registry (miss = none)':<34}{registry_only / total:>10.3f}{0:>11}"
+          f"{_per_query_us(_registry, queries):>10.1f}")
+    print(f"{'registry -> ollama (before)':<34}{'n/a':>10}{escalated:>11}{'':>10}")
+    print(f"{'classifier alone':<34}{classifier_only / total:>10.3f}{0:>11}"
+          f"{_per_query_us(classifier.predict, queries):>10.1f}")
+    print(f"{'registry -> classifier -> ollama':<34}"
+          f"{combined_correct / (total - still_escalated):>10.3f}{still_escalated:>11}"
+          f"{_per_query_us(lambda q: _registry(q) or classifier.predict(q), queries):>10.1f}")
+    print("(accuracy of the chained path is over queries resolved without Ollama)")
+
+    if args.ollama and escalated_queries:
+        sample = escalated_queries[:args.ollama]
+        correct, seconds = asyncio.run(_time_ollama(sample))
+        print(f"ollama on {len(sample)} escalated queries: "
+              f"accuracy {correct / len(sample):.3f}, {seconds * 1e3:.0f} ms/query")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+Benchmark repricing a full snapshot and quoting single vs. batched
+
+Repricing covers every pair of a 160-currency snapshot; quotes are timed
+one at a time and as one batch of the same requests.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_pricing
+"""
+import time
+
+import numpy as np
+
+from app.services.pricing_service import PricingEngine
+
+
+def _time(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    rng = np.random.default_rng(0)
+    codes = [f"C{i:02d}" for i in range(159)] + ["USD"]
+    rates = dict(zip(codes, rng.uniform(0.001, 500, len(codes)).tolist()))
+    engine = PricingEngine()
+    engine.on_snapshot(rates)
+
+    pairs = len(engine._book.codes) ** 2
+    print(f"reprice {pairs} pairs: {_time(lambda: engine.on_snapshot(rates), 200):9.1f} us")
+
+    for size in (1, 100, 10_000):
+        bases = rng.choice(codes, size).tolist()
+        targets = rng.choice(codes, size).tolist()
+        amounts = rng.uniform(10, 1e6, size).tolist()
+        repeat = max(1, 20_000 // size)
+
+        def singles():
+            for base, target, amount in zip(bases, targets, amounts):
+                engine.quote(base, target, amount)
+
+        single_us = _time(singles, max(1, repeat // 10))
+        batch_us = _time(lambda: engine.quote_batch(bases, targets, amounts), repeat)
+        print(f"{size:>6} quotes: single {single_us / size:7.2f} us/quote, "
+              f"batch {batch_us / size:7.2f} us/quote")
+
+
+if __name__ == "__main__":
+    main()
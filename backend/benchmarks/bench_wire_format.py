@@ -0,0 +1,81 @@
+"""
+Benchmark body size and encode/decode time of JSON vs. MessagePack and CBOR
+
+JSON historical bodies list {date, rate} objects; the binary formats carry
+the same series as packed int64/float64 arrays, as the API serves them.
+
+Usage:
+    cd backend
+    python -m benchmarks.bench_wire_format
+"""
+import time
+
+import numpy as np
+
+from app.core.wire_format import CBOR, JSON, MSGPACK, decode_body, encode_body
+
+
+def _historical(days: int, packed: bool) -> dict:
+    rng = np.random.default_rng(days)
+    dates = np.arange(20000 - days, 20001, dtype=np.int64)
+    rates = np.round(18.0 + rng.uniform(-1, 1, days + 1), 4)
+    payload = {"base_currency": "USD", "target_currency": "ZAR"}
+    if packed:
+        payload["dates"], payload["rates"] = dates, rates
+    else:
+        labels = np.datetime_as_string(dates.astype("datetime64[D]")).tolist()
+        payload["data"] = [{"date": d, "rate": r} for d, r in zip(labels, rates.tolist())]
+    return payload
+
+
+def _rate_table(packed: bool) -> dict:
+    rng = np.random.default_rng(0)
+    codes = [f"C{i:02d}" for i in range(160)]
+    rates = rng.uniform(0.001, 500, len(codes))
+    if packed:
+        return {"base_currency": "ZAR", "currencies": codes, "rates": rates}
+    return {"base_currency": "ZAR", "rates": dict(zip(codes, rates.tolist()))}
+
+
+def _direct() -> dict:
+    return {
+        "base_currency": "USD",
+        "target_currency": "ZAR",
+        "rate": 18.234512,
+        "timestamp": "2025-06-01T12:00:00.123456",
+        "exact": None
+    }
+
+
+def _time(func, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main():
+    cases = {
+        "direct": lambda packed: _direct(),
+        "rate table": _rate_table,
+        "historical 30d": lambda packed: _historical(30, packed),
+        "historical 365d": lambda packed: _historical(365, packed),
+        "historical 3650d": lambda packed: _historical(3650, packed),
+    }
+
+    print(f"{'payload':<18}{'format':<9}{'bytes':>9}{'vs json':>9}{'enc us':>9}{'dec us':>9}")
+    for name, make in cases.items():
+        json_size = None
+        for fmt in (JSON, MSGPACK, CBOR):
+            payload = make(fmt != JSON)
+            body = encode_body(payload, fmt)
+            json_size = json_size or len(body)
+            repeat = 20 if "3650" in name else 200
+            encode_us = _time(lambda: encode_body(payload, fmt), repeat)
+            decode_us = _time(lambda: decode_body(body, fmt), repeat)
+            print(f"{name:<18}{fmt:<9}{len(body):>9}{len(body) / json_size:>8.0%}"
+                  f"{encode_us:>9.1f}{decode_us:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
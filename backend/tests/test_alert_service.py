@@ -0,0 +1,245 @@
+"""
+Tests for the threshold alert engine
+"""
+import json
+import httpx
+import numpy as np
+import pytest
+import tracemalloc
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.alert_service import (
+    AlertDispatcher,
+    AlertEngine,
+    QueueSink,
+    ThresholdIndex,
+    WebhookSink
+)
+
+
+client = TestClient(app)
+
+
+class FlakySink:
+    """Sink failing a fixed number of times before accepting"""
+
+    def __init__(self, failures: int):
+        self.failures = failures
+        self.batches = []
+
+    def send(self, batch):
+        if self.failures:
+            self.failures -= 1
+            raise ConnectionError("unavailable")
+        self.batches.append(batch)
+
+
+@pytest.mark.unit
+class TestThresholdIndex:
+    """Unit tests for the sorted per-pair threshold arrays"""
+
+    def test_take_interval_sides(self):
+        """Test half-open interval selection and removal"""
+        index = ThresholdIndex()
+        for alert_id, threshold in enumerate([18.0, 19.0, 19.5, 20.0], start=1):
+            index.add(threshold, alert_id)
+
+        assert index.take(18.0, 19.5, side="right").tolist() == [2, 3]
+        assert len(index) == 2
+        assert index.take(18.0, 20.0, side="left").tolist() == [1]
+        assert index.thresholds.tolist() == [20.0]
+
+    def test_cancelled_alerts_skipped(self):
+        """Test that tombstoned alerts are dropped when reached"""
+        index = ThresholdIndex()
+        index.add(19.0, 1)
+        index.add(19.1, 2)
+        index.cancel(1)
+
+        assert index.take(18.0, 20.0, side="right").tolist() == [2]
+        assert len(index) == 0
+
+    def test_cancelled_alerts_compacted(self):
+        """Test that cancellation frees array entries without any crossing"""
+        index = ThresholdIndex()
+        for alert_id in range(1, 6):
+            index.add(18.0 + alert_id, alert_id)
+        index.take(0.0, 0.0, side="right")
+        index.add(30.0, 6)
+        for alert_id in (2, 4, 6):
+            index.cancel(alert_id)
+
+        assert index.take(0.0, 0.0, side="right").tolist() == []
+        assert index.ids.tolist() == [1, 3, 5]
+        assert not index._cancelled
+        assert len(index) == 3
+
+    def test_large_index(self):
+        """Test that a million alerts resolve by binary search"""
+        index = ThresholdIndex()
+        thresholds = np.linspace(10.0, 30.0, 1_000_000)
+        index.thresholds, index.ids = thresholds, np.arange(1_000_000, dtype=np.int64)
+
+        hit = index.take(19.0, 19.0002, side="right")
+        assert len(hit) == np.count_nonzero((thresholds > 19.0) & (thresholds <= 19.0002))
+        assert len(index) == 1_000_000 - len(hit)
+
+
+@pytest.mark.unit
+class TestAlertEngine:
+    """Unit tests for snapshot evaluation"""
+
+    @pytest.fixture
+    def engine(self):
+        """Engine with an in-process queue sink"""
+        engine = AlertEngine(AlertDispatcher(QueueSink()))
+        yield engine
+        engine.dispatcher.shutdown()
+
+    def test_fires_on_crossing(self, engine):
+        """Test above/below alerts fire only when the rate crosses them"""
+        up = engine.register("USD", "ZAR", 19.0, "above")
+        down = engine.register("GBP", "ZAR", 23.0, "below")
+        later = engine.register("USD", "ZAR", 21.0, "above")
+
+        # ZAR-based rates: USD/ZAR = 1 / rates["USD"]
+        assert engine.on_snapshot({"USD": 1 / 18.5, "GBP": 1 / 23.5}) == []
+        fired = engine.on_snapshot({"USD": 1 / 19.2, "GBP": 1 / 22.9})
+
+        assert sorted(n["alert_id"] for n in fired) == [up, down]
+        assert engine.get(up)["status"] == "triggered"
+        assert engine.get(later)["status"] == "active"
+        # One-shot: crossing again does not refire
+        engine.on_snapshot({"USD": 1 / 18.0, "GBP": 1 / 23.5})
+        assert engine.on_snapshot({"USD": 1 / 19.5, "GBP": 1 / 22.0}) == []
+
+    def test_cancel(self, engine):
+        """Test that cancelled alerts never fire"""
+        alert_id = engine.register("USD", "ZAR", 19.0, "above")
+        assert engine.cancel(alert_id)
+        assert not engine.cancel(alert_id)
+
+        engine.on_snapshot({"USD": 1 / 18.5})
+        assert engine.on_snapshot({"USD": 1 / 19.5}) == []
+
+    def test_notifications_delivered(self, engine):
+        """Test that fired alerts reach the sink"""
+        engine.register("USD", "ZAR", 19.0, "above")
+        engine.on_snapshot({"USD": 1 / 18.5})
+        engine.on_snapshot({"USD": 1 / 19.5})
+        engine.dispatcher.flush()
+
+        delivered = engine.dispatcher.sink.drain()
+        assert len(delivered) == 1
+        assert delivered[0]["rate"] == pytest.approx(19.5)
+
+    def test_finished_alerts_leave_bounded_history(self):
+        """Test that triggered and cancelled alerts are evicted oldest first"""
+        engine = AlertEngine(AlertDispatcher(QueueSink()), history_size=2)
+        try:
+            ids = [engine.register("USD", "ZAR", 19.0 + i / 10, "above") for i in range(3)]
+            cancelled = engine.register("USD", "ZAR", 25.0, "above")
+            engine.cancel(cancelled)
+            engine.on_snapshot({"USD": 1 / 18.5})
+            engine.on_snapshot({"USD": 1 / 19.5})
+
+            assert not engine._alerts
+            assert len(engine._history) == 2
+            assert engine.get(cancelled) is None
+            assert engine.get(ids[-1])["status"] == "triggered"
+        finally:
+            engine.dispatcher.shutdown()
+
+    def test_alerts_stored_compactly(self, engine):
+        """Test that alerts are kept as small records and rendered on read"""
+        tracemalloc.start()
+        try:
+            for i in range(20_000):
+                engine.register("USD", "ZAR", 18.0 + i * 1e-6, "above")
+            per_alert = tracemalloc.get_traced_memory()[0] / 20_000
+        finally:
+            tracemalloc.stop()
+        # A 9-key dict with ISO timestamps came to over 450 bytes per alert
+        assert per_alert < 300
+
+        engine.on_snapshot({"USD": 1 / 17.0})
+        fired = engine.on_snapshot({"USD": 1 / 18.01})
+        alert = engine.get(fired[0]["alert_id"])
+        assert alert["created_at"] <= alert["triggered_at"] == fired[0]["triggered_at"]
+        assert alert["triggered_rate"] == pytest.approx(18.01)
+        assert alert["direction"] == "above"
+
+    def test_rejects_invalid_alerts(self, engine):
+        """Test direction and threshold validation"""
+        with pytest.raises(ValueError):
+            engine.register("USD", "ZAR", 19.0, "sideways")
+        with pytest.raises(ValueError):
+            engine.register("USD", "ZAR", 0.0, "above")
+
+
+@pytest.mark.unit
+class TestAlertDispatcher:
+    """Unit tests for batching and retry"""
+
+    def test_retries_then_delivers(self):
+        """Test that transient sink failures are retried"""
+        sink = FlakySink(failures=2)
+        dispatcher = AlertDispatcher(sink, max_batch_size=2, retry_backoff=0)
+        dispatcher._queue.extend({"alert_id": i} for i in range(5))
+        dispatcher.flush()
+
+        assert [len(batch) for batch in sink.batches] == [2, 2, 1]
+        assert dispatcher.stats == {"delivered": 5, "retries": 2, "failed": 0, "dropped": 0}
+
+    def test_dead_letters_after_retries(self):
+        """Test that a batch failing every attempt is kept, not lost silently"""
+        dispatcher = AlertDispatcher(FlakySink(failures=10), max_retries=1, retry_backoff=0)
+        dispatcher._queue.append({"alert_id": 1})
+        dispatcher.flush()
+
+        assert dispatcher.stats["failed"] == 1
+        assert list(dispatcher.dead_letters) == [[{"alert_id": 1}]]
+
+    def test_webhook_sink(self):
+        """Test webhook delivery against a local stub"""
+        received = []
+
+        def stub(request: httpx.Request):
+            received.append(json.loads(request.read()))
+            return httpx.Response(204)
+
+        sink = WebhookSink("http://alerts.local/hook", client=httpx.Client(transport=httpx.MockTransport(stub)))
+        sink.send([{"alert_id": 7}])
+
+        assert received == [{"alerts": [{"alert_id": 7}]}]
+
+
+@pytest.mark.integration
+class TestAlertEndpoints:
+    """Integration tests for alert registration"""
+
+    def test_create_get_cancel(self):
+        """Test the alert lifecycle over HTTP"""
+        response = client.post("/api/v1/exchange/alerts", json={
+            "base_currency": "usd", "threshold": 19.0, "direction": "above"
+        })
+        assert response.status_code == 201
+        alert = response.json()
+        assert alert["base_currency"] == "USD"
+        assert alert["status"] == "active"
+
+        assert client.get(f"/api/v1/exchange/alerts/{alert['id']}").json()["id"] == alert["id"]
+        assert client.delete(f"/api/v1/exchange/alerts/{alert['id']}").status_code == 204
+        assert client.get(f"/api/v1/exchange/alerts/{alert['id']}").json()["status"] == "cancelled"
+        assert client.delete(f"/api/v1/exchange/alerts/{alert['id']}").status_code == 404
+
+    def test_rejects_unknown_currency(self):
+        """Test validation of the currency pair"""
+        response = client.post("/api/v1/exchange/alerts", json={
+            "base_currency": "XYZ", "threshold": 1.0, "direction": "below"
+        })
+        assert response.status_code == 400
+
+    def test_unknown_alert(self):
+        """Test 404 for an unknown alert ID"""
+        assert client.get("/api/v1/exchange/alerts/999999999").status_code == 404
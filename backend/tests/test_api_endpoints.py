@@ -2,6 +2,7 @@
 Tests for API endpoints
 """
 import pytest
+from decimal import Decimal
 from unittest.mock import AsyncMock, patch
 from fastapi.testclient import TestClient
 from app.main import app
@@ -31,6 +32,57 @@ class TestDirectLookupEndpoint:
             assert "rate" in data
             assert "timestamp" in data
 
+    def test_direct_lookup_exact_amount(self):
+        """Test that an amount adds the exact fixed-point conversion"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_rate') as mock_get_rate, \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_exact_rate') as mock_exact_rate:
+            mock_get_rate.return_value = 18.2345
+            mock_exact_rate.return_value = Decimal("18.234500000")
+
+            response = client.post(
+                "/api/v1/exchange/direct",
+                json={"base_currency": "USD", "target_currency": "ZAR", "amount": "100.01"}
+            )
+
+            assert response.status_code == 200
+            exact = response.json()["exact"]
+            assert exact["amount_minor"] == 10001
+            assert exact["converted_minor"] == 182363
+            assert Decimal(exact["converted_amount"]) == Decimal("1823.63")
+            assert exact["rounding"] == "ROUND_HALF_EVEN"
+
+    def test_direct_lookup_rate_matches_exact(self):
+        """Test that the quoted rate comes from the snapshot the conversion used"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_rate') as mock_get_rate, \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_all_rates_from_zar',
+                   AsyncMock(return_value={"USD": 0.05})):
+            mock_get_rate.return_value = 18.2345
+
+            response = client.post(
+                "/api/v1/exchange/direct",
+                json={"base_currency": "USD", "target_currency": "ZAR", "amount": "3"}
+            )
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["rate"] == pytest.approx(20.0)
+            assert Decimal(data["exact"]["rate"]) == Decimal("20")
+            assert data["exact"]["converted_minor"] == 6000
+            mock_get_rate.assert_not_called()
+
+    def test_direct_lookup_without_amount_has_no_exact(self):
+        """Test that exact is omitted without an amount"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_rate') as mock_get_rate:
+            mock_get_rate.return_value = 18.2345
+
+            response = client.post(
+                "/api/v1/exchange/direct",
+                json={"base_currency": "USD"}
+            )
+
+            assert response.status_code == 200
+            assert response.json()["exact"] is None
+
     def test_direct_lookup_invalid_data(self):
         """Test direct lookup with invalid data"""
         response = client.post(
@@ -0,0 +1,163 @@
+"""
+Tests for rate consistency and arbitrage detection
+"""
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.arbitrage_service import (
+    RateConsistencyAnalyzer,
+    bellman_ford_predecessors,
+    find_positive_cycles
+)
+from app.services.exchange_rate_service import ExchangeRateService
+
+
+client = TestClient(app)
+
+
+@pytest.mark.unit
+class TestRateConsistencyAnalyzer:
+    """Unit tests for the consistency analyzer"""
+
+    @pytest.fixture
+    def analyzer(self):
+        """Create analyzer with a consistent primary snapshot"""
+        analyzer = RateConsistencyAnalyzer()
+        analyzer.update_primary({"USD": 0.05, "EUR": 0.045, "GBP": 0.04})
+        return analyzer
+
+    def test_consistent_snapshot_has_no_cycles(self, analyzer):
+        """Test that cross rates from one base never form arbitrage"""
+        report = analyzer.analyze()
+
+        assert report["currencies"] == 4
+        assert report["cycles"] == []
+        assert report["anomalies"] == []
+
+    def test_large_consistent_snapshot(self):
+        """Test floating-point noise is not reported over ~160 currencies"""
+        rng = np.random.default_rng(1)
+        analyzer = RateConsistencyAnalyzer()
+        analyzer.update_primary({f"C{i:03d}": float(rng.uniform(0.01, 500)) for i in range(160)})
+
+        assert analyzer.analyze()["cycles"] == []
+
+    def test_inconsistent_quote_flagged(self, analyzer):
+        """Test that a deviating secondary quote is flagged and forms a cycle"""
+        analyzer.update_secondary("USD", {"EUR": 0.95, "GBP": 0.8, "ZAR": 20.0})
+        report = analyzer.analyze()
+
+        assert len(report["anomalies"]) == 1
+        anomaly = report["anomalies"][0]
+        assert anomaly["target_currency"] == "EUR"
+        assert anomaly["implied"] == pytest.approx(0.9)
+        assert report["cycles"][0]["gain"] == pytest.approx(0.95 / 0.9)
+        assert report["cycles"][0]["path"][0] == report["cycles"][0]["path"][-1]
+
+    def test_triangular_cycle_without_primary(self):
+        """Test detection of a three-leg arbitrage loop"""
+        analyzer = RateConsistencyAnalyzer()
+        analyzer.update_secondary("USD", {"EUR": 0.9})
+        analyzer.update_secondary("EUR", {"GBP": 0.9})
+        analyzer.update_secondary("GBP", {"USD": 1.3})
+
+        cycles = analyzer.analyze()["cycles"]
+        assert len(cycles) == 1
+        assert set(cycles[0]["path"]) == {"USD", "EUR", "GBP"}
+        assert cycles[0]["gain"] == pytest.approx(0.9 * 0.9 * 1.3)
+
+    def test_report_cached_until_inputs_change(self, analyzer):
+        """Test that analysis reruns only after an update"""
+        first = analyzer.analyze()
+        assert analyzer.analyze() is first
+
+        analyzer.update_secondary("USD", {"EUR": 0.9})
+        assert analyzer.analyze() is not first
+
+    def test_bellman_ford_detects_only_positive_cycles(self):
+        """Test that a consistent graph relaxes out and a profitable loop does not"""
+        log_rates = np.full((3, 3), -np.inf)
+        np.fill_diagonal(log_rates, 0.0)
+        log_rates[0, 1] = np.log(2.0)
+        log_rates[1, 0] = np.log(0.5)
+        log_rates[1, 2] = np.log(3.0)
+        assert bellman_ford_predecessors(log_rates) is None
+
+        log_rates[2, 0] = np.log(0.2)
+        pred = bellman_ford_predecessors(log_rates)
+        assert pred is not None
+        assert sorted(pred.tolist()) == [0, 1, 2]
+
+    def test_finds_several_distinct_cycles(self):
+        """Test that disjoint and overlapping loops are all reported once"""
+        log_rates = np.full((5, 5), -np.inf)
+        np.fill_diagonal(log_rates, 0.0)
+        for a, b, rate in [(0, 1, 1.1), (1, 0, 1.0), (1, 2, 1.0), (2, 0, 1.05),
+                           (3, 4, 1.2), (4, 3, 0.9)]:
+            log_rates[a, b] = np.log(rate)
+
+        cycles = find_positive_cycles(log_rates)
+        keys = sorted(tuple(sorted(cycle[:-1])) for cycle, _ in cycles)
+        assert keys == [(0, 1), (0, 1, 2), (3, 4)]
+        gains = {tuple(sorted(cycle[:-1])): np.exp(gain) for cycle, gain in cycles}
+        assert gains[(3, 4)] == pytest.approx(1.08)
+        assert gains[(0, 1, 2)] == pytest.approx(1.1 * 1.05)
+        assert len(find_positive_cycles(log_rates, max_cycles=2)) == 2
+
+    def test_noisy_secondary_tables_report_many_cycles(self):
+        """Test a 160-currency graph with several noisy secondary tables"""
+        rng = np.random.default_rng(0)
+        primary = {f"C{i:03d}": float(rng.uniform(0.01, 500)) for i in range(159)}
+        analyzer = RateConsistencyAnalyzer()
+        analyzer.update_primary(primary)
+        quoted = {**primary, "ZAR": 1.0}
+        for base in rng.choice(list(primary), 5, replace=False):
+            analyzer.update_secondary(base, {
+                code: quoted[code] / quoted[base] * float(rng.normal(1, 0.01))
+                for code in quoted if code != base
+            })
+
+        cycles = analyzer.analyze()["cycles"]
+        assert len(cycles) == analyzer.max_cycles
+        keys = set()
+        for cycle in cycles:
+            path = cycle["path"]
+            assert path[0] == path[-1]
+            assert cycle["gain"] > 1.0
+            keys.add(frozenset(zip(path, path[1:])))
+        assert len(keys) == len(cycles)
+
+    def test_snapshot_listener_analyzes(self):
+        """Test that each new snapshot is analyzed before anyone asks"""
+        service = ExchangeRateService()
+        try:
+            service.consistency.update_secondary("USD", {"EUR": 0.95})
+            service._notify_snapshot({"USD": 0.05, "EUR": 0.045})
+        finally:
+            service.alerts.dispatcher.shutdown()
+
+        report = service.consistency._report
+        assert report is not None
+        assert report["cycles"][0]["gain"] == pytest.approx(0.95 / 0.9)
+        assert service.consistency.analyze() is report
+
+
+@pytest.mark.integration
+class TestConsistencyEndpoint:
+    """Integration tests for the consistency endpoint"""
+
+    def test_consistency_report(self):
+        """Test the analysis endpoint shape"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_snapshot_version',
+                   new_callable=AsyncMock) as mock_version:
+            mock_version.return_value = 3
+
+            response = client.get("/api/v1/exchange/analysis/consistency")
+
+            assert response.status_code == 200
+            data = response.json()
+            assert data["snapshot_version"] == 3
+            assert "cycles" in data
+            assert "anomalies" in data
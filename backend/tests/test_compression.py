@@ -0,0 +1,141 @@
+"""
+Tests for content-encoding negotiation and compressed response bodies
+"""
+import gzip
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.compression import (
+    CompressedBodyCache,
+    MIN_COMPRESS_SIZE,
+    negotiate_encoding
+)
+
+
+client = TestClient(app)
+
+
+@pytest.mark.unit
+class TestNegotiateEncoding:
+    """Unit tests for Accept-Encoding negotiation"""
+
+    def test_no_header_is_identity(self):
+        """Test that a missing header falls back to identity"""
+        assert negotiate_encoding(None) == "identity"
+        assert negotiate_encoding("") == "identity"
+
+    def test_gzip_accepted(self):
+        """Test plain gzip negotiation"""
+        assert negotiate_encoding("gzip, deflate") == "gzip"
+
+    def test_q_zero_rejects_codec(self):
+        """Test that q=0 excludes a codec"""
+        assert negotiate_encoding("gzip;q=0") == "identity"
+
+    def test_wildcard(self):
+        """Test that a wildcard admits supported codecs"""
+        assert negotiate_encoding("*") != "identity"
+
+    def test_unknown_codec_is_identity(self):
+        """Test that unsupported codecs are ignored"""
+        assert negotiate_encoding("compress") == "identity"
+
+
+@pytest.mark.unit
+class TestCompressedBodyCache:
+    """Unit tests for the encoded body cache"""
+
+    def test_put_and_get(self):
+        """Test storing bodies per encoding"""
+        cache = CompressedBodyCache()
+        cache.put("k", "gzip", b"zipped")
+        cache.put("k", "identity", b"raw")
+
+        assert cache.get("k", "gzip") == b"zipped"
+        assert cache.get("k", "identity") == b"raw"
+        assert cache.get("k", "br") is None
+
+    def test_evicts_least_recently_used(self):
+        """Test LRU eviction once the cache is full"""
+        cache = CompressedBodyCache(max_entries=2)
+        cache.put("a", "gzip", b"a")
+        cache.put("b", "gzip", b"b")
+        cache.get("a", "gzip")
+        cache.put("c", "gzip", b"c")
+
+        assert cache.get("b", "gzip") is None
+        assert cache.get("a", "gzip") == b"a"
+        assert len(cache) == 2
+
+
+@pytest.mark.integration
+class TestCompressedEndpoints:
+    """Integration tests for compressed router responses"""
+
+    def test_currencies_gzip(self):
+        """Test that currencies are served gzip-encoded on request"""
+        response = client.get(
+            "/api/v1/exchange/currencies",
+            headers={"Accept-Encoding": "gzip"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        assert "Accept-Encoding" in response.headers["vary"]
+        assert len(response.json()["currencies"]) > 0
+
+    def test_currencies_identity(self):
+        """Test that currencies are uncompressed without Accept-Encoding"""
+        response = client.get(
+            "/api/v1/exchange/currencies",
+            headers={"Accept-Encoding": "identity"}
+        )
+
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
+        assert "currencies" in response.json()
+
+    def test_historical_cached_per_snapshot(self):
+        """Test that a series is built once per snapshot and encoding"""
+        series = [{"date": "2025-01-01", "rate": 18.1234}] * 200
+
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_snapshot_version',
+                   new_callable=AsyncMock) as mock_version, \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_historical_rates',
+                   new_callable=AsyncMock) as mock_historical:
+            mock_version.return_value = 987654
+            mock_historical.return_value = series
+
+            first = client.get(
+                "/api/v1/exchange/historical/USD/ZAR?days=200",
+                headers={"Accept-Encoding": "gzip"}
+            )
+            second = client.get(
+                "/api/v1/exchange/historical/USD/ZAR?days=200",
+                headers={"Accept-Encoding": "gzip"}
+            )
+
+            assert first.status_code == 200
+            assert first.headers["content-encoding"] == "gzip"
+            assert second.json() == first.json()
+            assert mock_historical.call_count == 1
+
+    def test_small_dynamic_body_not_compressed(self):
+        """Test that bodies under the threshold skip compression"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_snapshot_version',
+                   new_callable=AsyncMock) as mock_version, \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_historical_rates',
+                   new_callable=AsyncMock) as mock_historical:
+            mock_version.return_value = None
+            mock_historical.return_value = [{"date": "2025-01-01", "rate": 18.1}]
+
+            response = client.get(
+                "/api/v1/exchange/historical/USD/ZAR?days=0",
+                headers={"Accept-Encoding": "gzip"}
+            )
+
+            assert response.status_code == 200
+            assert len(response.content) < MIN_COMPRESS_SIZE
+            assert "content-encoding" not in response.headers
+            assert response.json()["data"][0]["rate"] == 18.1
@@ -0,0 +1,110 @@
+"""
+Tests for the ISO 4217 currency registry
+"""
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.currency_data import CURRENCY_INFO
+from app.services.currency_registry import (
+    CURRENCIES,
+    find_currency_mentions,
+    get_currencies_by_symbol,
+    get_currency,
+    get_currency_by_numeric,
+    get_display_name,
+    get_minor_units,
+    has_currency_term,
+    search_currencies
+)
+
+
+client = TestClient(app)
+
+
+@pytest.mark.unit
+class TestCurrencyRegistry:
+    """Unit tests for registry indexes and search"""
+
+    def test_registry_covers_supported_currencies(self):
+        """Test that every CURRENCY_INFO code is in the registry"""
+        assert len(CURRENCIES) > 150
+        assert all(get_currency(code) is not None for code in CURRENCY_INFO)
+
+    def test_indexes(self):
+        """Test alpha, numeric and symbol lookups"""
+        assert get_currency("zar").numeric == "710"
+        assert get_currency_by_numeric(840).code == "USD"
+        assert get_currency_by_numeric("036").code == "AUD"
+        assert get_currencies_by_symbol("$")[0].code == "USD"
+        assert get_currencies_by_symbol("nope") == ()
+
+    def test_minor_units_and_names(self):
+        """Test minor units and display names"""
+        assert get_minor_units("JPY") == 0
+        assert get_minor_units("KWD") == 3
+        assert get_minor_units("XXX") == 2
+        assert get_display_name("GBP") == "British Pound"
+        assert get_display_name("KWD") == "Kuwaiti dinar"
+
+    def test_prefix_search(self):
+        """Test prefix matches on names, codes and aliases"""
+        assert search_currencies("south af")[0]["code"] == "ZAR"
+        assert search_currencies("usd")[0]["code"] == "USD"
+        codes = [r["code"] for r in search_currencies("dollar", limit=50)]
+        assert codes[0] == "USD"
+        assert {"AUD", "CAD", "NZD"} <= set(codes)
+
+    def test_fuzzy_search(self):
+        """Test trigram matching for misspellings"""
+        results = search_currencies("swis frank", limit=3)
+        assert results[0]["code"] == "CHF"
+        assert results[0]["match"] == "fuzzy"
+
+    def test_fuzzy_ties_prefer_common_currencies(self):
+        """Test that equally close misspellings resolve to the everyday currency"""
+        assert search_currencies("dolar")[0]["code"] == "USD"
+        assert search_currencies("poud")[0]["code"] == "GBP"
+        assert search_currencies("frank")[0]["code"] == "CHF"
+
+    def test_search_limit(self):
+        """Test that the limit is honoured"""
+        assert len(search_currencies("s", limit=4)) == 4
+
+    def test_find_currency_mentions(self):
+        """Test name, alias, plural and code resolution in free text"""
+        assert find_currency_mentions("British pound to rands") == ["GBP", "ZAR"]
+        assert find_currency_mentions("Australian dollar rate") == ["AUD"]
+        assert find_currency_mentions("convert 100 dollars") == ["USD"]
+        assert find_currency_mentions("try all the yen") == ["JPY"]
+        assert find_currency_mentions("TRY to usd") == ["TRY", "USD"]
+
+    def test_has_currency_term(self):
+        """Test symbols, names and close misspellings, but not places or money talk"""
+        assert has_currency_term("how much for a greenbak")
+        assert has_currency_term("naira to rand")
+        assert has_currency_term("£50 please")
+        assert not has_currency_term("I want to send money to my mom in Lagos")
+        assert not has_currency_term("is this real")
+        # The home currency can be left out
+        assert has_currency_term("how much in rands")
+        assert not has_currency_term("how much in rands", ignore=("ZAR",))
+
+
+@pytest.mark.integration
+class TestCurrencySearchEndpoint:
+    """Integration tests for the currency search endpoint"""
+
+    def test_search(self):
+        """Test autocomplete results"""
+        response = client.get("/api/v1/exchange/currencies/search?q=eur&limit=3")
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["query"] == "eur"
+        assert data["results"][0]["code"] == "EUR"
+        assert len(data["results"]) <= 3
+
+    def test_search_requires_query(self):
+        """Test that an empty query is rejected"""
+        response = client.get("/api/v1/exchange/currencies/search?q=")
+        assert response.status_code == 422
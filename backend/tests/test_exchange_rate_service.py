@@ -4,7 +4,10 @@ Tests for ExchangeRateService
 import pytest
 from unittest.mock import AsyncMock, patch, MagicMock
 from datetime import datetime
+from decimal import Decimal, ROUND_HALF_EVEN
+import numpy as np
 from app.services.exchange_rate_service import ExchangeRateService
+from app.services.snapshot_log import now_ms
 
 
 @pytest.mark.unit
@@ -151,3 +154,257 @@ class TestExchangeRateService:
             # Rate should be inverse of batch rate
             expected_rate = 1.0 / 0.0548
             assert abs(rate - expected_rate) < 0.01
+
+    @pytest.mark.asyncio
+    async def test_get_cross_rates(self, service):
+        """Test cross rates derived from the ZAR batch snapshot"""
+        service._batch_cache = {"ZAR": 1.0, "USD": 0.05, "EUR": 0.04}
+        service._batch_cache_time = datetime.now()
+
+        rates = await service.get_cross_rates(["USD", "EUR"], "ZAR")
+        assert rates.tolist() == pytest.approx([20.0, 25.0])
+
+        rates = await service.get_cross_rates(["EUR"], "USD")
+        assert rates.tolist() == pytest.approx([1.25])
+
+        with pytest.raises(LookupError):
+            await service.get_cross_rates(["XYZ"], "ZAR")
+
+    def test_get_cross_rate_history(self, service):
+        """Test recorded cross rates over a window, skipping incomplete snapshots"""
+        day = 86_400_000
+        now = now_ms()
+        service.snapshot_log.append({"USD": 0.05}, now - 40 * day)
+        service.snapshot_log.append({"USD": 0.05, "EUR": 0.04}, now - 20 * day)
+        service.snapshot_log.append({"USD": 0.04}, now - 10 * day)
+        service.snapshot_log.append({"USD": 0.05, "EUR": 0.05}, now - day)
+
+        times, rates = service.get_cross_rate_history(["USD", "EUR"], "ZAR", 30)
+        assert times.tolist() == [now - 20 * day, now - day]
+        np.testing.assert_allclose(rates, [[20.0, 25.0], [20.0, 20.0]])
+        with pytest.raises(LookupError):
+            service.get_cross_rate_history(["XYZ"], "ZAR", 30)
+
+    @pytest.mark.asyncio
+    async def test_convert_exact(self, service):
+        """Test exact conversion from the batch snapshot"""
+        service._batch_cache = {"ZAR": 1.0, "USD": 0.05, "JPY": 8.0}
+        service._batch_cache_time = datetime.now()
+
+        exact = await service.convert_exact("10.005", "USD", "ZAR")
+        assert str(exact["rate"]) == "20.000000000"
+        assert exact["amount_minor"] == 1000
+        assert exact["converted_minor"] == 20000
+
+        converted = await service.convert_exact_batch(np.array([100, 250]), "ZAR", "JPY")
+        assert converted.tolist() == [8, 20]
+
+    @pytest.mark.asyncio
+    async def test_convert_exact_weak_to_strong(self, service):
+        """Test that tiny cross rates keep their significant digits"""
+        service._batch_cache = {"ZAR": 1.0, "IRR": 2412.3456, "KWD": 0.016987}
+        service._batch_cache_time = datetime.now()
+
+        exact = await service.convert_exact("1000000000", "IRR", "KWD")
+        assert str(exact["rate"]) == "0.00000704169419174"
+        assert str(exact["converted_amount"]) == "7041.694"
+        # The reported mantissa and exponent reproduce the converted amount
+        converted = Decimal(exact["amount_minor"] * exact["rate_scaled"]).scaleb(exact["rate_exponent"])
+        assert int(converted.to_integral_value(rounding=ROUND_HALF_EVEN)) == exact["converted_minor"]
+
+        converted = await service.convert_exact_batch(np.array([10 ** 11]), "IRR", "KWD")
+        assert converted.tolist() == [7041694]
+
+    @pytest.mark.asyncio
+    async def test_get_rate_replaces_anomalous_quote(self, service):
+        """Test that quotes inconsistent with the snapshot are not served"""
+        service.consistency.update_primary({"USD": 0.05, "EUR": 0.045})
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"rates": {"EUR": 0.95}}
+        mock_response.raise_for_status = MagicMock()
+
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+
+            rate = await service.get_rate("USD", "EUR")
+
+        assert rate == pytest.approx(0.9)
+        assert service.consistency.analyze()["anomalies"][0]["quoted"] == 0.95
+
+    @pytest.mark.asyncio
+    async def test_snapshots_are_logged(self, service):
+        """Test that each batch fetch is appended to the snapshot log"""
+        mock_response = MagicMock()
+        mock_response.json.return_value = {"rates": {"USD": 0.05}}
+        mock_response.raise_for_status = MagicMock()
+
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_client.return_value.__aenter__.return_value.get = AsyncMock(return_value=mock_response)
+            await service.get_all_rates_from_zar()
+
+        assert len(service.snapshot_log) == 1
+        rate, _ = service.get_rate_as_of("USD", "ZAR", datetime.utcnow())
+        assert rate == pytest.approx(20.0)
+
+
+@pytest.mark.unit
+class TestProviderAwareRefresh:
+    """Unit tests for refresh scheduling and unchanged-payload detection"""
+
+    @pytest.fixture
+    def service(self):
+        """Create service instance"""
+        return ExchangeRateService()
+
+    @staticmethod
+    def _response(status_code=200, payload=None, headers=None):
+        response = MagicMock()
+        response.status_code = status_code
+        response.headers = headers or {}
+        response.json.return_value = payload or {}
+        response.raise_for_status = MagicMock()
+        return response
+
+    @pytest.mark.asyncio
+    async def test_schedules_from_provider_timestamp(self, service):
+        """Test that the next refresh follows time_last_updated"""
+        last_updated = int(datetime.now().timestamp()) + 600
+        payload = {"rates": {"USD": 0.05}, "time_last_updated": last_updated}
+
+        with patch('httpx.AsyncClient') as mock_client:
+            get = AsyncMock(return_value=self._response(payload=payload))
+            mock_client.return_value.__aenter__.return_value.get = get
+            await service.get_all_rates_from_zar()
+
+        expected = last_updated + service._provider_update_interval + service._refresh_grace
+        assert service._batch_next_refresh.timestamp() == pytest.approx(expected, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_stale_timestamp_waits_for_daily_update(self, service):
+        """Test that a table published hours ago is not re-polled every few minutes"""
+        last_updated = int(datetime.now().timestamp()) - 10 * 3600
+        payload = {"rates": {"USD": 0.05}, "time_last_updated": last_updated}
+
+        with patch('httpx.AsyncClient') as mock_client:
+            get = AsyncMock(return_value=self._response(payload=payload))
+            mock_client.return_value.__aenter__.return_value.get = get
+            await service.get_all_rates_from_zar()
+            first = service._batch_next_refresh.timestamp()
+            service._batch_next_refresh = datetime.now()
+            await service.get_all_rates_from_zar()
+
+        expected = last_updated + 86400 + service._refresh_grace
+        assert first == pytest.approx(expected, abs=1)
+        assert service._batch_next_refresh.timestamp() == pytest.approx(expected, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_overdue_update_backs_off(self, service):
+        """Test exponential polling from the TTL while an update is overdue"""
+        last_updated = int(datetime.now().timestamp()) - 25 * 3600
+        payload = {"rates": {"USD": 0.05}, "time_last_updated": last_updated}
+
+        delays = []
+        with patch('httpx.AsyncClient') as mock_client:
+            get = AsyncMock(return_value=self._response(payload=payload))
+            mock_client.return_value.__aenter__.return_value.get = get
+            for _ in range(3):
+                service._batch_next_refresh = datetime.now()
+                await service.get_all_rates_from_zar()
+                delays.append(service._batch_next_refresh.timestamp() - datetime.now().timestamp())
+
+        ttl = service._batch_cache_ttl
+        assert delays == pytest.approx([ttl, 2 * ttl, 4 * ttl], abs=1)
+
+    @pytest.mark.asyncio
+    async def test_learns_update_interval(self, service):
+        """Test that the cadence comes from successive provider timestamps"""
+        now = int(datetime.now().timestamp())
+        with patch('httpx.AsyncClient') as mock_client:
+            get = AsyncMock(side_effect=[
+                self._response(payload={"rates": {"USD": 0.05}, "time_last_updated": now - 3700}),
+                self._response(payload={"rates": {"USD": 0.051}, "time_last_updated": now - 100})
+            ])
+            mock_client.return_value.__aenter__.return_value.get = get
+            await service.get_all_rates_from_zar()
+            service._batch_next_refresh = datetime.now()
+            await service.get_all_rates_from_zar()
+
+        assert service._provider_update_interval == 3600
+        expected = now - 100 + 3600 + service._refresh_grace
+        assert service._batch_next_refresh.timestamp() == pytest.approx(expected, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_skipped_publish_keeps_update_interval(self, service):
+        """Test that a missed daily update is not learned as a 48h cadence"""
+        now = int(datetime.now().timestamp())
+        day = 86400
+        stamps = [now - 5 * day - 100, now - 3 * day - 100, now - 2 * day - 100, now - 100]
+        with patch('httpx.AsyncClient') as mock_client:
+            get = AsyncMock(side_effect=[
+                self._response(payload={"rates": {"USD": 0.05 + i / 1000}, "time_last_updated": stamp})
+                for i, stamp in enumerate(stamps)
+            ])
+            mock_client.return_value.__aenter__.return_value.get = get
+            await service.get_all_rates_from_zar()
+            service._batch_next_refresh = datetime.now()
+            await service.get_all_rates_from_zar()
+            # The first gap (48h) is clamped to the upper bound
+            assert service._provider_update_interval == 25 * 3600
+
+            for _ in range(2):
+                service._batch_next_refresh = datetime.now()
+                await service.get_all_rates_from_zar()
+
+        assert service._provider_update_interval == day
+        expected = now - 100 + day + service._refresh_grace
+        assert service._batch_next_refresh.timestamp() == pytest.approx(expected, abs=1)
+
+    @pytest.mark.asyncio
+    async def test_conditional_request_not_modified(self, service):
+        """Test that validators are sent and a 304 keeps the snapshot"""
+        payload = {"rates": {"USD": 0.05}, "time_last_updated": 1}
+        first = self._response(payload=payload, headers={"ETag": '"v1"'})
+        listener = MagicMock()
+        service.add_snapshot_listener(listener)
+
+        with patch('httpx.AsyncClient') as mock_client:
+            get = AsyncMock(side_effect=[first, self._response(status_code=304)])
+            mock_client.return_value.__aenter__.return_value.get = get
+            await service.get_all_rates_from_zar()
+            service._batch_next_refresh = datetime.now()
+            rates = await service.get_all_rates_from_zar()
+
+        assert rates == {"USD": 0.05}
+        assert get.call_args.kwargs["headers"] == {"If-None-Match": '"v1"'}
+        assert service._snapshot_version == 1
+        assert listener.call_count == 1
+        stats = service.get_refresh_stats()
+        assert stats["useful"] == 1
+        assert stats["not_modified"] == 1
+        assert stats["wasted"] == 1
+
+    @pytest.mark.asyncio
+    async def test_identical_payload_is_not_a_new_snapshot(self, service):
+        """Test that an unchanged table does not bump the snapshot version"""
+        payload = {"rates": {"USD": 0.05}, "time_last_updated": 1}
+        changed = {"rates": {"USD": 0.051}, "time_last_updated": 2}
+
+        # Distinct log timestamps: snapshots within one millisecond would merge
+        with patch('httpx.AsyncClient') as mock_client, \
+             patch('app.services.snapshot_log.now_ms', side_effect=[1000, 2000, 3000]):
+            get = AsyncMock(side_effect=[
+                self._response(payload=payload),
+                self._response(payload=dict(payload)),
+                self._response(payload=changed)
+            ])
+            mock_client.return_value.__aenter__.return_value.get = get
+            for _ in range(3):
+                service._batch_next_refresh = datetime.now()
+                await service.get_all_rates_from_zar()
+
+        assert service._snapshot_version == 2
+        assert len(service.snapshot_log) == 2
+        stats = service.get_refresh_stats()
+        assert stats["fetches"] == 3
+        assert stats["unchanged"] == 1
+        assert stats["useful"] == 2
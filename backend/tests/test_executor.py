@@ -0,0 +1,217 @@
+"""
+Tests for the compute executor
+"""
+import asyncio
+import os
+import threading
+import time
+import numpy as np
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.executor import ComputeExecutor, attach_array, share_array
+from app.services.exchange_rate_service import ExchangeRateService
+
+
+client = TestClient(app)
+
+
+def _scale(values: np.ndarray, factor: float) -> np.ndarray:
+    return values * factor
+
+
+def _total(values: np.ndarray) -> float:
+    return float(values.sum())
+
+
+def _slow_range(seconds: float) -> np.ndarray:
+    time.sleep(seconds)
+    return np.arange(1000, dtype=np.float64)
+
+
+def _shared_blocks() -> set:
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")}
+
+
+def _thread_name() -> str:
+    return threading.current_thread().name
+
+
+@pytest.mark.unit
+class TestSharedArrays:
+    """Unit tests for shared memory array handles"""
+
+    def test_round_trip(self):
+        """Test that an attached array sees the shared data"""
+        source = np.arange(12, dtype=np.float64).reshape(3, 4)
+        handle, block = share_array(source)
+        try:
+            view, attached = attach_array(handle)
+            np.testing.assert_array_equal(view, source)
+            assert view.dtype == source.dtype
+            del view
+            attached.close()
+        finally:
+            block.close()
+            block.unlink()
+
+
+@pytest.mark.unit
+class TestComputeExecutor:
+    """Unit tests for inline/offload dispatch"""
+
+    @pytest.mark.asyncio
+    async def test_small_work_runs_inline(self):
+        """Test that work below the threshold stays on the calling thread"""
+        executor = ComputeExecutor(threshold=100)
+        try:
+            name = await executor.run(_thread_name, size=10)
+            assert name == threading.current_thread().name
+            assert executor.metrics()["inline"] == 1
+            assert executor.metrics()["submitted"] == 0
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_large_work_offloaded_to_threads(self):
+        """Test that work at the threshold runs in the pool"""
+        executor = ComputeExecutor(threshold=100)
+        try:
+            name = await executor.run(_thread_name, size=100)
+            assert name.startswith("compute")
+            metrics = executor.metrics()
+            assert metrics["submitted"] == 1
+            assert metrics["completed"] == 1
+            assert metrics["active"] == 0
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_process_pool_moves_arrays_through_shared_memory(self):
+        """Test array arguments and results with a process pool"""
+        executor = ComputeExecutor(kind="process", max_workers=1, threshold=1)
+        values = np.linspace(0.0, 1.0, 1000)
+        try:
+            scaled = await executor.run(_scale, values, 3.0, size=len(values), cpu_bound=True)
+            total = await executor.run(_total, values, size=len(values), cpu_bound=True)
+        finally:
+            executor.shutdown()
+
+        np.testing.assert_allclose(scaled, values * 3.0)
+        assert total == pytest.approx(values.sum())
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        """Test that a slow call times out and is counted"""
+        executor = ComputeExecutor(threshold=0, timeout=0.05)
+        try:
+            with pytest.raises(TimeoutError):
+                await executor.run(time.sleep, 0.5, size=1)
+            assert executor.metrics()["timeouts"] == 1
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    @pytest.mark.skipif(not os.path.isdir("/dev/shm"), reason="needs /dev/shm")
+    async def test_abandoned_process_result_unlinked(self):
+        """Test that a timed-out worker's shared result does not leak"""
+        executor = ComputeExecutor(kind="process", max_workers=1, threshold=0, timeout=0.05)
+        before = _shared_blocks()
+        try:
+            with pytest.raises(TimeoutError):
+                await executor.run(_slow_range, 0.3, size=1, cpu_bound=True)
+            # Let the worker finish and its done-callback run
+            await asyncio.sleep(0.8)
+            assert _shared_blocks() <= before
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_timed_out_worker_keeps_its_slot(self):
+        """Test that a still-running worker counts as active until it finishes"""
+        executor = ComputeExecutor(max_workers=1, threshold=0, timeout=0.05)
+        try:
+            with pytest.raises(TimeoutError):
+                await executor.run(time.sleep, 0.3, size=1)
+            metrics = executor.metrics()
+            assert metrics["active"] == 1
+            assert metrics["saturation"] == 1.0
+            # The slot is still taken, so the next call waits for it
+            with pytest.raises(TimeoutError):
+                await executor.run(time.sleep, 0, size=1)
+            assert executor.metrics()["submitted"] == 1
+
+            await asyncio.sleep(0.4)
+            assert executor.metrics()["active"] == 0
+            assert await executor.run(sum, [1, 2], size=1) == 3
+        finally:
+            executor.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_queued_work_cancelled(self):
+        """Test that cancelling a queued caller never submits its work"""
+        executor = ComputeExecutor(max_workers=1, threshold=0)
+        try:
+            running = asyncio.create_task(executor.run(time.sleep, 0.2, size=1))
+            await asyncio.sleep(0.01)
+            queued = asyncio.create_task(executor.run(time.sleep, 0.2, size=1))
+            await asyncio.sleep(0.01)
+
+            metrics = executor.metrics()
+            assert metrics["saturation"] == 1.0
+            assert metrics["waiting"] == 1
+
+            queued.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await queued
+            await running
+
+            metrics = executor.metrics()
+            assert metrics["cancelled"] == 1
+            assert metrics["submitted"] == 1
+            assert metrics["max_waiting"] == 1
+        finally:
+            executor.shutdown()
+
+    def test_rejects_unknown_kind(self):
+        """Test executor kind validation"""
+        with pytest.raises(ValueError):
+            ComputeExecutor(kind="gpu")
+
+
+@pytest.mark.integration
+class TestHistoricalOffload:
+    """Integration tests for offloaded historical series"""
+
+    @pytest.mark.asyncio
+    async def test_long_series_offloaded(self):
+        """Test that a long series goes through the pool and keeps its shape"""
+        service = ExchangeRateService()
+        service.executor = ComputeExecutor(threshold=100)
+        try:
+            with patch.object(service, "get_rate", return_value=18.5):
+                historical = await service.get_historical_rates("USD", "ZAR", 500)
+            assert len(historical) == 501
+            assert historical[0]["date"] < historical[-1]["date"]
+            assert service.executor.metrics()["submitted"] == 2
+        finally:
+            service.executor.shutdown()
+
+    def test_timeout_maps_to_504(self):
+        """Test that a pool timeout surfaces as a gateway timeout"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_historical_rates',
+                   side_effect=TimeoutError()), \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_snapshot_version',
+                   return_value=None):
+            response = client.get("/api/v1/exchange/historical/USD/ZAR?days=30")
+
+        assert response.status_code == 504
+
+    def test_metrics_endpoint(self, monkeypatch):
+        """Test pool metrics on the admin debug endpoint"""
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = client.get("/debug/executor", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert {"kind", "active", "waiting", "saturation"} <= set(response.json())
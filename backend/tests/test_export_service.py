@@ -0,0 +1,97 @@
+"""
+Tests for bulk historical export
+"""
+import io
+import numpy as np
+import pytest
+import pyarrow as pa
+import pyarrow.parquet as pq
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.services.export_service import iter_history_chunks, stream_export
+
+
+client = TestClient(app)
+
+
+@pytest.mark.unit
+class TestExportService:
+    """Unit tests for export streaming"""
+
+    def test_chunks_are_bounded_and_ordered(self):
+        """Test that chunks never exceed chunk_size and run oldest-first"""
+        chunks = list(iter_history_chunks(np.array([18.0, 19.5]), 100, chunk_size=30))
+
+        assert [len(dates) for dates, _ in chunks] == [30, 30, 30, 11]
+        dates = np.concatenate([d for d, _ in chunks])
+        assert np.all(np.diff(dates).astype(int) == 1)
+        assert all(rates.shape[1] == 2 for _, rates in chunks)
+
+    def test_seed_is_reproducible(self):
+        """Test that the same seed yields the same series"""
+        first = b"".join(stream_export("csv", ["USD"], np.array([18.0]), 50, seed=7))
+        second = b"".join(stream_export("csv", ["USD"], np.array([18.0]), 50, seed=7))
+        assert first == second
+
+    def test_csv_layout(self):
+        """Test CSV header and row count"""
+        data = b"".join(stream_export("csv", ["USD", "EUR"], np.array([18.0, 19.5]), 10, 4))
+        lines = data.decode().strip().split("\n")
+
+        assert lines[0] == "date,USD,EUR"
+        assert len(lines) == 12
+
+    def test_arrow_round_trip(self):
+        """Test that the Arrow IPC stream is readable"""
+        data = b"".join(stream_export("arrow", ["USD", "EUR"], np.array([18.0, 19.5]), 99, 25))
+        table = pa.ipc.open_stream(data).read_all()
+
+        assert table.num_rows == 100
+        assert table.column_names == ["date", "USD", "EUR"]
+
+    def test_parquet_row_groups(self):
+        """Test that each chunk becomes a Parquet row group"""
+        data = b"".join(stream_export("parquet", ["USD"], np.array([18.0]), 99, 25))
+        parquet = pq.ParquetFile(io.BytesIO(data))
+
+        assert parquet.metadata.num_rows == 100
+        assert parquet.num_row_groups == 4
+
+    def test_unknown_format(self):
+        """Test that unknown formats are rejected"""
+        with pytest.raises(ValueError, match="Unsupported export format"):
+            stream_export("xlsx", ["USD"], np.array([18.0]), 10)
+
+
+@pytest.mark.integration
+class TestExportEndpoint:
+    """Integration tests for the export endpoint"""
+
+    def test_export_csv_projection(self):
+        """Test streaming a projected CSV export"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_cross_rates',
+                   new_callable=AsyncMock) as mock_rates:
+            mock_rates.return_value = np.array([18.2, 19.8])
+
+            response = client.get(
+                "/api/v1/exchange/export?format=csv&currencies=usd,EUR&days=30&seed=1"
+            )
+
+            assert response.status_code == 200
+            assert response.headers["content-type"].startswith("text/csv")
+            assert "attachment" in response.headers["content-disposition"]
+            lines = response.text.strip().split("\n")
+            assert lines[0] == "date,USD,EUR"
+            assert len(lines) == 32
+            mock_rates.assert_called_once_with(["USD", "EUR"], "ZAR")
+
+    def test_export_unknown_currency(self):
+        """Test that unknown currencies are rejected"""
+        response = client.get("/api/v1/exchange/export?currencies=XXX")
+        assert response.status_code == 400
+
+    def test_export_invalid_format(self):
+        """Test that unknown formats fail validation"""
+        response = client.get("/api/v1/exchange/export?format=xlsx")
+        assert response.status_code == 422
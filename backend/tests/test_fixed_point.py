@@ -0,0 +1,106 @@
+"""
+Tests for the fixed-point conversion engine
+"""
+import numpy as np
+import pytest
+from decimal import Decimal
+from app.services.fixed_point import (
+    INT64_MAX,
+    RATE_SCALE,
+    convert_minor_units,
+    from_minor_units,
+    minor_unit_rate,
+    precise_minor_unit_rate,
+    quantize_rate,
+    scale_rate,
+    to_minor_units
+)
+
+
+@pytest.mark.unit
+class TestFixedPoint:
+    """Unit tests for fixed-point conversion"""
+
+    def test_minor_units_per_currency(self):
+        """Test currency-specific minor-unit precision"""
+        assert to_minor_units("12.345", "USD") == 1234
+        assert to_minor_units("1234.5", "JPY") == 1234
+        assert to_minor_units("1.2345", "KWD") == 1234
+        assert from_minor_units(1234, "KWD") == Decimal("1.234")
+
+    def test_rate_folds_minor_unit_exponents(self):
+        """Test that exponents are folded into the minor-unit rate"""
+        assert minor_unit_rate("500", "KWD", "JPY") == RATE_SCALE // 2
+        assert minor_unit_rate("18.25", "USD", "ZAR") == scale_rate("18.25")
+
+    def test_convert_matches_decimal(self):
+        """Test vectorized conversion against Decimal arithmetic"""
+        rate = Decimal("18.234567891")
+        amounts = np.array([0, 1, 99, 123456789, -987654321, 10 ** 15], dtype=np.int64)
+
+        result = convert_minor_units(amounts, scale_rate(rate), "ROUND_HALF_EVEN")
+
+        expected = [
+            int((Decimal(int(a)) * rate).to_integral_value(rounding="ROUND_HALF_EVEN"))
+            for a in amounts
+        ]
+        assert result.dtype == np.int64
+        assert result.tolist() == expected
+
+    @pytest.mark.parametrize("rounding,expected", [
+        ("ROUND_HALF_EVEN", [2, -2, 4]),
+        ("ROUND_HALF_UP", [3, -3, 4]),
+        ("ROUND_HALF_DOWN", [2, -2, 3]),
+        ("ROUND_DOWN", [2, -2, 3]),
+        ("ROUND_UP", [3, -3, 4]),
+        ("ROUND_CEILING", [3, -2, 4]),
+        ("ROUND_FLOOR", [2, -3, 3]),
+    ])
+    def test_rounding_modes(self, rounding, expected):
+        """Test rounding of exact halves and fractions"""
+        # 5 * 0.5 = 2.5, -5 * 0.5 = -2.5, 7 * 0.5 = 3.5
+        result = convert_minor_units(np.array([5, -5, 7]), scale_rate("0.5"), rounding)
+        assert result.tolist() == expected
+
+    def test_large_amounts_do_not_overflow_intermediates(self):
+        """Test exactness where amount * scaled rate exceeds int64"""
+        amount = 4 * 10 ** 17
+        result = convert_minor_units(amount, scale_rate("0.054839"))
+        assert result[0] == int(Decimal(amount) * Decimal("0.054839"))
+
+    def test_overflow_detected(self):
+        """Test that results outside int64 raise"""
+        with pytest.raises(OverflowError):
+            convert_minor_units(INT64_MAX // 10, scale_rate("18.5"))
+
+    def test_unknown_rounding_mode(self):
+        """Test that unknown rounding modes are rejected"""
+        with pytest.raises(ValueError, match="Unsupported rounding mode"):
+            convert_minor_units(1, RATE_SCALE, "ROUND_05UP_ISH")
+
+    def test_quantize_keeps_significant_digits(self):
+        """Test 9 decimals for ordinary rates, 12 significant digits for tiny ones"""
+        assert str(quantize_rate("18.2345678912")) == "18.234567891"
+        assert str(quantize_rate(Decimal("0.016987") / Decimal("2412.3456"))) == "0.00000704169419174"
+
+    def test_precise_rate_folds_exponents_before_quantizing(self):
+        """Test the shifted rate of a weak-to-strong pair"""
+        scaled, shift = precise_minor_unit_rate("0.00000704169419174", "IRR", "KWD")
+        assert (scaled, shift) == (704169419174, 7)
+        assert precise_minor_unit_rate("18.25", "USD", "ZAR") == (scale_rate("18.25"), 0)
+
+    @pytest.mark.parametrize("rounding", [
+        "ROUND_HALF_EVEN", "ROUND_HALF_UP", "ROUND_DOWN", "ROUND_CEILING", "ROUND_FLOOR"
+    ])
+    def test_shifted_convert_matches_decimal(self, rounding):
+        """Test conversion with a shifted rate against Decimal arithmetic"""
+        rate = Decimal("0.0000704169419174")
+        scaled, shift = 704169419174, 7
+        amounts = np.array([0, 1, 7, 10 ** 11, -123456789012, 4 * 10 ** 17], dtype=np.int64)
+
+        result = convert_minor_units(amounts, scaled, rounding, shift)
+
+        expected = [
+            int((Decimal(int(a)) * rate).to_integral_value(rounding=rounding)) for a in amounts
+        ]
+        assert result.tolist() == expected
@@ -0,0 +1,99 @@
+"""
+Tests for the currency intent classifier
+"""
+import numpy as np
+import pytest
+from app.services.intent_classifier import (
+    NO_CURRENCY,
+    CurrencyIntentClassifier,
+    hash_ngrams,
+    load_default_classifier
+)
+
+
+@pytest.fixture(scope="module")
+def toy_model():
+    """Classifier trained on a tiny corpus"""
+    texts = ["dollar rate", "usd to rand", "euro rate", "eur to rand", "hello", "weather today"]
+    labels = ["USD", "USD", "EUR", "EUR", NO_CURRENCY, NO_CURRENCY]
+    return CurrencyIntentClassifier.train(texts, labels, dim=1 << 10)
+
+
+@pytest.mark.unit
+class TestFeatures:
+    """Unit tests for n-gram hashing"""
+
+    def test_hash_is_stable_and_normalized(self):
+        """Test that hashing ignores case, accents and extra spaces"""
+        assert hash_ngrams("Euro  Rate").tolist() == hash_ngrams("euro rate").tolist()
+        assert hash_ngrams("Dólar").tolist() == hash_ngrams("dolar").tolist()
+
+    def test_ngram_count_and_range(self):
+        """Test one feature per n-gram, all within the hash space"""
+        features = hash_ngrams("usd", dim=64, ngram_range=(2, 3))
+        # " usd " has 4 bigrams and 3 trigrams
+        assert len(features) == 7
+        assert features.min() >= 0 and features.max() < 64
+
+
+@pytest.mark.unit
+class TestCurrencyIntentClassifier:
+    """Unit tests for training, prediction and persistence"""
+
+    def test_predicts_training_labels(self, toy_model):
+        """Test that the toy model separates its classes"""
+        assert toy_model.predict("dollars to rand")[0] == "USD"
+        assert toy_model.predict("euros")[0] == "EUR"
+
+    def test_probabilities_sum_to_one(self, toy_model):
+        """Test the posterior is a distribution"""
+        probabilities = toy_model.predict_proba("some query")
+        assert probabilities.sum() == pytest.approx(1.0)
+        assert (probabilities >= 0).all()
+
+    def test_temperature_softens_confidence(self, toy_model):
+        """Test that a fitted temperature lowers overconfident posteriors"""
+        sharp = toy_model.predict("usd")[1]
+        toy_model.temperature = 20.0
+        try:
+            assert toy_model.predict("usd")[1] < sharp
+        finally:
+            toy_model.temperature = 1.0
+
+    def test_save_load_round_trip(self, toy_model, tmp_path):
+        """Test that a saved weights file reproduces predictions"""
+        path = tmp_path / "model.npz"
+        toy_model.save(path)
+        loaded = CurrencyIntentClassifier.load(path)
+
+        assert loaded.labels == toy_model.labels
+        assert loaded.ngram_range == toy_model.ngram_range
+        np.testing.assert_allclose(loaded.predict_proba("usd rate"), toy_model.predict_proba("usd rate"))
+
+    def test_missing_weights_file(self, tmp_path):
+        """Test that a missing model disables the classifier instead of failing"""
+        assert load_default_classifier(tmp_path / "missing.npz") is None
+
+
+@pytest.mark.unit
+class TestShippedModel:
+    """Unit tests for the shipped weights file"""
+
+    @pytest.mark.parametrize("query,expected", [
+        ("how much for a greenbak", "USD"),
+        ("100 bucks in rand", "USD"),
+        ("euroos to zar", "EUR"),
+        ("quid to rand", "GBP"),
+        ("australian dollar to rand", NO_CURRENCY),
+        ("tell me a joke", NO_CURRENCY),
+    ])
+    def test_shipped_model(self, query, expected):
+        """Test typical misspellings, slang and non-supported queries"""
+        model = load_default_classifier()
+        assert model is not None
+        assert model.predict(query)[0] == expected
+
+    def test_shipped_model_is_not_overconfident_out_of_distribution(self):
+        """Test that a free-form query unlike the templates stays below the LLM cutoff"""
+        model = load_default_classifier()
+        assert model.predict("I want to send money to my mom in Lagos")[1] < 0.98
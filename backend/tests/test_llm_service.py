@@ -38,3 +38,54 @@ class TestLLMService:
         """Test currency extraction with unsupported currency"""
         result = await service.extract_currency_from_query("What is the yen rate?")
         assert result is None
+
+    @pytest.mark.asyncio
+    async def test_extract_currency_skips_other_dollars(self, service):
+        """Test that registry names keep other dollars from matching USD"""
+        with patch('httpx.AsyncClient') as mock_client:
+            mock_client.return_value.__aenter__.return_value.post = AsyncMock(
+                side_effect=Exception("offline")
+            )
+            result = await service.extract_currency_from_query("Australian dollar to rand")
+        assert result is None
+
+    @pytest.mark.asyncio
+    async def test_classifier_resolves_without_ollama(self, service):
+        """Test that a confident classifier answer skips the LLM call"""
+        with patch('httpx.AsyncClient') as mock_client:
+            post = AsyncMock(side_effect=Exception("offline"))
+            mock_client.return_value.__aenter__.return_value.post = post
+            result = await service.extract_currency_from_query("how many rand for 100 bucks")
+        assert result == "USD"
+        post.assert_not_called()
+
+    @pytest.mark.asyncio
+    async def test_query_without_currency_term_escalates_to_ollama(self, service):
+        """Test that the classifier cannot answer for queries naming no currency"""
+        service.classifier = MagicMock()
+        service.classifier.predict.return_value = ("EUR", 0.99998)
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"response": "NONE"}
+
+        with patch('httpx.AsyncClient') as mock_client:
+            post = AsyncMock(return_value=mock_response)
+            mock_client.return_value.__aenter__.return_value.post = post
+            result = await service.extract_currency_from_query("I want to send money to my mom in Lagos")
+        assert result is None
+        service.classifier.predict.assert_not_called()
+        post.assert_called_once()
+
+    @pytest.mark.asyncio
+    async def test_low_confidence_escalates_to_ollama(self, service):
+        """Test that an unsure classifier falls back to the LLM"""
+        service.classifier = MagicMock()
+        service.classifier.predict.return_value = ("EUR", 0.5)
+        mock_response = MagicMock(status_code=200)
+        mock_response.json.return_value = {"response": "GBP"}
+
+        with patch('httpx.AsyncClient') as mock_client:
+            post = AsyncMock(return_value=mock_response)
+            mock_client.return_value.__aenter__.return_value.post = post
+            result = await service.extract_currency_from_query("something vague")
+        assert result == "GBP"
+        post.assert_called_once()
@@ -0,0 +1,106 @@
+"""
+Tests for portfolio valuation
+"""
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.routes import exchange
+from app.services.portfolio_service import value_portfolio
+from app.services.snapshot_log import SnapshotLog
+
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def log():
+    """Three ZAR-based snapshots, one minute apart"""
+    log = SnapshotLog()
+    log.append({"USD": 0.05, "EUR": 0.04}, timestamp_ms=60_000)
+    log.append({"USD": 0.05, "EUR": 0.05}, timestamp_ms=120_000)
+    log.append({"USD": 0.04, "EUR": 0.05}, timestamp_ms=180_000)
+    return log
+
+
+@pytest.mark.unit
+class TestValuePortfolio:
+    """Unit tests for the valuation series and attribution"""
+
+    def test_series_in_zar(self, log):
+        """Test that each point equals the sum of converted holdings"""
+        result = value_portfolio(log, {"USD": 100.0, "EUR": 10.0, "ZAR": 5.0})
+
+        # USD/ZAR 20, 20, 25; EUR/ZAR 25, 20, 20
+        assert result["series"]["values"] == pytest.approx([2255.0, 2205.0, 2705.0])
+        assert result["total_value"] == pytest.approx(2705.0)
+        assert len(result["series"]["timestamps"]) == 3
+
+    def test_contributions(self, log):
+        """Test per-currency value and weight at the end of the window"""
+        contributions = value_portfolio(log, {"USD": 100.0, "EUR": 10.0})["contributions"]
+
+        assert contributions["USD"]["value"] == pytest.approx(2500.0)
+        assert contributions["EUR"]["value"] == pytest.approx(200.0)
+        assert sum(c["weight"] for c in contributions.values()) == pytest.approx(1.0)
+
+    def test_pnl_attribution(self, log):
+        """Test that per-currency P&L sums to the total"""
+        pnl = value_portfolio(log, {"USD": 100.0, "EUR": 10.0})["pnl"]
+
+        assert pnl["by_currency"]["USD"] == pytest.approx(500.0)
+        assert pnl["by_currency"]["EUR"] == pytest.approx(-50.0)
+        assert pnl["total"] == pytest.approx(sum(pnl["by_currency"].values()))
+
+    def test_reporting_currency_and_window(self, log):
+        """Test valuation in USD over a window opening mid-snapshot"""
+        result = value_portfolio(log, {"EUR": 10.0}, "USD", start_ms=130_000, end_ms=170_000)
+
+        # The window opens with the snapshot in effect at 130s
+        assert result["series"]["values"] == pytest.approx([10.0])
+        assert result["as_of"].endswith("00:02:00")
+
+    def test_missing_data(self, log):
+        """Test lookup errors for unknown currencies and empty windows"""
+        with pytest.raises(LookupError):
+            value_portfolio(log, {"JPY": 1.0})
+        with pytest.raises(LookupError):
+            value_portfolio(log, {"USD": 1.0}, end_ms=1_000)
+
+    def test_unquoted_currency_is_null(self):
+        """Test that snapshots missing a currency give null values"""
+        log = SnapshotLog()
+        log.append({"USD": 0.05}, timestamp_ms=1_000)
+        log.append({"USD": 0.05, "GBP": 0.04}, timestamp_ms=2_000)
+
+        result = value_portfolio(log, {"GBP": 1.0})
+        assert result["series"]["values"] == [None, pytest.approx(25.0)]
+        assert result["pnl"]["total"] is None
+
+
+@pytest.mark.integration
+class TestPortfolioEndpoint:
+    """Integration tests for POST /portfolio/valuation"""
+
+    def test_valuation(self, log):
+        """Test valuation over the service's snapshot log"""
+        with patch.object(exchange.exchange_service, "snapshot_log", log), \
+             patch.object(exchange.exchange_service, "get_snapshot_version", return_value=3):
+            response = client.post("/api/v1/exchange/portfolio/valuation", json={
+                "holdings": {"usd": 100, "eur": 10}
+            })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_value"] == pytest.approx(2700.0)
+        assert set(data["contributions"]) == {"USD", "EUR"}
+
+    def test_unknown_currency(self, log):
+        """Test 404 when a holding has no recorded rates"""
+        with patch.object(exchange.exchange_service, "snapshot_log", log), \
+             patch.object(exchange.exchange_service, "get_snapshot_version", return_value=3):
+            response = client.post("/api/v1/exchange/portfolio/valuation", json={
+                "holdings": {"XAU": 1}
+            })
+
+        assert response.status_code == 404
@@ -0,0 +1,171 @@
+"""
+Tests for the bid/ask and fee pricing engine
+"""
+import json
+import numpy as np
+import pytest
+from unittest.mock import patch
+from fastapi.testclient import TestClient
+from app.api.routes import exchange
+from app.main import app
+from app.services.pricing_service import PricingEngine, load_pricing_table
+
+
+client = TestClient(app)
+
+# ZAR-based rates: 1 ZAR = 0.05 USD, so USD/ZAR = 20
+RATES = {"USD": 0.05, "EUR": 0.04, "GBP": 0.025, "JPY": 8.0}
+
+TABLE = {
+    "default_spread_bps": 100.0,
+    "currency_spread_bps": {"ZAR": 0.0, "USD": 10.0, "EUR": 20.0},
+    "pair_spread_bps": {"USD/ZAR": 40.0},
+    "fee_currency": "ZAR",
+    "fee_tiers": [
+        {"min_amount": 0, "fee_bps": 100.0, "min_fee": 50.0},
+        {"min_amount": 10_000, "fee_bps": 50.0},
+        {"min_amount": 100_000, "fee_bps": 20.0}
+    ]
+}
+
+
+@pytest.fixture
+def engine():
+    """Engine priced from a fixed snapshot"""
+    engine = PricingEngine(TABLE)
+    engine.on_snapshot(RATES)
+    return engine
+
+
+@pytest.mark.unit
+class TestPricingEngine:
+    """Unit tests for spreads, fee tiers and the price book"""
+
+    def test_spreads(self, engine):
+        """Test summed per-currency spreads and symmetric pair overrides"""
+        eur_usd = engine.quote("EUR", "USD")
+        assert eur_usd["mid"] == pytest.approx(1.25)
+        assert eur_usd["spread_bps"] == 30.0
+        assert eur_usd["bid"] == pytest.approx(1.25 * (1 - 0.0015))
+        assert eur_usd["ask"] == pytest.approx(1.25 * (1 + 0.0015))
+
+        assert engine.quote("USD", "ZAR")["spread_bps"] == 40.0
+        assert engine.quote("ZAR", "USD")["spread_bps"] == 40.0
+        # GBP has no spread of its own: default plus JPY's default
+        assert engine.quote("GBP", "JPY")["spread_bps"] == 200.0
+        assert engine.quote("USD", "USD")["spread_bps"] == 0.0
+
+    def test_fee_tiers(self, engine):
+        """Test tier resolution on the amount's ZAR value, with minimum fees"""
+        small = engine.quote("USD", "ZAR", 100.0)      # R2,000: minimum fee R50
+        assert small["fee_tier"] == 0
+        assert small["fee"] == pytest.approx(50.0 * 0.05)
+
+        boundary = engine.quote("USD", "ZAR", 500.0)   # exactly R10,000
+        assert boundary["fee_tier"] == 1
+        assert boundary["fee"] == pytest.approx(500.0 * 0.005)
+
+        large = engine.quote("USD", "ZAR", 10_000.0)   # R200,000
+        assert large["fee_tier"] == 2
+        assert large["converted_amount"] == pytest.approx(10_000.0 * (1 - 0.002) * 20.0 * (1 - 0.002))
+
+    def test_fee_never_exceeds_amount(self, engine):
+        """Test that a tiny conversion pays at most its own amount"""
+        quote = engine.quote("USD", "ZAR", 1.0)
+        assert quote["fee"] == pytest.approx(1.0)
+        assert quote["converted_amount"] == pytest.approx(0.0)
+
+    def test_batch_matches_single(self, engine):
+        """Test batch quotes against single quotes, with and without amounts"""
+        bases = ["USD", "EUR", "GBP", "ZAR"]
+        targets = ["ZAR", "USD", "JPY", "EUR"]
+        amounts = [250.0, None, 1e6, 42.0]
+        batch = engine.quote_batch(bases, targets, amounts)
+
+        for quote, base, target, amount in zip(batch, bases, targets, amounts):
+            assert quote == engine.quote(base, target, amount)
+        assert batch[1]["fee"] is None
+        assert batch[1]["fee_tier"] is None
+
+    def test_reprices_on_snapshot(self, engine):
+        """Test that a new snapshot replaces every quoted rate"""
+        before = engine.quote("USD", "ZAR")
+        engine.on_snapshot({**RATES, "USD": 0.04})
+
+        after = engine.quote("USD", "ZAR")
+        assert after["mid"] == pytest.approx(25.0)
+        assert after["bid"] / before["bid"] == pytest.approx(25.0 / 20.0)
+        assert engine.repricings == 2
+
+    def test_book_is_consistent(self, engine):
+        """Test bid < mid < ask and reciprocal mids across the whole book"""
+        book = engine._book
+        off_diagonal = ~np.eye(len(book.codes), dtype=bool)
+        assert np.all(book.bid[off_diagonal] < book.mid[off_diagonal])
+        assert np.all(book.ask[off_diagonal] > book.mid[off_diagonal])
+        assert np.allclose(book.mid * book.mid.T, 1.0)
+
+    def test_errors(self, engine):
+        """Test unknown currencies, bad amounts, and quoting before any snapshot"""
+        with pytest.raises(LookupError):
+            engine.quote("XYZ", "ZAR")
+        with pytest.raises(ValueError):
+            engine.quote("USD", "ZAR", -5.0)
+        with pytest.raises(LookupError):
+            PricingEngine(TABLE).quote("USD", "ZAR")
+
+    def test_rejects_invalid_tables(self):
+        """Test validation of tier order and spread range"""
+        with pytest.raises(ValueError):
+            PricingEngine({**TABLE, "fee_tiers": [{"min_amount": 10, "fee_bps": 5}]})
+        with pytest.raises(ValueError):
+            PricingEngine({**TABLE, "fee_tiers": [
+                {"min_amount": 0, "fee_bps": 5}, {"min_amount": 0, "fee_bps": 1}
+            ]})
+        with pytest.raises(ValueError):
+            PricingEngine({**TABLE, "default_spread_bps": -1})
+
+    def test_table_from_file(self, tmp_path):
+        """Test that a table file overrides the defaults it names"""
+        path = tmp_path / "pricing.json"
+        path.write_text(json.dumps({"default_spread_bps": 5.0}))
+
+        table = load_pricing_table(str(path))
+        assert table["default_spread_bps"] == 5.0
+        assert table["fee_tiers"] == load_pricing_table()["fee_tiers"]
+
+
+@pytest.mark.integration
+class TestQuoteEndpoints:
+    """Integration tests for the quote endpoints"""
+
+    def test_quote(self, engine):
+        """Test a single quote with an amount"""
+        with patch.object(exchange.exchange_service, "pricing", engine), \
+             patch.object(exchange.exchange_service, "get_snapshot_version", return_value=1):
+            response = client.post("/api/v1/exchange/quote", json={
+                "base_currency": "usd", "amount": 1000
+            })
+
+        assert response.status_code == 200
+        quote = response.json()
+        assert quote["target_currency"] == "ZAR"
+        assert quote["bid"] < quote["mid"] < quote["ask"]
+        assert quote["fee_tier"] == 1
+
+    def test_quote_batch(self, engine):
+        """Test batch quoting and unknown currencies"""
+        with patch.object(exchange.exchange_service, "pricing", engine), \
+             patch.object(exchange.exchange_service, "get_snapshot_version", return_value=1):
+            response = client.post("/api/v1/exchange/quote/batch", json={"quotes": [
+                {"base_currency": "USD"},
+                {"base_currency": "EUR", "target_currency": "GBP", "amount": 50}
+            ]})
+            missing = client.post("/api/v1/exchange/quote", json={"base_currency": "XYZ"})
+
+        assert response.status_code == 200
+        quotes = response.json()["quotes"]
+        assert [q["base_currency"] for q in quotes] == ["USD", "EUR"]
+        assert quotes[0]["amount"] is None
+        assert quotes[1]["converted_amount"] > 0
+        assert missing.status_code == 404
@@ -0,0 +1,111 @@
+"""
+Tests for the sampling profiler and event-loop lag monitor
+"""
+import asyncio
+import threading
+import time
+import pytest
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.profiling import LoopLagMonitor, collapse, sample_stacks
+
+
+client = TestClient(app)
+
+
+def _busy_worker(stop: threading.Event):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+@pytest.mark.unit
+class TestSamplingProfiler:
+    """Unit tests for stack sampling"""
+
+    def test_samples_other_threads(self):
+        """Test that a busy thread appears in the collapsed output"""
+        stop = threading.Event()
+        worker = threading.Thread(target=_busy_worker, args=(stop,), name="busy-worker")
+        worker.start()
+        try:
+            counts = sample_stacks(0.2, rate_hz=200)
+        finally:
+            stop.set()
+            worker.join()
+
+        output = collapse(counts)
+        busy = [line for line in output.splitlines() if line.startswith("busy-worker;")]
+        assert busy
+        assert any("_busy_worker (test_profiling.py:" in line for line in busy)
+        stack, count = busy[0].rsplit(" ", 1)
+        assert int(count) > 0
+
+
+@pytest.mark.unit
+class TestLoopLagMonitor:
+    """Unit tests for the lag monitor"""
+
+    def test_record_lag_statistics(self):
+        """Test lag accounting and threshold events"""
+        monitor = LoopLagMonitor(threshold=0.1)
+        monitor.record_lag(0.01)
+        monitor.record_lag(0.25)
+
+        snapshot = monitor.snapshot()
+        assert snapshot["samples"] == 2
+        assert snapshot["max_lag_ms"] == 250.0
+        assert len(snapshot["events"]) == 1
+        assert snapshot["events"][0]["duration_ms"] == 250.0
+
+    @pytest.mark.asyncio
+    async def test_blocking_call_captured_with_stack(self):
+        """Test that a blocked loop is recorded with the blocking stack"""
+        monitor = LoopLagMonitor(interval=0.01, threshold=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            time.sleep(0.3)  # block the event loop
+            await asyncio.sleep(0.05)
+        finally:
+            await monitor.stop()
+
+        events = monitor.snapshot()["events"]
+        assert events
+        assert events[0]["duration_ms"] >= 200
+        assert any("test_blocking_call_captured_with_stack" in frame for frame in events[0]["stack"])
+
+
+@pytest.mark.integration
+class TestDebugEndpoints:
+    """Integration tests for admin-only debug endpoints"""
+
+    def test_disabled_without_admin_token(self, monkeypatch):
+        """Test that endpoints are hidden when ADMIN_TOKEN is unset"""
+        monkeypatch.delenv("ADMIN_TOKEN", raising=False)
+        assert client.get("/debug/loop-lag").status_code == 404
+
+    def test_rejects_wrong_token(self, monkeypatch):
+        """Test that a wrong token is refused"""
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = client.get("/debug/loop-lag", headers={"X-Admin-Token": "nope"})
+        assert response.status_code == 403
+
+    def test_profile(self, monkeypatch):
+        """Test collapsed-stack profile output"""
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = client.get(
+            "/debug/profile?seconds=0.1&rate=100",
+            headers={"X-Admin-Token": "secret"}
+        )
+
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/plain")
+        assert response.text.strip()
+
+    def test_loop_lag(self, monkeypatch):
+        """Test lag monitor statistics"""
+        monkeypatch.setenv("ADMIN_TOKEN", "secret")
+        response = client.get("/debug/loop-lag", headers={"X-Admin-Token": "secret"})
+
+        assert response.status_code == 200
+        assert "max_lag_ms" in response.json()
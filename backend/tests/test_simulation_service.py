@@ -0,0 +1,247 @@
+"""
+Tests for Monte Carlo scenario simulation
+"""
+import asyncio
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.api.routes import exchange
+from app.main import app
+from app.core.executor import ComputeExecutor
+from app.services.snapshot_log import SnapshotLog, now_ms
+from app.services.simulation_service import (
+    estimate_parameters,
+    report_steps,
+    run_simulation,
+    simulate_paths_block
+)
+
+
+client = TestClient(app)
+
+
+def _history(spot, observations, daily_vol=0.01, gap_days=1.0, seed=0):
+    """Recorded-looking GBM history ending at spot, with its elapsed days"""
+    rng = np.random.default_rng(seed)
+    steps = rng.normal(0, daily_vol * np.sqrt(gap_days), (observations - 1, len(spot)))
+    levels = np.vstack([np.zeros(len(spot)), np.cumsum(steps, axis=0)])
+    return spot * np.exp(levels - levels[-1]), np.arange(observations) * gap_days
+
+
+@pytest.mark.unit
+class TestSimulationKernels:
+    """Unit tests for parameter estimation and path generation"""
+
+    def test_estimate_parameters(self):
+        """Test drift and covariance of log returns"""
+        history = np.array([[1.0, 2.0], [1.1, 2.0], [1.21, 2.0]])
+        drift, covariance, returns = estimate_parameters(history)
+
+        assert returns.shape == (2, 2)
+        assert drift.tolist() == pytest.approx([np.log(1.1), 0.0])
+        assert covariance.shape == (2, 2)
+        assert covariance[1, 1] == 0.0
+
+    def test_estimate_parameters_rescales_uneven_gaps(self):
+        """Test that returns over longer gaps count as several days"""
+        history = np.array([[1.0], [np.exp(0.02)], [np.exp(0.03)]])
+        drift, covariance, returns = estimate_parameters(history, np.array([0.0, 2.0, 3.0]))
+
+        assert drift.tolist() == pytest.approx([0.01])
+        assert returns[:, 0].tolist() == pytest.approx([0.01, 0.01])
+        assert covariance[0, 0] == pytest.approx(0.0)
+
+        # Daily volatility is recovered from snapshots four days apart
+        history, days = _history(np.array([18.5]), 2000, daily_vol=0.008, gap_days=4.0)
+        _, covariance, _ = estimate_parameters(history, days)
+        assert np.sqrt(covariance[0, 0]) == pytest.approx(0.008, rel=0.05)
+
+    def test_report_steps(self):
+        """Test band reporting steps always end at the horizon"""
+        assert report_steps(5).tolist() == [1, 2, 3, 4, 5]
+        assert report_steps(10, max_points=3).tolist() == [4, 8, 10]
+
+    def test_chunking_does_not_change_paths(self):
+        """Test that time chunking only bounds memory, not results"""
+        args = ("bootstrap", np.array([20.0]), np.zeros(1), np.eye(1) * 0.01,
+                np.array([[0.01], [-0.02], [0.005]]), 30, 50)
+        reported = report_steps(30)
+        whole = simulate_paths_block(*args, np.random.SeedSequence(7), 30, reported)
+        chunked = simulate_paths_block(*args, np.random.SeedSequence(7), 4, reported)
+
+        assert whole.shape == (50, 30, 1)
+        np.testing.assert_allclose(whole, chunked)
+
+    def test_gbm_zero_volatility_follows_drift(self):
+        """Test that GBM without shocks compounds the drift exactly"""
+        levels = simulate_paths_block(
+            "gbm", np.array([10.0]), np.array([0.01]), np.zeros((1, 1)), np.empty((0, 1)),
+            3, 4, np.random.SeedSequence(1), 2, report_steps(3)
+        )
+
+        np.testing.assert_allclose(levels[0, :, 0], 10.0 * np.exp([0.01, 0.02, 0.03]))
+
+
+@pytest.mark.unit
+class TestRunSimulation:
+    """Unit tests for the simulation pipeline"""
+
+    @pytest.mark.asyncio
+    async def test_reproducible_with_seed(self):
+        """Test that a seed reproduces the bands, across executor setups"""
+        spot = np.array([18.5, 20.1])
+        history, days = _history(spot, 100)
+        args = (["USD", "EUR"], spot, 20, 3000)
+        inline = await run_simulation(*args, history=history, elapsed_days=days, seed=42)
+        executor = ComputeExecutor(threshold=1)
+        try:
+            pooled = await run_simulation(
+                *args, history=history, elapsed_days=days, seed=42, executor=executor
+            )
+        finally:
+            executor.shutdown()
+        other = await run_simulation(*args, history=history, elapsed_days=days, seed=43)
+
+        assert inline["bands"] == pooled["bands"]
+        assert inline["bands"] != other["bands"]
+
+    @pytest.mark.asyncio
+    async def test_bands_are_ordered(self):
+        """Test that percentile bands are monotone and bracket the median"""
+        history, days = _history(np.array([18.5]), 60)
+        result = await run_simulation(
+            ["USD"], np.array([18.5]), 10, 1000, model="bootstrap",
+            history=history, elapsed_days=days, seed=1
+        )
+        bands = result["bands"]["USD"]
+
+        assert list(bands) == ["p5", "p25", "p50", "p75", "p95"]
+        assert len(bands["p50"]) == len(result["steps"]) == 10
+        stacked = np.array(list(bands.values()))
+        assert (np.diff(stacked, axis=0) >= 0).all()
+        assert result["daily_volatility"]["USD"] > 0
+        assert result["parameter_source"] == "history"
+        assert result["history_points"] == 60
+
+    @pytest.mark.asyncio
+    async def test_caller_volatility_without_history(self):
+        """Test that too little history falls back to the caller's volatility"""
+        history, days = _history(np.array([18.5]), 5)
+        result = await run_simulation(
+            ["USD"], np.array([18.5]), 30, 2000, history=history, elapsed_days=days,
+            volatility=0.008, seed=1
+        )
+
+        assert result["parameter_source"] == "volatility"
+        assert result["daily_volatility"]["USD"] == pytest.approx(0.008)
+        p5, p95 = result["bands"]["USD"]["p5"][-1], result["bands"]["USD"]["p95"][-1]
+        # About 4.4% volatility over 30 days: bands within roughly +-8%
+        assert 16.5 < p5 < 18.5 < p95 < 20.5
+
+    @pytest.mark.asyncio
+    async def test_refuses_without_history_or_volatility(self):
+        """Test that bands are never produced from made-up parameters"""
+        history, days = _history(np.array([18.5]), 5)
+        with pytest.raises(ValueError, match="volatility"):
+            await run_simulation(["USD"], np.array([18.5]), 10, 100, history=history, elapsed_days=days)
+        with pytest.raises(ValueError, match="Bootstrap"):
+            await run_simulation(
+                ["USD"], np.array([18.5]), 10, 100, model="bootstrap", volatility=0.01
+            )
+
+    @pytest.mark.asyncio
+    async def test_failed_block_cancels_the_rest(self):
+        """Test that one failing block cancels the blocks still queued behind it"""
+        calls = []
+
+        def block(model, spot, drift, factor, returns, steps, n_paths, *args):
+            calls.append(n_paths)
+            if len(calls) == 1:
+                raise MemoryError("block too large")
+            return np.ones((n_paths, 1, len(spot)))
+
+        executor = ComputeExecutor(max_workers=1, threshold=1)
+        try:
+            with patch("app.services.simulation_service.simulate_paths_block", block):
+                with pytest.raises(MemoryError):
+                    await run_simulation(
+                        ["USD"], np.array([18.5]), 10, 5 * 2000, volatility=0.01, seed=1,
+                        executor=executor
+                    )
+                await asyncio.sleep(0.05)
+            metrics = executor.metrics()
+        finally:
+            executor.shutdown()
+
+        # The slot freed by the failure may already have been handed to the
+        # next block; everything queued after it never runs
+        assert len(calls) <= 2
+        assert metrics["cancelled"] >= 3
+
+    @pytest.mark.asyncio
+    async def test_unknown_model(self):
+        """Test that unknown models are rejected"""
+        with pytest.raises(ValueError):
+            await run_simulation(["USD"], np.array([18.5]), 10, 100, model="heston", volatility=0.01)
+
+
+@pytest.mark.integration
+class TestSimulationEndpoint:
+    """Integration tests for POST /simulate"""
+
+    def test_simulate(self):
+        """Test bands estimated from the recorded snapshots, and the echoed seed"""
+        log = SnapshotLog()
+        history, days = _history(np.array([0.05]), 40)
+        start = now_ms() - 40 * 86_400_000
+        for day, rate in zip(days, history[:, 0]):
+            log.append({"USD": rate}, start + int(day) * 86_400_000)
+
+        with patch.object(exchange.exchange_service, "snapshot_log", log), \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_all_rates_from_zar',
+                   AsyncMock(return_value={"USD": 0.05})):
+            response = client.post("/api/v1/exchange/simulate", json={
+                "currencies": ["usd"], "horizon_days": 5, "paths": 500, "seed": 3
+            })
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["seed"] == 3
+        assert data["steps"] == [1, 2, 3, 4, 5]
+        assert data["spot"]["USD"] == pytest.approx(20.0)
+        assert data["parameter_source"] == "history"
+        assert data["history_points"] == 40
+        assert set(data["bands"]["USD"]) == {"p5", "p25", "p50", "p75", "p95"}
+
+    def test_simulate_without_history(self):
+        """Test that a short log needs a caller volatility, and unknown currencies 404"""
+        log = SnapshotLog()
+        log.append({"USD": 0.05})
+        with patch.object(exchange.exchange_service, "snapshot_log", log), \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_all_rates_from_zar',
+                   AsyncMock(return_value={"USD": 0.05})):
+            refused = client.post("/api/v1/exchange/simulate", json={
+                "currencies": ["USD"], "horizon_days": 5, "paths": 500
+            })
+            supplied = client.post("/api/v1/exchange/simulate", json={
+                "currencies": ["USD"], "horizon_days": 5, "paths": 500, "volatility": 0.01
+            })
+            unknown = client.post("/api/v1/exchange/simulate", json={
+                "currencies": ["XYZ"], "volatility": 0.01
+            })
+
+        assert refused.status_code == 400
+        assert "volatility" in refused.json()["detail"]
+        assert supplied.status_code == 200
+        assert supplied.json()["parameter_source"] == "volatility"
+        assert unknown.status_code == 404
+        assert "XYZ" in unknown.json()["detail"]
+
+    def test_simulate_validation(self):
+        """Test request limits"""
+        response = client.post("/api/v1/exchange/simulate", json={
+            "currencies": ["USD"], "paths": 10
+        })
+
+        assert response.status_code == 422
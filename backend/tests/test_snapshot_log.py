@@ -0,0 +1,135 @@
+"""
+Tests for the point-in-time snapshot log
+"""
+import numpy as np
+import pytest
+from datetime import datetime, timezone
+from fastapi.testclient import TestClient
+from app.main import app
+from app.api.routes.exchange import exchange_service
+from app.services.snapshot_log import SnapshotLog, datetime_to_ms, ms_to_iso
+
+
+client = TestClient(app)
+
+T0 = datetime_to_ms(datetime(2025, 3, 5, 14, 0))
+
+
+@pytest.mark.unit
+class TestSnapshotLog:
+    """Unit tests for SnapshotLog"""
+
+    @pytest.fixture
+    def log(self):
+        """Create a log with three snapshots, ten minutes apart"""
+        log = SnapshotLog(initial_capacity=2)
+        log.append({"USD": 0.050, "EUR": 0.045}, T0)
+        log.append({"USD": 0.051, "EUR": 0.046}, T0 + 600_000)
+        log.append({"USD": 0.052, "EUR": 0.047, "GBP": 0.040}, T0 + 1_200_000)
+        return log
+
+    def test_growth_and_columns(self, log):
+        """Test that capacity doubles and late currencies get a column"""
+        assert len(log) == 3
+        assert log.timestamps.tolist() == [T0, T0 + 600_000, T0 + 1_200_000]
+        assert set(log.currencies) == {"USD", "EUR", "ZAR", "GBP"}
+
+    def test_locate(self, log):
+        """Test binary search for the snapshot in effect"""
+        rows = log.locate([T0 - 1, T0, T0 + 180_000, T0 + 600_000, T0 + 10 ** 9])
+        assert rows.tolist() == [-1, 0, 0, 1, 2]
+
+    def test_cross_rates(self, log):
+        """Test vectorized cross rates with gaps"""
+        rows = log.locate([T0 - 1, T0 + 1, T0 + 1_200_000])
+
+        to_zar = log.cross_rates(rows, "USD", "ZAR")
+        assert np.isnan(to_zar[0])
+        assert to_zar[1:] == pytest.approx([20.0, 1 / 0.052])
+
+        gbp = log.cross_rates(rows, "GBP", "ZAR")
+        assert np.isnan(gbp[1])
+        assert gbp[2] == pytest.approx(25.0)
+
+    def test_rates_at(self, log):
+        """Test the full table at a point in time"""
+        snapshot_ms, rates = log.rates_at(T0 + 700_000)
+        assert snapshot_ms == T0 + 600_000
+        assert rates["USD"] == 0.051
+        assert "GBP" not in rates
+
+        with pytest.raises(LookupError):
+            log.rates_at(T0 - 1)
+
+    def test_out_of_order_append_rejected(self, log):
+        """Test that snapshots must arrive in time order"""
+        with pytest.raises(ValueError):
+            log.append({"USD": 0.05}, T0)
+
+    def test_datetime_conversion(self):
+        """Test naive datetimes are treated as UTC"""
+        aware = datetime(2025, 3, 5, 14, 0, tzinfo=timezone.utc)
+        assert datetime_to_ms(aware) == T0
+        assert ms_to_iso(T0) == "2025-03-05T14:00:00"
+
+
+@pytest.mark.integration
+class TestAsOfEndpoints:
+    """Integration tests for as_of lookups"""
+
+    @pytest.fixture(autouse=True)
+    def snapshots(self):
+        """Swap in a known snapshot log on the router's service"""
+        original = exchange_service.snapshot_log
+        log = SnapshotLog()
+        log.append({"USD": 0.05}, T0)
+        log.append({"USD": 0.04}, T0 + 600_000)
+        exchange_service.snapshot_log = log
+        yield
+        exchange_service.snapshot_log = original
+
+    def test_direct_as_of(self):
+        """Test a single point-in-time lookup"""
+        response = client.post(
+            "/api/v1/exchange/direct",
+            json={"base_currency": "USD", "as_of": "2025-03-05T14:03:00"}
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rate"] == pytest.approx(20.0)
+        assert data["timestamp"] == "2025-03-05T14:00:00"
+
+    def test_direct_as_of_before_first_snapshot(self):
+        """Test that times before any snapshot are not found"""
+        response = client.post(
+            "/api/v1/exchange/direct",
+            json={"base_currency": "USD", "as_of": "2020-01-01T00:00:00"}
+        )
+        assert response.status_code == 404
+
+    def test_direct_as_of_exact(self):
+        """Test exact conversion at a point in time"""
+        response = client.post(
+            "/api/v1/exchange/direct",
+            json={"base_currency": "USD", "as_of": "2025-03-05T15:00:00Z", "amount": "2"}
+        )
+
+        assert response.status_code == 200
+        assert response.json()["exact"]["converted_minor"] == 5000
+
+    def test_batch_as_of(self):
+        """Test resolving many timestamps at once"""
+        response = client.post(
+            "/api/v1/exchange/direct/batch",
+            json={
+                "base_currency": "USD",
+                "as_of": ["2020-01-01T00:00:00", "2025-03-05T14:05:00", "2025-03-05T14:10:00"]
+            }
+        )
+
+        assert response.status_code == 200
+        data = response.json()
+        assert data["rates"][0] is None
+        assert data["rates"][1:] == pytest.approx([20.0, 25.0])
+        assert data["snapshot_timestamps"] == [None, "2025-03-05T14:00:00", "2025-03-05T14:10:00"]
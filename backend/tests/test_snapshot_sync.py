@@ -0,0 +1,387 @@
+"""
+Tests for cross-node snapshot distribution
+"""
+import asyncio
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+from app.core.pubsub import InMemoryBroker, broker_from_url
+from app.services.exchange_rate_service import ExchangeRateService
+from app.services.snapshot_sync import (
+    FOLLOWER,
+    INDEPENDENT,
+    LEADER,
+    SnapshotSync,
+    decode_message,
+    encode_message,
+    rate_delta
+)
+
+
+class RecordingBroker(InMemoryBroker):
+    """In-memory broker keeping every published message"""
+
+    def __init__(self):
+        super().__init__()
+        self.sent = []
+
+    async def publish(self, channel, message):
+        self.sent.append(decode_message(message))
+        return await super().publish(channel, message)
+
+
+class FlakyBroker(RecordingBroker):
+    """Broker failing a set number of publishes, and the first subscription"""
+
+    def __init__(self, publish_failures=0, drop_first_subscription=False):
+        super().__init__()
+        self.publish_failures = publish_failures
+        self.drop_subscription = drop_first_subscription
+        self.subscriptions = 0
+
+    async def publish(self, channel, message):
+        if self.publish_failures:
+            self.publish_failures -= 1
+            raise ConnectionError("broker unavailable")
+        return await super().publish(channel, message)
+
+    async def subscribe(self, channel):
+        self.subscriptions += 1
+        subscription = await super().subscribe(channel)
+        if self.drop_subscription:
+            self.drop_subscription = False
+
+            async def disconnected():
+                raise ConnectionError("connection lost")
+                yield
+
+            await subscription.close()
+            return type(subscription)(disconnected(), subscription.close)
+        return subscription
+
+
+def _response(payload):
+    response = MagicMock()
+    response.status_code = 200
+    response.headers = {}
+    response.json.return_value = payload
+    response.raise_for_status = MagicMock()
+    return response
+
+
+def upstream(*payloads):
+    """Patch the provider to answer with the given payloads in turn"""
+    patcher = patch('httpx.AsyncClient')
+    mock_client = patcher.start()
+    get = AsyncMock(side_effect=[_response(payload) for payload in payloads])
+    mock_client.return_value.__aenter__.return_value.get = get
+    return patcher, get
+
+
+def expire(service):
+    """Make the service's table due for refresh"""
+    service._batch_next_refresh = None
+    service._batch_cache_time = None
+
+
+async def deliver(broker, *nodes):
+    """Hand every recorded message to the nodes, as their subscriptions would"""
+    messages, broker.sent = broker.sent, []
+    for message in messages:
+        for node in nodes:
+            await node.handle(message)
+    return messages
+
+
+@pytest.mark.unit
+class TestBroker:
+    """Unit tests for the in-memory broker stand-in"""
+
+    @pytest.mark.asyncio
+    async def test_lease_is_exclusive_until_expiry(self):
+        """Test SET NX PX semantics: one holder, renewable, then free"""
+        broker = InMemoryBroker()
+        assert await broker.acquire_lease("lead", "a", ttl=0.05)
+        assert not await broker.acquire_lease("lead", "b", ttl=0.05)
+        assert await broker.acquire_lease("lead", "a", ttl=0.05)
+
+        await asyncio.sleep(0.06)
+        assert await broker.acquire_lease("lead", "b", ttl=0.05)
+        await broker.release_lease("lead", "a")
+        assert not await broker.acquire_lease("lead", "a", ttl=0.05)
+
+    @pytest.mark.asyncio
+    async def test_publish_subscribe(self):
+        """Test delivery to subscribers and unsubscribing"""
+        broker = InMemoryBroker()
+        subscription = await broker.subscribe("ch")
+        assert await broker.publish("ch", b"one") == 1
+        assert await subscription.__aiter__().__anext__() == b"one"
+
+        await subscription.close()
+        assert await broker.publish("ch", b"two") == 0
+
+    def test_broker_from_url(self):
+        """Test broker selection from SNAPSHOT_BROKER_URL"""
+        assert broker_from_url(None) is None
+        assert isinstance(broker_from_url("memory"), InMemoryBroker)
+        with pytest.raises(ValueError):
+            broker_from_url("kafka://broker:9092")
+
+    def test_rate_delta(self):
+        """Test changed and removed currencies between tables"""
+        changed, removed = rate_delta({"USD": 0.05, "EUR": 0.045, "XAU": 1e-5}, {"USD": 0.05, "EUR": 0.046, "GBP": 0.04})
+        assert changed == {"EUR": 0.046, "GBP": 0.04}
+        assert removed == ["XAU"]
+
+
+@pytest.mark.unit
+class TestSnapshotSync:
+    """Unit tests for leader election and snapshot replication"""
+
+    @pytest.fixture
+    def cluster(self):
+        """A leader-to-be and two followers sharing one broker"""
+        broker = RecordingBroker()
+        nodes = [
+            SnapshotSync(ExchangeRateService(), broker, node_id=name, interval=1.0, keyframe_every=3)
+            for name in ("a", "b", "c")
+        ]
+        yield broker, nodes
+        for node in nodes:
+            node.service.alerts.dispatcher.shutdown()
+
+    @pytest.mark.asyncio
+    async def test_followers_apply_leader_snapshots(self, cluster):
+        """Test that only the leader fetches and followers get its table"""
+        broker, (leader, b, c) = cluster
+        patcher, get = upstream(
+            {"rates": {"USD": 0.05, "EUR": 0.045}, "time_last_updated": 1},
+            {"rates": {"USD": 0.051, "EUR": 0.045}, "time_last_updated": 2}
+        )
+        try:
+            await leader.tick()
+            await b.tick()
+            await c.tick()
+            first = await deliver(broker, b, c)
+
+            expire(leader.service)
+            await leader.tick()
+            second = await deliver(broker, b, c)
+        finally:
+            patcher.stop()
+
+        assert (leader.role, b.role, c.role) == (LEADER, FOLLOWER, FOLLOWER)
+        assert get.call_count == 2
+        assert first[0]["rates"] == {"USD": 0.05, "EUR": 0.045}
+        # The second snapshot only carries what changed
+        assert second[0]["changed"] == {"USD": 0.051}
+        assert "rates" not in second[0]
+
+        for follower in (b, c):
+            assert await follower.service.get_all_rates_from_zar() == {"USD": 0.051, "EUR": 0.045}
+            assert follower.service._snapshot_version == 2
+            assert follower.service.get_refresh_stats()["fetches"] == 0
+        # Followers never republish what they applied
+        assert broker.sent == []
+
+    @pytest.mark.asyncio
+    async def test_heartbeats_hold_follower_table(self, cluster):
+        """Test that a quiet but live leader keeps followers from fetching"""
+        broker, (leader, b, _) = cluster
+        patcher, _ = upstream({"rates": {"USD": 0.05}})
+        try:
+            await leader.tick()
+            await deliver(broker, b)
+            expire(b.service)
+            await leader.tick()
+            heartbeat = await deliver(broker, b)
+        finally:
+            patcher.stop()
+
+        assert heartbeat[0]["type"] == "heartbeat"
+        assert b.service._is_batch_fresh()
+
+    @pytest.mark.asyncio
+    async def test_gap_requests_keyframe(self, cluster):
+        """Test that a missed delta is repaired with a full table"""
+        broker, (leader, b, c) = cluster
+        patcher, _ = upstream(
+            {"rates": {"USD": 0.05, "EUR": 0.045}},
+            {"rates": {"USD": 0.051, "EUR": 0.045}},
+            {"rates": {"USD": 0.052, "EUR": 0.044}}
+        )
+        try:
+            await leader.tick()
+            await deliver(broker, b, c)
+            # c misses the first delta and cannot apply the second
+            expire(leader.service)
+            await leader.tick()
+            await deliver(broker, b)
+            expire(leader.service)
+            await leader.tick()
+            await deliver(broker, b, c)
+            assert c.stats["gaps"] == 1
+            resync = await deliver(broker, leader)
+
+            await leader.tick()
+            keyframe = await deliver(broker, b, c)
+        finally:
+            patcher.stop()
+
+        assert resync[0]["type"] == "resync"
+        assert keyframe[0]["rates"] == {"USD": 0.052, "EUR": 0.044}
+        assert keyframe[0]["version"] == leader._version
+        assert c.service._batch_cache == b.service._batch_cache == {"USD": 0.052, "EUR": 0.044}
+        # b already had this version, so the repeat is not a new snapshot there
+        assert b.service._snapshot_version == 3
+
+    @pytest.mark.asyncio
+    async def test_failed_publish_is_retried(self):
+        """Test that a snapshot whose publish failed goes out on the next tick"""
+        broker = FlakyBroker()
+        leader, follower = [
+            SnapshotSync(ExchangeRateService(), broker, node_id=name, interval=1.0)
+            for name in ("a", "b")
+        ]
+        patcher, _ = upstream({"rates": {"USD": 0.05}}, {"rates": {"USD": 0.06}})
+        try:
+            await leader.tick()
+            await deliver(broker, follower)
+            expire(leader.service)
+            broker.publish_failures = 1
+            with pytest.raises(ConnectionError):
+                await leader.tick()
+            await leader.tick()
+            messages = await deliver(broker, follower)
+        finally:
+            patcher.stop()
+            for node in (leader, follower):
+                node.service.alerts.dispatcher.shutdown()
+
+        assert messages[0]["type"] == "snapshot"
+        assert messages[0]["version"] == 2
+        assert follower.service._batch_cache == leader.service._batch_cache == {"USD": 0.06}
+
+    @pytest.mark.asyncio
+    async def test_periodic_keyframes(self, cluster):
+        """Test that every keyframe_every-th publish is a full table"""
+        broker, (leader, *_) = cluster
+        payloads = [{"rates": {"USD": 0.05 + i / 1000}} for i in range(5)]
+        patcher, _ = upstream(*payloads)
+        try:
+            for _ in payloads:
+                expire(leader.service)
+                await leader.tick()
+        finally:
+            patcher.stop()
+
+        assert ["rates" in message for message in broker.sent] == [True, False, False, False, True]
+
+    @pytest.mark.asyncio
+    async def test_falls_back_when_leader_silent(self, cluster):
+        """Test that followers fetch independently once the leader goes quiet"""
+        broker, (leader, b, _) = cluster
+        leader.silence_timeout = b.silence_timeout = 0.05
+        patcher, _ = upstream({"rates": {"USD": 0.05}})
+        try:
+            await leader.tick()
+            await deliver(broker, b)
+        finally:
+            patcher.stop()
+        assert b.service._is_batch_fresh()
+
+        await asyncio.sleep(0.06)
+        await b.tick()
+        assert b.role == INDEPENDENT
+        assert not b.service._is_batch_fresh()
+
+        patcher, get = upstream({"rates": {"USD": 0.06}})
+        try:
+            assert await b.service.get_all_rates_from_zar() == {"USD": 0.06}
+        finally:
+            patcher.stop()
+        assert get.call_count == 1
+
+    @pytest.mark.asyncio
+    async def test_failover_to_new_leader(self, cluster):
+        """Test that another node takes over once the lease is released"""
+        broker, (leader, b, c) = cluster
+        patcher, _ = upstream({"rates": {"USD": 0.05}}, {"rates": {"USD": 0.06}})
+        try:
+            await leader.tick()
+            await deliver(broker, b, c)
+            await leader.stop()
+            await b.tick()
+            expire(b.service)
+            await b.tick()
+            messages = await deliver(broker, c)
+        finally:
+            patcher.stop()
+
+        assert b.role == LEADER
+        assert b.stats["elections"] == 1
+        # The new leader opens with a keyframe of the table it already had
+        assert messages[0]["leader"] == "b"
+        assert messages[0]["rates"] == {"USD": 0.05}
+        assert c.service._batch_cache == {"USD": 0.06}
+
+
+@pytest.mark.integration
+class TestSnapshotSyncLoops:
+    """Integration test of the background loops over a shared broker"""
+
+    @pytest.mark.asyncio
+    async def test_nodes_converge(self):
+        """Test that running nodes elect one leader and share its table"""
+        broker = InMemoryBroker()
+        nodes = [
+            SnapshotSync(ExchangeRateService(), broker, node_id=name, interval=0.02)
+            for name in ("a", "b")
+        ]
+        patcher, get = upstream(*[{"rates": {"USD": 0.05}}] * 10)
+        try:
+            for node in nodes:
+                await node.start()
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if all(node.service._batch_cache for node in nodes):
+                    break
+            roles = sorted(node.role for node in nodes)
+            for node in nodes:
+                await node.stop()
+        finally:
+            patcher.stop()
+            for node in nodes:
+                node.service.alerts.dispatcher.shutdown()
+
+        assert roles == [FOLLOWER, LEADER]
+        assert get.call_count == 1
+        assert all(node.service._batch_cache == {"USD": 0.05} for node in nodes)
+
+    @pytest.mark.asyncio
+    async def test_resubscribes_after_disconnect(self):
+        """Test that a follower keeps listening after its subscription drops"""
+        broker = FlakyBroker(drop_first_subscription=True)
+        node = SnapshotSync(ExchangeRateService(), broker, node_id="b", interval=0.02)
+        # Another node holds the lease, so this one stays a follower
+        await broker.acquire_lease(node.lease_key, "a", 60.0)
+        try:
+            await node.start()
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if broker.subscriptions == 2:
+                    break
+            await broker.publish(node.channel, encode_message({
+                "type": "snapshot", "leader": "a", "version": 1, "base_version": 0,
+                "hold": 30.0, "rates": {"USD": 0.05}
+            }))
+            for _ in range(100):
+                await asyncio.sleep(0.01)
+                if node.stats["applied"]:
+                    break
+            await node.stop()
+        finally:
+            node.service.alerts.dispatcher.shutdown()
+
+        assert node.stats["resubscribes"] == 1
+        assert node.service._batch_cache == {"USD": 0.05}
@@ -0,0 +1,172 @@
+"""
+Tests for request tracing
+"""
+import json
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.tracing import (
+    BatchSpanProcessor,
+    InMemoryExporter,
+    JsonlFileExporter,
+    OTLPHttpExporter,
+    Tracer,
+    tracer as app_tracer
+)
+
+
+client = TestClient(app)
+
+
+@pytest.fixture
+def recording_tracer():
+    """Tracer sampling everything into memory"""
+    exporter = InMemoryExporter()
+    return Tracer(BatchSpanProcessor(exporter), sample_rate=1.0), exporter
+
+
+@pytest.mark.unit
+class TestTracer:
+    """Unit tests for spans and propagation"""
+
+    @pytest.mark.asyncio
+    async def test_child_spans_share_trace(self, recording_tracer):
+        """Test parent/child linkage across sync and async scopes"""
+        tracer, exporter = recording_tracer
+        root = tracer.start_trace("root")
+
+        with tracer.activate(root):
+            with tracer.span("outer", stage="a") as outer:
+                async with tracer.span("inner") as inner:
+                    pass
+        root.end()
+        tracer.processor.flush()
+
+        names = [span.name for span in exporter.spans]
+        assert names == ["inner", "outer", "root"]
+        assert inner.parent_id == outer.span_id
+        assert outer.parent_id == root.span_id
+        assert {span.trace_id for span in exporter.spans} == {root.trace_id}
+        assert outer.attributes["stage"] == "a"
+
+    def test_unsampled_spans_are_noops(self):
+        """Test that unsampled traces record nothing"""
+        exporter = InMemoryExporter()
+        tracer = Tracer(BatchSpanProcessor(exporter), sample_rate=0.0)
+        root = tracer.start_trace("root")
+
+        with tracer.activate(root):
+            with tracer.span("child") as child:
+                child.set_attribute("ignored", True)
+        root.end()
+        tracer.processor.flush()
+
+        assert exporter.spans == []
+
+    def test_span_records_errors(self, recording_tracer):
+        """Test that exceptions mark the span as failed"""
+        tracer, exporter = recording_tracer
+        root = tracer.start_trace("root")
+
+        with tracer.activate(root):
+            with pytest.raises(ValueError):
+                with tracer.span("boom"):
+                    raise ValueError("bad")
+        tracer.processor.flush()
+
+        assert exporter.spans[0].status == "error"
+
+    def test_incoming_traceparent_is_continued(self, recording_tracer):
+        """Test W3C traceparent propagation and upstream sampling decision"""
+        tracer, _ = recording_tracer
+        parent = "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-00"
+
+        root = tracer.start_trace("root", parent)
+
+        assert root.trace_id == "0af7651916cd43dd8448eb211c80319c"
+        assert root.parent_id == "b7ad6b7169203331"
+        assert root.sampled is False
+
+    def test_queue_overflow_drops_spans(self, recording_tracer):
+        """Test that a full queue drops rather than blocks"""
+        tracer, _ = recording_tracer
+        tracer.processor = BatchSpanProcessor(InMemoryExporter(), max_queue_size=1)
+        tracer.processor._ensure_worker = lambda: None
+        tracer.start_trace("a").end()
+        tracer.start_trace("b").end()
+
+        assert tracer.processor.dropped == 1
+
+
+@pytest.mark.unit
+class TestExporters:
+    """Unit tests for span exporters"""
+
+    def test_jsonl_exporter(self, recording_tracer, tmp_path):
+        """Test one JSON object per span line"""
+        tracer, _ = recording_tracer
+        path = tmp_path / "spans.jsonl"
+        span = tracer.start_trace("root")
+        span.end()
+
+        JsonlFileExporter(str(path)).export([span, span])
+
+        lines = path.read_text().strip().split("\n")
+        assert len(lines) == 2
+        assert json.loads(lines[0])["trace_id"] == span.trace_id
+
+    def test_otlp_payload(self, recording_tracer):
+        """Test OTLP/JSON encoding"""
+        tracer, _ = recording_tracer
+        span = tracer.start_trace("root")
+        span.set_attribute("http.status_code", 200)
+        span.end()
+
+        payload = OTLPHttpExporter("http://collector/v1/traces")._encode([span])
+
+        encoded = payload["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+        assert encoded["traceId"] == span.trace_id
+        assert encoded["attributes"] == [{"key": "http.status_code", "value": {"stringValue": "200"}}]
+
+
+@pytest.mark.integration
+class TestTracingMiddleware:
+    """Integration tests for trace propagation through the app"""
+
+    def test_trace_headers_on_response(self):
+        """Test that every response carries trace identifiers"""
+        response = client.get("/health")
+
+        trace_id = response.headers["x-trace-id"]
+        assert len(trace_id) == 32
+        assert response.headers["traceparent"].startswith(f"00-{trace_id}-")
+
+    def test_request_spans_exported(self):
+        """Test that a sampled request records router and service spans"""
+        exporter = InMemoryExporter()
+        original = app_tracer.processor
+        app_tracer.processor = BatchSpanProcessor(exporter)
+        app_tracer.processor._ensure_worker = lambda: None
+        try:
+            with patch('app.services.exchange_rate_service.ExchangeRateService.get_snapshot_version',
+                       new_callable=AsyncMock) as mock_version, \
+                 patch('app.services.exchange_rate_service.ExchangeRateService.get_rate',
+                       new_callable=AsyncMock) as mock_get_rate:
+                mock_version.return_value = None
+                mock_get_rate.return_value = 18.2345
+                response = client.get(
+                    "/api/v1/exchange/historical/USD/ZAR?days=5",
+                    headers={"traceparent": "00-0af7651916cd43dd8448eb211c80319c-b7ad6b7169203331-01"}
+                )
+            app_tracer.processor.flush()
+        finally:
+            app_tracer.processor = original
+
+        assert response.headers["x-trace-id"] == "0af7651916cd43dd8448eb211c80319c"
+        historical, root = exporter.spans
+        assert historical.name == "exchange.get_historical_rates"
+        assert historical.parent_id == root.span_id
+        assert root.name == "GET /api/v1/exchange/historical/USD/ZAR"
+        assert root.parent_id == "b7ad6b7169203331"
+        assert root.attributes["http.status_code"] == 200
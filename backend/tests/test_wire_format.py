@@ -0,0 +1,128 @@
+"""
+Tests for binary wire format negotiation
+"""
+import numpy as np
+import pytest
+from unittest.mock import AsyncMock, patch
+from fastapi.testclient import TestClient
+from app.main import app
+from app.core.wire_format import (
+    CBOR,
+    JSON,
+    MSGPACK,
+    decode_body,
+    encode_body,
+    negotiate_format
+)
+
+
+client = TestClient(app)
+
+
+@pytest.mark.unit
+class TestNegotiateFormat:
+    """Unit tests for Accept header parsing"""
+
+    @pytest.mark.parametrize("accept,expected", [
+        (None, JSON),
+        ("*/*", JSON),
+        ("application/json", JSON),
+        ("application/msgpack", MSGPACK),
+        ("application/x-msgpack", MSGPACK),
+        ("application/cbor", CBOR),
+        ("application/json, application/cbor;q=0.5", JSON),
+        ("application/json;q=0.5, application/msgpack", MSGPACK),
+        ("application/msgpack, application/cbor", MSGPACK),
+        ("text/html", JSON),
+    ])
+    def test_negotiate(self, accept, expected):
+        """Test format choice by q-value, with server preference on ties"""
+        assert negotiate_format(accept) == expected
+
+
+@pytest.mark.unit
+class TestRoundTrip:
+    """Unit tests for encoding and decoding"""
+
+    @pytest.mark.parametrize("fmt", [MSGPACK, CBOR])
+    def test_packed_arrays_round_trip(self, fmt):
+        """Test that NumPy arrays come back bit-exact and typed"""
+        payload = {
+            "base_currency": "USD",
+            "dates": np.arange(20000, 20010, dtype=np.int64),
+            "rates": np.random.default_rng(0).uniform(17, 19, 10)
+        }
+        decoded = decode_body(encode_body(payload, fmt), fmt)
+
+        assert decoded["base_currency"] == "USD"
+        assert decoded["dates"].dtype == np.int64
+        np.testing.assert_array_equal(decoded["dates"], payload["dates"])
+        np.testing.assert_array_equal(decoded["rates"], payload["rates"])
+
+    @pytest.mark.parametrize("fmt", [JSON, MSGPACK, CBOR])
+    def test_plain_payload_round_trip(self, fmt):
+        """Test that schema payloads survive every format unchanged"""
+        payload = {"rate": 18.2345, "exact": None, "tags": ["a", "b"], "count": 3}
+        assert decode_body(encode_body(payload, fmt), fmt) == payload
+
+    def test_packed_is_smaller_than_json(self):
+        """Test that a packed series beats per-element JSON objects"""
+        rates = np.random.default_rng(1).uniform(17, 19, 365)
+        json_body = encode_body({"data": [{"date": "2025-01-01", "rate": r} for r in rates.tolist()]}, JSON)
+        packed = encode_body({"dates": np.arange(365), "rates": rates}, MSGPACK)
+        assert len(packed) < len(json_body) / 2
+
+
+@pytest.mark.integration
+class TestNegotiatedEndpoints:
+    """Integration tests for Accept negotiation on the exchange router"""
+
+    @pytest.mark.parametrize("accept,fmt", [
+        ("application/msgpack", MSGPACK), ("application/cbor", CBOR)
+    ])
+    def test_direct_preserves_schema(self, accept, fmt):
+        """Test that /direct binary bodies carry the DirectLookupResponse fields"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_rate',
+                   new_callable=AsyncMock, return_value=18.5):
+            json_body = client.post("/api/v1/exchange/direct", json={"base_currency": "USD"}).json()
+            response = client.post(
+                "/api/v1/exchange/direct", json={"base_currency": "USD"}, headers={"Accept": accept}
+            )
+
+        assert response.headers["content-type"] == f"application/{fmt}"
+        decoded = decode_body(response.content, fmt)
+        assert set(decoded) == set(json_body)
+        assert decoded["rate"] == 18.5
+
+    def test_historical_formats_agree(self):
+        """Test that packed and JSON series match for the same snapshot"""
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_rate',
+                   new_callable=AsyncMock, return_value=18.5), \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_snapshot_version',
+                   new_callable=AsyncMock, return_value=12345):
+            json_body = client.get("/api/v1/exchange/historical/USD/ZAR?days=30").json()
+            response = client.get(
+                "/api/v1/exchange/historical/USD/ZAR?days=30",
+                headers={"Accept": "application/msgpack"}
+            )
+
+        assert "Accept" in response.headers["vary"]
+        packed = decode_body(response.content, MSGPACK)
+        assert len(packed["rates"]) == len(json_body["data"]) == 31
+        np.testing.assert_array_equal(packed["rates"], [row["rate"] for row in json_body["data"]])
+        dates = np.datetime_as_string(packed["dates"].astype("datetime64[D]")).tolist()
+        assert dates == [row["date"] for row in json_body["data"]]
+
+    def test_rate_table(self):
+        """Test the full rate table in JSON and CBOR"""
+        rates = {"ZAR": 1.0, "USD": 0.054, "EUR": 0.05}
+        with patch('app.services.exchange_rate_service.ExchangeRateService.get_all_rates_from_zar',
+                   new_callable=AsyncMock, return_value=rates), \
+             patch('app.services.exchange_rate_service.ExchangeRateService.get_snapshot_version',
+                   new_callable=AsyncMock, return_value=None):
+            json_body = client.get("/api/v1/exchange/rates").json()
+            response = client.get("/api/v1/exchange/rates", headers={"Accept": "application/cbor"})
+
+        assert json_body["rates"] == rates
+        decoded = decode_body(response.content, CBOR)
+        assert dict(zip(decoded["currencies"], decoded["rates"].tolist())) == rates
@@ -0,0 +1,211 @@
+"""
+Train the currency intent classifier and write its weights file
+
+The corpus is generated from query templates and surface forms for each
+label (codes, names, slang, symbols, Afrikaans, common misspellings) with
+random typos, plus queries about other currencies or no currency at all
+under the NONE label. Pass --corpus to train on a labelled JSONL file
+({"text": ..., "label": ...} per line) instead.
+
+The temperature is fitted on CALIBRATION_QUERIES, hand-written free-form
+queries that share no templates with the corpus, so the confidence that
+gates the LLM reflects real queries rather than the template holdout (on
+which naive Bayes is near-certain). Pass --calibration to use a labelled
+JSONL file instead.
+
+Usage:
+    cd backend
+    python -m training.train_intent_classifier
+"""
+import argparse
+import json
+import random
+from typing import List, Tuple
+
+from app.services.intent_classifier import (
+    DEFAULT_MODEL_PATH,
+    NO_CURRENCY,
+    CurrencyIntentClassifier
+)
+
+
+SURFACE_FORMS = {
+    "USD": [
+        "usd", "us dollar", "us dollars", "dollar", "dollars", "greenback", "greenbacks",
+        "american dollar", "american dollars", "buck", "bucks", "$", "us$", "u.s. dollar",
+        "united states dollar", "dolar", "doller", "dollr", "dollars us", "yankee dollar",
+        "amerikaanse dollar", "dolla", "usd$", "dollar bills", "american money"
+    ],
+    "EUR": [
+        "eur", "euro", "euros", "€", "eur0", "euroo", "yuro", "european currency",
+        "eurozone currency", "euro's", "eu money", "europe's currency", "evro", "euri",
+        "money in europe", "germany's currency", "french money", "euro dollars"
+    ],
+    "GBP": [
+        "gbp", "pound", "pounds", "sterling", "pound sterling", "pounds sterling", "quid",
+        "£", "british pound", "british pounds", "uk pound", "uk pounds", "great british pound",
+        "english pound", "pund", "pounds sterlng", "brittish pound", "poond", "gbp£",
+        "britse pond", "money in london", "uk currency"
+    ],
+    NO_CURRENCY: [
+        "yen", "japanese yen", "yuan", "renminbi", "rupee", "indian rupee", "swiss franc",
+        "bitcoin", "ethereum", "australian dollar", "canadian dollar", "hong kong dollar",
+        "new zealand dollar", "zimbabwe dollar", "naira", "kwacha", "pula", "egyptian pound",
+        "lebanese pound", "shekel", "won", "peso", "real", "dirham", "rouble", "krona",
+        "lira", "kenyan shilling", "botswana pula", "gold", "crypto"
+    ]
+}
+
+TEMPLATES = [
+    "what is the {c} rate", "{c} to rand", "{c} to zar", "how many rand for 100 {c}",
+    "convert {c} to zar", "convert 250 {c} into rands", "price of {c} in south african rand",
+    "exchange rate for {c}", "i need {c}", "{c} zar", "how much is a {c} worth today",
+    "rate for {c} please", "what's the {c} doing against the rand", "zar vs {c}",
+    "how strong is the {c}", "{c} exchange rate today", "buying {c} with rand",
+    "current {c} price", "1 {c} in rand", "what does the {c} cost", "show me {c}",
+    "wat is die {c} koers", "hoeveel rand vir een {c}", "{c}?", "{c} rate"
+]
+
+NO_CURRENCY_QUERIES = [
+    "hello", "hi there", "what's the weather like", "tell me a joke", "what is inflation",
+    "what are interest rates doing", "how does the stock market work", "help",
+    "who are you", "what can you do", "thanks", "what time is it", "rand to rand",
+    "what's the repo rate", "best bank for savings", "is the economy ok",
+    "how do exchange rates work", "exchange rate", "what is the rate", "rates please"
+]
+
+
+# Free-form queries never used for training; labelled NONE unless they name
+# or clearly imply a supported currency
+CALIBRATION_QUERIES = [
+    ("my cousin in new york sent me 200 dollars, what is that in rand", "USD"),
+    ("what will 50 bucks get me here", "USD"),
+    ("netflix bills me in usd, how much is that monthly", "USD"),
+    ("amazon charged me $30", "USD"),
+    ("is the greenback getting stronger", "USD"),
+    ("salary paid in us dollars, convert to rand please", "USD"),
+    ("need american dollars for my trip to florida", "USD"),
+    ("how much is a dolar worth", "USD"),
+    ("going to paris next month, how many euros should i buy", "EUR"),
+    ("my invoice from berlin is in eur", "EUR"),
+    ("what's 1000 euro in our money", "EUR"),
+    ("is the euro weaker than last week", "EUR"),
+    ("holiday in spain, need some euros", "EUR"),
+    ("how much is €45", "EUR"),
+    ("paying a supplier in italy in euro", "EUR"),
+    ("sending money to my son studying in london, in pounds", "GBP"),
+    ("what's a quid worth in rands", "GBP"),
+    ("uk pension paid in sterling", "GBP"),
+    ("how much is £50", "GBP"),
+    ("british website priced in pounds, what will i pay", "GBP"),
+    ("how many pounds for a week in manchester", "GBP"),
+    ("i want to send money to my mom in lagos", NO_CURRENCY),
+    ("transfer money to my brother in nairobi", NO_CURRENCY),
+    ("what's the best way to send money overseas", NO_CURRENCY),
+    ("my friend in sydney owes me aussie dollars", NO_CURRENCY),
+    ("is now a good time to buy", NO_CURRENCY),
+    ("how much does a flight to dubai cost", NO_CURRENCY),
+    ("convert my salary", NO_CURRENCY),
+    ("send cash to harare", NO_CURRENCY),
+    ("need cash for the holiday", NO_CURRENCY),
+    ("canadian loonie to rand", NO_CURRENCY),
+    ("what's the price of gold", NO_CURRENCY),
+    ("help me pay my rent", NO_CURRENCY),
+    ("trip to tokyo, what do i need", NO_CURRENCY),
+    ("how is the rand doing", NO_CURRENCY),
+    ("my aunt in mumbai needs money", NO_CURRENCY),
+    ("what's bitcoin at", NO_CURRENCY),
+    ("can i buy shares with this app", NO_CURRENCY),
+    ("send 500 to my sister in gaborone", NO_CURRENCY),
+    ("how much money do i need for a holiday in thailand", NO_CURRENCY),
+    ("what currency do they use in brazil", NO_CURRENCY),
+    ("pay a freelancer in manila", NO_CURRENCY),
+    ("wire money to a supplier in shenzhen", NO_CURRENCY),
+    ("what are fees on international transfers", NO_CURRENCY),
+    ("money for my kids abroad", NO_CURRENCY),
+]
+
+
+def _typo(text: str, rng: random.Random) -> str:
+    if len(text) < 4:
+        return text
+    i = rng.randrange(len(text) - 1)
+    kind = rng.randrange(3)
+    if kind == 0:
+        return text[:i] + text[i + 1:]
+    if kind == 1:
+        return text[:i] + text[i + 1] + text[i] + text[i + 2:]
+    return text[:i] + text[i] + text[i:]
+
+
+def build_corpus(size: int = 6000, seed: int = 0) -> List[Tuple[str, str]]:
+    """
+    Generate a labelled query corpus
+
+    Args:
+        size: Number of queries
+        seed: Random seed (use different seeds for train and test splits)
+
+    Returns:
+        List of (query, label) pairs
+    """
+    rng = random.Random(seed)
+    labels = list(SURFACE_FORMS)
+    corpus = []
+    for _ in range(size):
+        label = rng.choice(labels)
+        if label == NO_CURRENCY and rng.random() < 0.3:
+            text = rng.choice(NO_CURRENCY_QUERIES)
+        else:
+            text = rng.choice(TEMPLATES).format(c=rng.choice(SURFACE_FORMS[label]))
+        if rng.random() < 0.3:
+            text = _typo(text, rng)
+        if rng.random() < 0.3:
+            text = text.upper() if rng.random() < 0.5 else text.title()
+        corpus.append((text, label))
+    return corpus
+
+
+def load_corpus(path: str) -> List[Tuple[str, str]]:
+    with open(path, encoding="utf-8") as handle:
+        rows = [json.loads(line) for line in handle if line.strip()]
+    return [(row["text"], row["label"]) for row in rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--corpus", help="Labelled JSONL corpus (default: generated)")
+    parser.add_argument(
+        "--calibration", help="Labelled JSONL queries for the temperature (default: built in)"
+    )
+    parser.add_argument("--output", default=str(DEFAULT_MODEL_PATH))
+    parser.add_argument("--holdout", type=float, default=0.2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    corpus = load_corpus(args.corpus) if args.corpus else build_corpus(seed=args.seed)
+    random.Random(args.seed).shuffle(corpus)
+    split = int(len(corpus) * (1 - args.holdout))
+    train, holdout = corpus[:split], corpus[split:]
+
+    calibration = load_corpus(args.calibration) if args.calibration else CALIBRATION_QUERIES
+
+    model = CurrencyIntentClassifier.train(*zip(*train))
+    temperature = model.fit_temperature(*zip(*calibration))
+    correct = sum(model.predict(text)[0] == label for text, label in holdout)
+    predictions = [model.predict(text) for text, _ in calibration]
+    calibrated = sum(label == expected for (label, _), (_, expected) in zip(predictions, calibration))
+    confidence = sum(conf for _, conf in predictions) / len(predictions)
+    model.save(args.output)
+
+    print(f"trained on {len(train)} queries, labels {model.labels}")
+    print(f"holdout accuracy {correct / len(holdout):.3f}")
+    print(
+        f"calibration accuracy {calibrated / len(calibration):.3f}, "
+        f"mean confidence {confidence:.3f}, temperature {temperature:.2f}"
+    )
+    print(f"wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()